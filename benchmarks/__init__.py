@@ -0,0 +1 @@
+"""Benchmarks for createm4b's parsers, run with python -m benchmarks"""
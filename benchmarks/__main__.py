@@ -0,0 +1,61 @@
+"""Run the benchmarks: python -m benchmarks [--scale small] [--save-baseline]"""
+import argparse
+import sys
+import tempfile
+from typing import List, Optional
+
+from .benchmark import SCALES, Baseline, Benchmark, Result
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("-s", "--scale", help="size of the generated files (default: all)", action="append",
+                        choices=list(SCALES.keys()))
+    parser.add_argument("-r", "--repeat", help="number of timings to take the best of", type=int, default=5)
+    parser.add_argument("-b", "--baseline", help="baseline file", default=Baseline.default_path())
+    parser.add_argument("--save-baseline", help="store these timings as the baseline", action="store_true")
+    parser.add_argument("-t", "--threshold", help="flag timings this many times slower than the baseline",
+                        type=float, default=1.25)
+    parser.add_argument("-k", "--filter", help="only run benchmarks whose name contains this", default=None)
+    return parser
+
+
+def report(result: Result, threshold: float) -> bool:
+    """Print a result, returning True if it is a regression"""
+    regression = result.ratio is not None and result.ratio > threshold
+    comparison = "{0:6.2f}x baseline{1}".format(result.ratio, "  REGRESSION" if regression else "") \
+        if result.ratio is not None else "no baseline"
+    print("{0:<45} {1:12.6f}s  {2}".format(result.name, result.seconds, comparison))
+    return regression
+
+
+def main(args: Optional[List[str]]=None) -> int:
+    parsed = get_argument_parser().parse_args(args)
+    baseline = Baseline(parsed.baseline)
+    results: List[Result] = []
+    regressions = 0
+
+    for scale_name in parsed.scale or list(SCALES.keys()):
+        with tempfile.TemporaryDirectory() as directory:
+            benchmark = Benchmark(scale_name, directory)
+            for case in benchmark.cases():
+                name = "{0}: {1}".format(scale_name, case.name)
+                if parsed.filter is not None and parsed.filter not in name:
+                    continue
+                result = Result(name, benchmark.measure(case, parsed.repeat), baseline.get(name))
+                results.append(result)
+                if report(result, parsed.threshold):
+                    regressions += 1
+
+    if parsed.save_baseline:
+        baseline.save(results)
+        print("Baseline saved to {0}".format(parsed.baseline))
+    elif regressions > 0:
+        print("{0} benchmark(s) more than {1}x slower than the baseline".format(regressions, parsed.threshold))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Timing createm4b's parsers against synthetic files, and comparing the timings with a baseline"""
+import json
+import os
+import platform
+import timeit
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from createm4b.flac import Flac
+from createm4b.mp3 import Mp3, Mp3Validator
+from createm4b.mp3.id3 import ID3
+from . import fixtures
+
+try:
+    from createm4b.book import Book
+except ImportError:  # pragma: no cover
+    # Book needs ffmpeg-python
+    Book = None
+
+
+class Scale(NamedTuple):
+    mp3_frames: int
+    picture_size: int
+    comment_count: int
+    book_files: int
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[], object]
+
+
+class Result(NamedTuple):
+    name: str
+    seconds: float
+    baseline: Optional[float]
+
+    @property
+    def ratio(self) -> Optional[float]:
+        return self.seconds / self.baseline if self.baseline else None
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(mp3_frames=1000, picture_size=64 * 1024, comment_count=10, book_files=5),
+    "medium": Scale(mp3_frames=10000, picture_size=1024 * 1024, comment_count=100, book_files=20),
+    "large": Scale(mp3_frames=100000, picture_size=8 * 1024 * 1024, comment_count=1000, book_files=60)
+}
+
+
+class Benchmark:
+    """Writes the synthetic files for one scale, and times each parser on them"""
+
+    @property
+    def scale_name(self) -> str:
+        return self.__scale_name
+
+    def cases(self) -> List[Case]:
+        return self.__cases
+
+    def measure(self, case: Case, repeat: int) -> float:
+        """Best time for one run of a case, in seconds"""
+        timer = timeit.Timer(case.run)
+        (number, _) = timer.autorange()
+        return min(timer.repeat(repeat, number)) / number
+
+    def __write(self, name: str, data: bytes) -> str:
+        file_name = os.path.join(self.__directory, name)
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return file_name
+
+    @staticmethod
+    def __read_id3(file_name: str):
+        with open(file_name, "rb") as f:
+            return ID3.read_id3(f)
+
+    @staticmethod
+    def __read_flac(file_name: str):
+        return list(Flac.get_metadata(file_name))
+
+    def __init__(self, scale_name: str, directory: str):
+        self.__scale_name = scale_name
+        self.__directory = directory
+        scale = SCALES[scale_name]
+
+        tag = fixtures.id3v2_tag(3, scale.picture_size)
+        cbr = self.__write("cbr.mp3", tag + fixtures.mp3_stream(scale.mp3_frames))
+        cbr_scan = self.__write("cbr-scan.mp3", tag + fixtures.mp3_stream(scale.mp3_frames, xing=False))
+        vbr_scan = self.__write("vbr-scan.mp3", tag + fixtures.mp3_stream(scale.mp3_frames, vbr=True, xing=False))
+        id3 = {version: self.__write("id3v2.{0}.mp3".format(version),
+                                     fixtures.id3v2_tag(version, scale.picture_size) + fixtures.mp3_stream(10))
+               for version in (2, 3, 4)}
+        flac = self.__write("book.flac", fixtures.flac_file(picture_size=scale.picture_size,
+                                                            comment_count=scale.comment_count))
+
+        self.__cases = [
+            Case("Mp3Validator cbr xing", lambda: Mp3Validator().probe_file(cbr)),
+            Case("Mp3Validator cbr scan", lambda: Mp3Validator().probe_file(cbr_scan)),
+            Case("Mp3Validator vbr scan", lambda: Mp3Validator().probe_file(vbr_scan)),
+            Case("Mp3.duration vbr scan", lambda: Mp3(Mp3Validator(), vbr_scan).duration)
+        ]
+        self.__cases += [Case("ID3.read_id3 v2.{0}".format(version), lambda f=file_name: Benchmark.__read_id3(f))
+                         for (version, file_name) in id3.items()]
+        self.__cases.append(Case("Flac.get_metadata", lambda: Benchmark.__read_flac(flac)))
+
+        if Book is not None:
+            chapter = tag + fixtures.mp3_stream(scale.mp3_frames // 10)
+            book = [self.__write("chapter{0:03}.mp3".format(i), chapter) for i in range(scale.book_files)]
+            self.__cases.append(Case("Book.__init__ {0} files".format(len(book)), lambda: Book(book)))
+
+
+class Baseline:
+    """Timings from an earlier run, stored as JSON"""
+
+    @staticmethod
+    def default_path() -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        return self.__timings
+
+    def get(self, name: str) -> Optional[float]:
+        return self.__timings.get(name)
+
+    def save(self, results: List[Result]):
+        self.__timings.update({result.name: result.seconds for result in results})
+        with open(self.__path, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "timings": self.__timings}, f, indent=2, sort_keys=True)
+
+    def __init__(self, path: str):
+        self.__path = path
+        self.__timings: Dict[str, float] = {}
+        try:
+            with open(path) as f:
+                self.__timings = json.load(f)["timings"]
+        except (OSError, ValueError, KeyError):
+            pass
@@ -0,0 +1,103 @@
+"""Generators for synthetic mp3, id3 and flac files, so benchmarks need neither ffmpeg nor real audio"""
+import itertools
+from typing import Dict, List, Optional
+
+# MPEG-1 Layer III, 44100Hz, joint stereo frame headers and their frame lengths (144 * bitrate / sample rate)
+CBR_FRAME = (b"\xff\xfb\x90\x40", 417)
+VBR_FRAMES = [(b"\xff\xfb\x50\x40", 208), (b"\xff\xfb\x90\x40", 417), (b"\xff\xfb\xb0\x40", 626),
+              (b"\xff\xfb\xe0\x40", 1044)]
+SAMPLES_PER_FRAME = 1152
+SAMPLE_RATE = 44100
+
+# Offset of the Xing header in an MPEG-1 stereo frame: the header plus 32 bytes of side information
+XING_OFFSET = 36
+
+
+def syncsafe(value: int) -> bytes:
+    return ((value & 0x7f) | (value & 0x3f80) << 1 | (value & 0x1fc000) << 2 | (value & 0xfe00000) << 3) \
+        .to_bytes(4, "big")
+
+
+def mp3_frame(header: bytes, length: int) -> bytes:
+    return header + b"\x55" * (length - 4)
+
+
+def mp3_stream(frame_count: int, vbr: bool=False, xing: bool=True) -> bytes:
+    """A stream of frame_count audio frames, optionally preceded by a Xing (VBR) or Info (CBR) header frame"""
+    frames = VBR_FRAMES if vbr else [CBR_FRAME]
+    audio = b"".join(mp3_frame(header, length) for (header, length) in
+                     itertools.islice(itertools.cycle(frames), frame_count))
+    if not xing:
+        return audio
+
+    (header, length) = CBR_FRAME
+    tag = b"Xing" if vbr else b"Info"
+    body = b"\0" * (XING_OFFSET - 4) + tag + b"\0\0\0\x03" + frame_count.to_bytes(4, "big") + \
+        (len(audio) + length).to_bytes(4, "big")
+    # LAME extension: 576 samples of encoder delay, 1000 of padding
+    body += b"LAME3.100" + b"\0" * 12 + bytes([576 >> 4, (576 & 0xf) << 4 | 1000 >> 8, 1000 & 0xff])
+    return header + body + b"\0" * (length - 4 - len(body)) + audio
+
+
+def mp3_duration(frame_count: int, xing: bool=True) -> float:
+    """Duration Mp3Validator should find for mp3_stream(frame_count, xing=xing)"""
+    samples = frame_count * SAMPLES_PER_FRAME - (1576 if xing else 0)
+    return float(samples) / SAMPLE_RATE
+
+
+def id3v2_frame(version: int, frame_id: str, body: bytes) -> bytes:
+    if version == 2:
+        return frame_id.encode("latin-1") + len(body).to_bytes(3, "big") + body
+    size = syncsafe(len(body)) if version == 4 else len(body).to_bytes(4, "big")
+    return frame_id.encode("latin-1") + size + b"\0\0" + body
+
+
+def id3v2_tag(version: int, picture_size: int=0, text: Optional[Dict[str, str]]=None, padding: int=0) -> bytes:
+    """An id3v2.2, 2.3 or 2.4 tag with text frames and an attached picture of picture_size bytes"""
+    text = text or {"title": "Chapter 1", "artist": "Author", "album": "Book", "track": "1/10"}
+    frame_ids = {"title": ("TT2", "TIT2"), "artist": ("TP1", "TPE1"), "album": ("TAL", "TALB"),
+                 "track": ("TRK", "TRCK")}
+
+    frames: List[bytes] = []
+    for (name, value) in text.items():
+        frame_id = frame_ids[name][0 if version == 2 else 1]
+        frames.append(id3v2_frame(version, frame_id, b"\x03" + value.encode("utf8") if version == 4
+                                  else b"\0" + value.encode("latin-1")))
+
+    if picture_size > 0:
+        image = b"\xff\xd8\xff\xe0" + b"\x42" * (picture_size - 4)
+        if version == 2:
+            frames.append(id3v2_frame(2, "PIC", b"\0JPG\x03cover\0" + image))
+        else:
+            frames.append(id3v2_frame(version, "APIC", b"\0image/jpeg\0\x03cover\0" + image))
+
+    body = b"".join(frames) + b"\0" * padding
+    return b"ID3" + bytes([version, 0, 0]) + syncsafe(len(body)) + body
+
+
+def flac_block(block_type: int, body: bytes, last: bool=False) -> bytes:
+    return bytes([block_type | (0x80 if last else 0)]) + len(body).to_bytes(3, "big") + body
+
+
+def flac_file(total_samples: int=SAMPLE_RATE * 60, picture_size: int=0, comment_count: int=4, padding: int=8192,
+              audio_size: int=65536) -> bytes:
+    """A flac with STREAMINFO, VORBIS_COMMENT, PICTURE and PADDING blocks, followed by audio_size bytes of frames"""
+    stream_info = (4096).to_bytes(2, "big") * 2 + b"\0" * 6 + \
+        (SAMPLE_RATE << 44 | 1 << 41 | 15 << 36 | total_samples).to_bytes(8, "big") + b"\0" * 16
+
+    comments = ["TITLE=Chapter 1", "ARTIST=Author", "ALBUM=Book", "TRACKNUMBER=1"]
+    comments += ["COMMENT{0}={1}".format(i, "x" * 64) for i in range(max(comment_count - len(comments), 0))]
+    vendor = b"createm4b benchmarks"
+    vorbis = len(vendor).to_bytes(4, "little") + vendor + len(comments).to_bytes(4, "little") + \
+        b"".join(len(c.encode("utf8")).to_bytes(4, "little") + c.encode("utf8") for c in comments)
+
+    blocks = [flac_block(0, stream_info), flac_block(4, vorbis)]
+    if picture_size > 0:
+        mime = b"image/jpeg"
+        picture = (3).to_bytes(4, "big") + len(mime).to_bytes(4, "big") + mime + b"\0" * 4 + \
+            b"\0\0\x02\0" * 2 + (24).to_bytes(4, "big") + b"\0" * 4 + picture_size.to_bytes(4, "big") + \
+            b"\x42" * picture_size
+        blocks.append(flac_block(6, picture))
+    blocks.append(flac_block(1, b"\0" * padding, last=True))
+
+    return b"fLaC" + b"".join(blocks) + b"\xff\xf8" + b"\0" * (audio_size - 2)
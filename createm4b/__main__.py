@@ -1,12 +1,19 @@
 """Main entry point"""
 
 import sys
-import tempfile
 import shutil
 from typing import Optional, List
 
+from . import util
 from .runtime import RuntimeContext
 from .book import Book
+from .conversionpipeline import ConversionPipeline
+from .diskspaceerror import DiskSpaceError
+from .fileaccess import FileAccess
+from .mp4 import Mp4Error
+from .probeerror import ProbeError
+from .probecache import ProbeCache
+from .segmentcache import SegmentCache
 
 
 def setup_environment(context):
@@ -14,7 +21,7 @@ def setup_environment(context):
     context.print_unlessquiet("Creating environment for conversion")
 
     # Create a tempdir to work in
-    context.working_directory = tempfile.mkdtemp()
+    context.working_directory = util.create_working_directory(context.output_file, context.scratch_directory)
     context.print_veryverbose("Working dir: {0}".format(context.working_directory))
 
 
@@ -29,17 +36,54 @@ def main(args: Optional[List[str]]=None):
     args = args or sys.argv[1:]
 
     context = RuntimeContext(args)
+    context.print_verbose("Resource plan: {0}".format(context.resource_plan.describe()))
+    probe_cache = None
     try:
         setup_environment(context)
-        book = Book(context.input_files, context.cover_image, context.sort)
+        if context.probe_cache_file is not None:
+            probe_cache = ProbeCache(context.probe_cache_file, context.probe_cache_size)
+            if context.clear_probe_cache:
+                context.print_verbose("Clearing probe cache")
+                probe_cache.clear()
 
-        context.print_veryverbose("Input file durations (this may take some time):")
+        segment_cache = None
+        if context.segment_cache_directory is not None:
+            segment_cache = SegmentCache(context.segment_cache_directory, context.segment_cache_size)
+            if context.clear_segment_cache:
+                context.print_verbose("Clearing segment cache")
+                segment_cache.clear()
+
+        if ConversionPipeline.can_overlap(context):
+            # The pipeline probes on a thread of its own, which needs its own connection to the probe cache
+            if probe_cache is not None:
+                probe_cache.close()
+                probe_cache = None
+            ConversionPipeline(context, segment_cache).run()
+            return
+
+        book = Book(context.input_files, context.cover_image, context.sort, probe_cache,
+                    context.probe_workers, context.probe_processes, segment_cache)
+
+        context.print_veryverbose("Input file durations:")
         if context.is_veryverbose:
             for mp3 in book.audio_list:
-                context.print_veryverbose("{0} (duration: {1})".format(mp3.title, mp3.duration))
+                context.print_veryverbose("{0} (duration: {1}, from {2})".format(mp3.title, mp3.duration,
+                                                                                 mp3.duration_source))
+        if not context.probe_processes:
+            files = FileAccess.default()
+            context.print_veryverbose("Probing opened {0} files and read {1} bytes".format(files.opens,
+                                                                                         files.bytes_read))
 
-        book.convert(context.output_file, context)
+        if context.append:
+            book.append(context.output_file, context)
+        else:
+            book.convert(context.output_file, context)
+    except (DiskSpaceError, Mp4Error, ProbeError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
     finally:
+        if probe_cache is not None:
+            probe_cache.close()
         cleanup(context)
 
 
@@ -15,6 +15,31 @@ class AudioSource(ABC):  # pragma: no cover
     def duration(self) -> float:
         pass
 
+    @property
+    @abstractmethod
+    def stream_duration(self) -> float:
+        pass
+
+    @property
+    @abstractmethod
+    def duration_source(self) -> Optional[str]:
+        pass
+
+    @property
+    @abstractmethod
+    def sample_rate(self) -> Optional[int]:
+        pass
+
+    @property
+    @abstractmethod
+    def channels(self) -> Optional[int]:
+        pass
+
+    @property
+    @abstractmethod
+    def codec(self) -> Optional[str]:
+        pass
+
     @property
     @abstractmethod
     def file_name(self) -> str:
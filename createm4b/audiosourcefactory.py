@@ -1,20 +1,124 @@
 """Factory for creating audio source instances"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
 from .flac import Flac
 from .mp3 import Mp3
+from .mp4 import Mp4
 from .audiosource import AudioSource
+from .fileaccess import FileAccess
+from .fileprober import FileProber
 from .filevalidator import FileValidator
+from .probeerror import ProbeError
+from .proberesult import ProbeResult
+from .probecache import ProbeCache
 
 
 class AudioSourceFactory:
     def get_audio_source(self, file_name: str) -> AudioSource:
-        # TODO: Mp3.is_valid gets called twice, once here, once in Mp3.__init__.
-        if self.__mp3_validator.is_valid(file_name):
+        probe_result = self.__probe_cache.get(file_name) if self.__probe_cache is not None else None
+        reasons: List[str] = []
+        if probe_result is None:
+            probe_result = self.__probe(file_name, reasons)
+            if probe_result is not None and self.__probe_cache is not None:
+                self.__probe_cache.store(probe_result)
+
+        if probe_result is not None:
+            return self.__create(file_name, probe_result)
+
+        # Validators that can't probe are asked directly, and the file is probed when it's first used
+        if not isinstance(self.__mp3_validator, FileProber) and self.__mp3_validator.is_valid(file_name):
             return Mp3(self.__mp3_validator, file_name)
-        if self.__flac_validator.is_valid(file_name):
+        if not isinstance(self.__flac_validator, FileProber) and self.__flac_validator.is_valid(file_name):
             return Flac(self.__flac_validator, file_name)
+        if self.__mp4_validator is not None and not isinstance(self.__mp4_validator, FileProber) and \
+                self.__mp4_validator.is_valid(file_name):
+            return Mp4(self.__mp4_validator, file_name)
 
+        if len(reasons) > 0:
+            # ProbeError puts the file name in front of this
+            raise Exception("Unsupported format: {0}".format("; ".join(reasons)))
         raise Exception("Error loading file {0}".format(file_name))
 
-    def __init__(self, mp3_validator: FileValidator, flac_validator: FileValidator):
+    def get_audio_sources(self, file_names: List[str], workers: int=1, use_processes: bool=False) \
+            -> List[AudioSource]:
+        """Create audio sources for many files, probing the ones that aren't cached in parallel
+
+        Threads suit inputs on slow or network storage; processes suit mp3s that need a full frame scan.
+        The result is in the same order as file_names.
+
+        :raises ProbeError: listing every file that could not be loaded
+        """
+        sources: List[Optional[AudioSource]] = [None] * len(file_names)
+        errors: Dict[str, Exception] = {}
+
+        uncached = []
+        for (index, file_name) in enumerate(file_names):
+            probe_result = self.__probe_cache.get(file_name) if self.__probe_cache is not None else None
+            if probe_result is not None:
+                sources[index] = self.__create(file_name, probe_result)
+            else:
+                uncached.append(index)
+
+        # The probe cache stays on this thread; workers get a factory without one
+        factory = AudioSourceFactory(self.__mp3_validator, self.__flac_validator, mp4_validator=self.__mp4_validator)
+        if workers > 1 and len(uncached) > 1:
+            executor: Executor = ProcessPoolExecutor(workers) if use_processes else ThreadPoolExecutor(workers)
+            with executor:
+                futures = [(index, executor.submit(factory.get_audio_source, file_names[index]))
+                           for index in uncached]
+            for (index, future) in futures:
+                try:
+                    sources[index] = future.result()
+                except Exception as e:
+                    errors[file_names[index]] = e
+        else:
+            for index in uncached:
+                try:
+                    sources[index] = factory.get_audio_source(file_names[index])
+                except Exception as e:
+                    errors[file_names[index]] = e
+
+        if len(errors) > 0:
+            raise ProbeError(errors)
+
+        if self.__probe_cache is not None and self.__can_probe:
+            for index in uncached:
+                self.__probe_cache.store(sources[index].probe_result)
+
+        return sources
+
+    def __create(self, file_name: str, probe_result: ProbeResult) -> AudioSource:
+        if probe_result.format == "mp3":
+            return Mp3(self.__mp3_validator, file_name, probe_result)
+        if probe_result.format == "mp4":
+            return Mp4(self.__mp4_validator, file_name, probe_result)
+        return Flac(self.__flac_validator, file_name, probe_result)
+
+    def __probe(self, file_name: str, reasons: List[str]) -> Optional[ProbeResult]:
+        """Open the file once and let each prober look at it in turn
+
+        :param reasons: Why each prober rejected the file is added to it
+        """
+        probers = [v for v in (self.__mp3_validator, self.__flac_validator, self.__mp4_validator)
+                   if isinstance(v, FileProber)]
+        if len(probers) == 0:
+            return None
+
+        with FileAccess.default().open(file_name) as f:
+            for prober in probers:
+                f.seek(0)
+                probe_result = prober.probe(f, file_name, reasons)
+                if probe_result is not None:
+                    return probe_result
+
+        return None
+
+    def __init__(self, mp3_validator: FileValidator, flac_validator: FileValidator,
+                 probe_cache: Optional[ProbeCache]=None, mp4_validator: Optional[FileValidator]=None):
         self.__mp3_validator = mp3_validator
         self.__flac_validator = flac_validator
+        self.__mp4_validator = mp4_validator
+        self.__probe_cache = probe_cache
+        self.__can_probe = isinstance(mp3_validator, FileProber) and isinstance(flac_validator, FileProber) and \
+            (mp4_validator is None or isinstance(mp4_validator, FileProber))
@@ -0,0 +1,180 @@
+"""Batch entry point: convert many books at once"""
+import json
+import os
+import shutil
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from . import util
+from .batchcontext import BatchContext
+from .batcherror import BatchError
+from .batchjob import BatchJob
+from .book import Book
+from .jobresult import JobResult
+from .jobscheduler import JobScheduler
+from .probecache import ProbeCache
+from .runtime import RuntimeContext
+from .segmentcache import SegmentCache
+
+
+class Batch:
+    """Converts every book of a batch, probing and encoding several at once under a JobScheduler"""
+
+    @property
+    def jobs(self) -> List[BatchJob]:
+        return self.__jobs
+
+    def run(self) -> List[JobResult]:
+        """Convert the books, returning each one's result in order"""
+        results: Dict[BatchJob, JobResult] = {}
+        contexts: Dict[BatchJob, RuntimeContext] = {}
+        outputs: Dict[str, BatchJob] = {}
+        for job in self.__jobs:
+            if job.output_file in outputs:
+                results[job] = JobResult(job, "Same output file as {0}".format(outputs[job.output_file].name))
+                self.__report(results[job])
+                continue
+            outputs[job.output_file] = job
+
+            context = self.__create_context(job)
+            if context is None:
+                results[job] = JobResult(job, "Invalid createm4b arguments")
+                self.__report(results[job])
+                continue
+            contexts[job] = context
+
+        self.__contexts = contexts
+        self.__clear_caches()
+
+        scheduled = [job for job in self.__jobs if job in contexts]
+        scheduler = JobScheduler(self.__context.cpus, self.__context.disk_jobs)
+        self.__context.print_verbose("Converting {0} books using {1} CPUs ({2} per book), probing {3} at a time".format(
+            len(scheduled), scheduler.cpu_slots, self.__cpus_per_book, scheduler.disk_slots))
+        for result in scheduler.run(scheduled, self.__probe, self.__convert, self.__weight, self.__report):
+            results[result.job] = result
+
+        return [results[job] for job in self.__jobs]
+
+    def __create_context(self, job: BatchJob) -> Optional[RuntimeContext]:
+        """Parse the createm4b arguments for a book, or return None if they are invalid"""
+        # Progress lines from books converted side by side would overwrite each other
+        arguments = ["--progress", "none", "--cpus", str(self.__cpus_per_book)]
+        book_verbosity = self.__context.verbosity - 2
+        arguments.extend(["-q"] if book_verbosity < 0 else ["-v"] * book_verbosity)
+
+        os.makedirs(os.path.dirname(job.output_file), exist_ok=True)
+        try:
+            return RuntimeContext(job.get_arguments(arguments + self.__context.book_arguments))
+        except SystemExit:
+            # argparse has already explained what's wrong
+            return None
+
+    def __clear_caches(self):
+        """Clear the caches once before starting, rather than as each book starts"""
+        for probe_cache_file in {c.probe_cache_file for c in self.__contexts.values() if c.clear_probe_cache}:
+            if probe_cache_file is not None:
+                self.__context.print_verbose("Clearing probe cache {0}".format(probe_cache_file))
+                probe_cache = ProbeCache(probe_cache_file)
+                probe_cache.clear()
+                probe_cache.close()
+
+        for directory in {c.segment_cache_directory for c in self.__contexts.values() if c.clear_segment_cache}:
+            if directory is not None:
+                self.__context.print_verbose("Clearing segment cache {0}".format(directory))
+                SegmentCache(directory).clear()
+
+    def __probe(self, job: BatchJob) -> Book:
+        context = self.__contexts[job]
+        self.__context.print_verbose("Probing {0}".format(job.name))
+        probe_cache = ProbeCache(context.probe_cache_file, context.probe_cache_size) \
+            if context.probe_cache_file is not None else None
+        segment_cache = SegmentCache(context.segment_cache_directory, context.segment_cache_size) \
+            if context.segment_cache_directory is not None else None
+        try:
+            return Book(context.input_files, context.cover_image, context.sort, probe_cache, context.probe_workers,
+                        context.probe_processes, segment_cache)
+        finally:
+            if probe_cache is not None:
+                probe_cache.close()
+
+    def __convert(self, job: BatchJob, book: Book):
+        context = self.__contexts[job]
+        self.__context.print_verbose("Converting {0}".format(job.name))
+        context.working_directory = util.create_working_directory(context.output_file, context.scratch_directory)
+        try:
+            book.convert(context.output_file, context)
+        finally:
+            shutil.rmtree(context.working_directory, ignore_errors=True)
+
+        if not os.path.isfile(context.output_file) or os.path.getsize(context.output_file) == 0:
+            raise BatchError("ffmpeg didn't write {0}".format(context.output_file))
+
+    def __weight(self, job: BatchJob) -> int:
+        """Number of CPUs a book's threads and encode jobs were planned for"""
+        return self.__contexts[job].resource_plan.cpus
+
+    def __report(self, result: JobResult):
+        job = result.job
+        with self.__lock:
+            self.__finished += 1
+            progress = "[{0}/{1}]".format(self.__finished, len(self.__jobs))
+        if result.succeeded:
+            self.__context.print_unlessquiet("{0} Converted {1} to {2} ({3:.1f}s)".format(
+                progress, job.name, job.output_file, result.seconds))
+        else:
+            self.__context.print_unlessquiet("{0} FAILED {1}: {2}".format(progress, job.name, result.error))
+
+    def __init__(self, context: BatchContext, jobs: List[BatchJob]):
+        self.__context = context
+        self.__jobs = jobs
+        self.__contexts: Dict[BatchJob, RuntimeContext] = {}
+        self.__lock = threading.Lock()
+        self.__finished = 0
+
+        # Books get an equal share of the CPUs, so as many as possible can be converted at once
+        self.__cpus_per_book = max(context.cpus // max(min(len(jobs), context.cpus), 1), 1)
+
+
+def write_report(file_name: str, results: List[JobResult]):
+    """Write the outcome of each book as JSON"""
+    with open(file_name, "w", encoding="utf8") as f:
+        json.dump([{"name": result.job.name,
+                    "output": result.job.output_file,
+                    "status": "ok" if result.succeeded else "failed",
+                    "error": result.error,
+                    "seconds": round(result.seconds, 1)} for result in results], f, indent=2)
+
+
+def main(args: Optional[List[str]]=None) -> int:
+    """Batch entry point"""
+    args = args or sys.argv[1:]
+
+    context = BatchContext(args)
+    try:
+        jobs: List[BatchJob] = []
+        if context.manifest is not None:
+            jobs.extend(BatchJob.read_manifest(context.manifest, context.output_directory))
+        for directory in context.directories:
+            jobs.extend(BatchJob.find_books(directory, context.output_directory))
+    except BatchError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if len(jobs) == 0:
+        context.print_unlessquiet("No books found")
+        return 0
+
+    results = Batch(context, jobs).run()
+    if context.report_file is not None:
+        write_report(context.report_file, results)
+
+    failed = [result for result in results if not result.succeeded]
+    context.print_unlessquiet("Converted {0} of {1} books".format(len(results) - len(failed), len(results)))
+    for result in failed:
+        context.print_unlessquiet("\tFailed: {0}".format(result.job.name))
+    return 1 if len(failed) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Runtime context for batch conversions"""
+import argparse
+import os
+import shlex
+import threading
+from typing import List, Optional
+
+from .resourceplan import ResourcePlan
+
+
+class BatchContext:
+    """Options for converting many books at once"""
+
+    __print_lock = threading.Lock()
+
+    def print_unlessquiet(self, string: str):
+        if self.__verbosity >= 0:
+            with self.__print_lock:
+                print(string)
+
+    def print_verbose(self, string: str):
+        if self.__verbosity > 0:
+            with self.__print_lock:
+                print(string)
+
+    @property
+    def verbosity(self) -> int:
+        """-1 if quiet, otherwise the number of times --verbose was given"""
+        return self.__verbosity
+
+    @property
+    def manifest(self) -> Optional[str]:
+        return self.__manifest
+
+    @property
+    def directories(self) -> List[str]:
+        """Directory trees to find books in"""
+        return self.__directories
+
+    @property
+    def output_directory(self) -> str:
+        return self.__output_directory
+
+    @property
+    def cpus(self) -> int:
+        """Number of CPUs the books being encoded may use between them"""
+        return self.__cpus
+
+    @property
+    def disk_jobs(self) -> int:
+        """Number of books to probe at once"""
+        return self.__disk_jobs
+
+    @property
+    def book_arguments(self) -> List[str]:
+        """createm4b arguments used for every book"""
+        return self.__book_arguments
+
+    @property
+    def report_file(self) -> Optional[str]:
+        """Where to write a JSON report of each book's outcome"""
+        return self.__report_file
+
+    @staticmethod
+    def __get_argument_parser() -> argparse.ArgumentParser:
+        parser = argparse.ArgumentParser(prog="createm4b-batch",
+                                         description="Convert many books, each a directory of audio files or an "
+                                                     "entry in a manifest, to m4b files")
+
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("-v", "--verbose", help="increase verbosity (-vv also shows each book's messages)",
+                           action="count", default=0)
+        group.add_argument("-q", "--quiet", help="be very quiet", action="store_true")
+        parser.add_argument("-m", "--manifest", help="JSON list of books to convert", default=None)
+        parser.add_argument("-o", "--output-directory", help="directory to write the books to (default: current)",
+                            default=os.curdir)
+        parser.add_argument("--cpus", help="number of CPUs to use for encoding, shared between the books being "
+                                           "converted (default: detected, including affinity and cgroup "
+                                           "limits)", type=int, default=None)
+        parser.add_argument("--disk-jobs", help="number of books to read and probe at once", type=int, default=2)
+        parser.add_argument("--book-args", help="createm4b options for every book, as one string "
+                                                "(e.g. --book-args=\"--copy-mp3 -j 2\")", default="")
+        parser.add_argument("--report", help="write each book's outcome to this file as JSON", default=None)
+        parser.add_argument("directories", metavar="directory", help="directory tree holding one book per "
+                                                                     "directory of audio files", nargs="*")
+
+        return parser
+
+    def __init__(self, args: List[str]):
+        parser = self.__get_argument_parser()
+        parsed = parser.parse_args(args)
+        if parsed.manifest is None and len(parsed.directories) == 0:
+            parser.error("a manifest or at least one directory is required")
+
+        self.__verbosity = -1 if parsed.quiet else parsed.verbose
+        self.__manifest = parsed.manifest
+        self.__directories = parsed.directories
+        self.__output_directory = os.path.realpath(parsed.output_directory)
+        self.__cpus = max(parsed.cpus, 1) if parsed.cpus is not None else ResourcePlan.detect_cpus()[0]
+        self.__disk_jobs = max(parsed.disk_jobs, 1)
+        self.__book_arguments = shlex.split(parsed.book_args)
+        self.__report_file = parsed.report
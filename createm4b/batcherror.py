@@ -0,0 +1,3 @@
+class BatchError(Exception):
+    """A batch manifest or book directory can't be turned into jobs"""
+    pass
@@ -0,0 +1,119 @@
+"""A book to convert as part of a batch"""
+import json
+import os
+import re
+from typing import List, Optional
+
+from .batcherror import BatchError
+
+
+class BatchJob:
+    """The input files, cover and output file of one book, from a manifest or a directory of audio files"""
+
+    AUDIO_EXTENSIONS = (".mp3", ".flac", ".m4a", ".mp4")
+    COVER_NAMES = ("cover.jpg", "cover.jpeg", "cover.png", "folder.jpg", "folder.png", "front.jpg", "front.png")
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def input_files(self) -> List[str]:
+        return self.__input_files
+
+    @property
+    def output_file(self) -> str:
+        return self.__output_file
+
+    @property
+    def cover_image(self) -> Optional[str]:
+        return self.__cover_image
+
+    @property
+    def arguments(self) -> List[str]:
+        """Extra createm4b arguments for this book only"""
+        return self.__arguments
+
+    def get_arguments(self, book_arguments: List[str]) -> List[str]:
+        """createm4b arguments to convert this book, after the ones shared by every book in the batch"""
+        args = list(book_arguments) + self.__arguments + ["-o", self.__output_file]
+        if self.__cover_image is not None:
+            args.extend(["-c", self.__cover_image])
+        return args + self.__input_files
+
+    @staticmethod
+    def read_manifest(file_name: str, output_directory: str) -> List["BatchJob"]:
+        """Read the books listed in a JSON manifest
+
+        The manifest is a list of books (or an object with a "books" list), each with a list of "inputs" and
+        optionally an "output", a "cover", a "name" and a list of extra createm4b "args".  Relative input and cover
+        paths are relative to the manifest, relative outputs to output_directory.
+
+        :raises BatchError: if the manifest can't be read
+        """
+        try:
+            with open(file_name, encoding="utf8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise BatchError("Can't read manifest {0}: {1}".format(file_name, e))
+
+        books = manifest.get("books") if isinstance(manifest, dict) else manifest
+        if not isinstance(books, list):
+            raise BatchError("Manifest {0} has no list of books".format(file_name))
+
+        base = os.path.dirname(os.path.abspath(file_name))
+        jobs = []
+        for (i, book) in enumerate(books):
+            inputs = book.get("inputs") if isinstance(book, dict) else None
+            if not isinstance(inputs, list) or len(inputs) == 0:
+                raise BatchError("Book {0} in manifest {1} has no inputs".format(i + 1, file_name))
+
+            input_files = [os.path.join(base, f) for f in inputs]
+            name = book.get("name") or os.path.basename(os.path.dirname(input_files[0]))
+            output_file = os.path.join(output_directory, book.get("output") or name + ".m4b")
+            cover_image = os.path.join(base, book["cover"]) if book.get("cover") else None
+            jobs.append(BatchJob(name, input_files, output_file, cover_image, [str(a) for a in book.get("args", [])]))
+
+        return jobs
+
+    @staticmethod
+    def find_books(directory: str, output_directory: str) -> List["BatchJob"]:
+        """Find the books in a directory tree: every directory that holds audio files is one book
+
+        Each book's files are taken in natural name order ("2" before "10"), a cover.jpg, folder.jpg or similar image
+        in the directory is used as the cover, and the book is written to output_directory, keeping its path
+        relative to directory.
+        """
+        directory = os.path.abspath(directory)
+        if not os.path.isdir(directory):
+            raise BatchError("{0} is not a directory".format(directory))
+
+        jobs = []
+        for (path, directory_names, file_names) in os.walk(directory):
+            directory_names.sort(key=BatchJob.__natural_key)
+            input_files = sorted((f for f in file_names if f.lower().endswith(BatchJob.AUDIO_EXTENSIONS)),
+                                 key=BatchJob.__natural_key)
+            if len(input_files) == 0:
+                continue
+
+            relative_path = os.path.relpath(path, directory)
+            if relative_path == os.curdir:
+                relative_path = os.path.basename(directory)
+            covers = {f.lower(): f for f in file_names}
+            cover_image = next((os.path.join(path, covers[c]) for c in BatchJob.COVER_NAMES if c in covers), None)
+            jobs.append(BatchJob(relative_path, [os.path.join(path, f) for f in input_files],
+                                 os.path.join(output_directory, relative_path + ".m4b"), cover_image))
+
+        return jobs
+
+    @staticmethod
+    def __natural_key(name: str) -> List[object]:
+        return [(0, int(part), "") if part.isdigit() else (1, 0, part.lower()) for part in re.split(r"(\d+)", name)]
+
+    def __init__(self, name: str, input_files: List[str], output_file: str, cover_image: Optional[str]=None,
+                 arguments: Optional[List[str]]=None):
+        self.__name = name
+        self.__input_files = input_files
+        self.__output_file = output_file
+        self.__cover_image = cover_image
+        self.__arguments = arguments or []
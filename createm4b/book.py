@@ -1,22 +1,35 @@
 """Class for encapsulating a book to be created"""
-from typing import Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional
 
 import ffmpeg
 import tempfile
 import os
-import subprocess
-from shutil import copyfile
+import shutil
 
 from .audiosource import AudioSource
 from .runtime import RuntimeContext
 from .audiosourcefactory import AudioSourceFactory
+from .coverimage import CoverImage
+from .diskspacecheck import DiskSpaceCheck
+from .ffmetadata import FfMetadata
+from .ffmpegprocess import FfmpegProcess
+from .probecache import ProbeCache
+from .progressreporter import ProgressReporter
+from .segmentcache import SegmentCache
 from .mp3 import Mp3Validator
 from .flac import FlacValidator
+from .mp4 import Mp4Atom, Mp4Chapter, Mp4Error, Mp4Track, Mp4Validator, Mp4Writer
 
 
 class Book:
     """Class for encapsulating a book to be created"""
 
+    __progress: Optional[ProgressReporter] = None
+
+    # Bits per second of the AAC audio (-b:a 64k), for estimating file sizes
+    BIT_RATE: int = 64000
+
     @property
     def audio_list(self) -> List[AudioSource]:
         """Get list of mp3s associated with this book"""
@@ -27,92 +40,479 @@ class Book:
         """Get the filename for the cover image"""
         return self.__cover
 
-    # TODO: Figure out the ffmpeg arguments to do this in one pass
-    def convert(self, output_file: str, context: RuntimeContext):
-        """Convert the book to an m4b"""
+    def convert(self, output_file: str, context: RuntimeContext, encoded_audio: Optional[str]=None):
+        """Convert the book to an m4b
+
+        The m4b is written to a temporary file next to output_file, which is renamed to output_file once it is
+        complete, so output_file is never left half written.
+
+        :param encoded_audio: The book's audio, already encoded (by get_encode_arguments), to add the chapters and
+            cover to.  Unless needs_remux, it should be in a file from create_output_temporary, which becomes the
+            m4b.  The caller is expected to have checked the disk space and reported progress.
+        :raises DiskSpaceError: if there isn't enough free space for the conversion (unless the check is disabled)
+        """
         context.print_unlessquiet("Converting book to {0}...".format(output_file))
-        (tfd, temp_name) = tempfile.mkstemp(suffix=".m4a", dir=context.working_directory)
-        os.close(tfd)
+        cmd = "../ffmpeg" if os.name == "nt" else "ffmpeg"
+
+        if encoded_audio is not None and not Book.needs_remux(context):
+            self.__write_metadata(encoded_audio, cmd, context)
+            os.replace(encoded_audio, output_file)
+            return
+
+        if encoded_audio is None and context.check_space:
+            self.check_space(output_file, context)
+
+        if encoded_audio is None and context.progress_format != "none":
+            self.__progress = self.create_progress_reporter(context)
+        temp_output = Book.create_output_temporary(output_file)
+        try:
+            if encoded_audio is not None:
+                self.__remux(encoded_audio, temp_output, self.__create_metadata_file(context), cmd, context)
+            else:
+                self.__convert(temp_output, cmd, context)
+            os.replace(temp_output, output_file)
+        finally:
+            if os.path.exists(temp_output):
+                os.remove(temp_output)
+            if self.__progress is not None:
+                self.__progress.finish()
+                self.__progress = None
+
+    def append(self, output_file: str, context: RuntimeContext):
+        """Add the book to the end of output_file, a finished m4b, as new chapters
+
+        Only the new audio is encoded, at the m4b's sample rate and number of channels, and its samples are written
+        after the m4b's; the audio already in it isn't touched.
+
+        :raises DiskSpaceError: if there isn't enough free space (unless the check is disabled)
+        :raises Mp4Error: if output_file isn't an m4b with AAC audio
+        """
+        context.print_unlessquiet("Appending book to {0}...".format(output_file))
+        cmd = "../ffmpeg" if os.name == "nt" else "ffmpeg"
+
+        track = Mp4Track.read_sound_track(output_file)
+        if track.codec != "aac":
+            raise Mp4Error("Can't append to {0}: its audio is {1}, not AAC".format(output_file, track.codec))
+        with open(output_file, "rb") as f:
+            chapters = Mp4Chapter.read_chapters(f, Mp4Atom.find(f, "moov"))
+        if len(chapters) == 0:
+            chapters = [Mp4Chapter(0.0, os.path.splitext(os.path.basename(output_file))[0])]
+
+        if context.check_space:
+            audio_size = DiskSpaceCheck.estimate_audio_size(sum(audio.duration for audio in self.__audio_list),
+                                                            Book.BIT_RATE)
+            check = DiskSpaceCheck()
+            check.add(output_file, audio_size + (os.path.getsize(self.cover) if self.cover is not None else 0))
+            check.add(context.working_directory, audio_size)
+            check.check()
+
+        if context.progress_format != "none":
+            self.__progress = self.create_progress_reporter(context)
+        (fd, encoded_audio) = tempfile.mkstemp(suffix=".m4a", dir=context.working_directory)
+        os.close(fd)
+        try:
+            args = Book.get_encode_arguments([audio.file_name for audio in self.__audio_list], encoded_audio, cmd,
+                                             context, track.sample_rate, track.channels)
+            if not FfmpegProcess(args, self.__track_progress(0), show_output=context.is_veryverbose).run():
+                raise ffmpeg.Error(cmd, None, None)
+            if self.__progress is not None:
+                self.__progress.finish()
+                self.__progress = None
+
+            context.print_unlessquiet("Adding audio and chapter information...")
+            writer = Mp4Writer(output_file)
+            writer.append_audio(encoded_audio)
+            position = track.duration
+            for audio in self.__audio_list:
+                chapters.append(Mp4Chapter(position, audio.title))
+                position += audio.duration
+            writer.set_chapters(chapters)
+
+            if self.cover is not None:
+                context.print_unlessquiet("Adding cover image...")
+                cover = CoverImage(self.cover).prepare(cmd, context.cover_size)
+                with open(cover, "rb") as f:
+                    writer.set_cover(f.read())
+
+            writer.write()
+        finally:
+            os.remove(encoded_audio)
+            if self.__progress is not None:
+                self.__progress.finish()
+                self.__progress = None
+
+    @staticmethod
+    def needs_remux(context: RuntimeContext) -> bool:
+        """Whether adding the chapters and cover to encoded audio takes another ffmpeg run over the whole book
+
+        Otherwise they are written into the encoded file, rewriting nothing but its moov atom.  Only a cover stored as
+        a video stream needs ffmpeg, to encode it.
+        """
+        return context.cover_mode == "video" and context.cover_image is not None
+
+    @staticmethod
+    def create_output_temporary(output_file: str) -> str:
+        """Create a file on the output's filesystem to write the m4b into, with the permissions output_file has"""
+        (fd, temp_name) = tempfile.mkstemp(prefix=".{0}.".format(os.path.basename(output_file)), suffix=".partial",
+                                           dir=os.path.dirname(output_file))
+        os.close(fd)
+        if os.path.exists(output_file):
+            shutil.copymode(output_file, temp_name)
+        else:
+            os.chmod(temp_name, 0o644)
+        return temp_name
+
+    def create_progress_reporter(self, context: RuntimeContext) -> ProgressReporter:
+        return ProgressReporter([audio.duration for audio in self.__audio_list],
+                                [audio.title for audio in self.__audio_list], context.progress_format)
+
+    def check_space(self, output_file: str, context: RuntimeContext):
+        """Check there is room for the output and the temporary files of the conversion, before it starts
+
+        :raises DiskSpaceError: if there isn't
+        """
+        audio_size = DiskSpaceCheck.estimate_audio_size(sum(audio.duration for audio in self.__audio_list),
+                                                        Book.BIT_RATE)
+        copy_codecs = (["aac"] if context.stream_copy else []) + (["mp3"] if context.copy_mp3 else [])
+        if self.__can_copy_audio(copy_codecs):
+            # Joined as they are; a re-encode after a failed join needs less than this
+            audio_size = max(sum(os.path.getsize(audio.file_name) for audio in self.__audio_list), audio_size)
+
+        check = DiskSpaceCheck()
+        check.add(output_file, audio_size + (os.path.getsize(self.cover) if self.cover is not None else 0))
+        if Book.needs_remux(context):
+            # The audio encoded by the first of two passes
+            check.add(context.working_directory, audio_size)
+        if context.encode_jobs > 1 and len(self.__audio_list) > 1:
+            check.add(self.__segment_cache.path if self.__segment_cache is not None else context.working_directory,
+                      audio_size)
+
+        for (directory, size) in check.requirements:
+            context.print_verbose("Disk space needed in {0}: {1} bytes".format(directory, size))
+        check.check()
+
+    def __convert(self, output_file: str, cmd: str, context: RuntimeContext):
+        copy_codecs = (["aac"] if context.stream_copy else []) + (["mp3"] if context.copy_mp3 else [])
+        if self.__can_copy_audio(copy_codecs):
+            if self.__convert_stream_copy(output_file, cmd, context):
+                return
+            context.print_unlessquiet("Joining without re-encoding failed, re-encoding...")
+            self.__reset_progress()
+
+        if context.encode_jobs > 1 and len(self.__audio_list) > 1:
+            if self.__convert_segmented(output_file, cmd, context):
+                return
+            context.print_unlessquiet("Parallel conversion failed, retrying in a single pass...")
+            self.__reset_progress()
+
+        metadata_file = self.__create_metadata_file(context)
+
+        if not context.two_pass:
+            if self.__convert_single_pass(output_file, metadata_file, cmd, context):
+                return
+            context.print_unlessquiet("Single pass conversion failed, retrying in two passes...")
+            self.__reset_progress()
+
+        self.__convert_two_pass(output_file, metadata_file, cmd, context)
+
+    def __convert_single_pass(self, output_file: str, metadata_file: str, cmd: str, context: RuntimeContext) -> bool:
+        """Concatenate and encode the audio, and add the chapters and cover, with one ffmpeg run
+
+        The output is written directly to output_file.
+
+        :return: True if ffmpeg succeeded
+        """
+        args = [cmd]
+        for audio in self.__audio_list:
+            args.extend(["-i", audio.file_name])
+        metadata_input = len(self.__audio_list)
+        args.extend(["-i", metadata_file])
+
+        # The cover is an input too, so it has to come before the output options
+        args.extend(self.__cover_arguments(metadata_input + 1, cmd, context))
+        audio_count = len(self.__audio_list)
+        concat = "".join("[{0}:a:0]".format(i) for i in range(audio_count))
+        args.extend(["-filter_complex", "{0}concat=n={1}:v=0:a=1[a]".format(concat, audio_count), "-map", "[a]"])
+        args.extend(["-map_metadata", str(metadata_input), "-map_chapters", str(metadata_input),
+                     "-c:a", "aac", "-b:a", "64k", "-ar", "44100", "-threads", str(context.resource_plan.threads),
+                     "-f", "mp4", "-strict", "experimental", "-y", output_file])
+
+        context.print_verbose("ffmpeg arguments: {0}".format(args))
+        return FfmpegProcess(args, self.__track_progress(0), show_output=context.is_veryverbose).run()
+
+    def __convert_segmented(self, output_file: str, cmd: str, context: RuntimeContext) -> bool:
+        """Encode every audio source to its own AAC segment in parallel, then join the segments without re-encoding
+
+        Up to context.encode_jobs ffmpeg encoders run at once.  Segments already in the segment cache (from an
+        earlier or interrupted conversion of the same input with the same settings) are reused.
+
+        :return: True if every ffmpeg run succeeded
+        """
+        # The segments are copied into one stream, so they all need the same channel layout
+        channels = max((audio.channels for audio in self.__audio_list if audio.channels), default=None)
+        encoder_settings = ["-c:a", "aac", "-b:a", "64k", "-ar", "44100"]
+        if channels is not None:
+            encoder_settings.extend(["-ac", str(channels)])
+
+        context.print_unlessquiet("Encoding {0} files, {1} at a time...".format(len(self.__audio_list),
+                                                                               context.encode_jobs))
+        segment_directory = tempfile.mkdtemp(dir=context.working_directory)
+        starts = [sum(audio.duration for audio in self.__audio_list[:i]) for i in range(len(self.__audio_list))]
+        with ThreadPoolExecutor(max_workers=context.encode_jobs) as executor:
+            segments = list(executor.map(
+                lambda i: self.__prepare_segment(i, starts[i], encoder_settings, segment_directory, cmd, context),
+                range(len(self.__audio_list))))
+        if None in segments:
+            return False
+
+        context.print_unlessquiet("Joining encoded files...")
+        self.__reset_progress()
+        durations = []
+        for segment in segments:
+            try:
+                durations.append(Mp4Track.read_sound_track(segment).media_duration)
+            except Mp4Error as e:
+                context.print_verbose("Can't read encoded segment {0}: {1}".format(segment, e))
+                # Don't reuse it in the next conversion
+                if self.__segment_cache is not None:
+                    self.__segment_cache.remove(segment)
+                return False
+        if not self.__join(segments, durations, output_file, cmd, context):
+            return False
 
+        if self.__segment_cache is not None:
+            self.__segment_cache.trim()
+        return True
+
+    def __can_copy_audio(self, codecs: List[str]) -> bool:
+        """Whether every audio source uses the same one of codecs, and can be copied into one stream as it is"""
+        first = self.__audio_list[0]
+        return first.codec in codecs and all(audio.codec == first.codec and audio.sample_rate == first.sample_rate and
+                                             audio.channels == first.channels for audio in self.__audio_list)
+
+    def __convert_stream_copy(self, output_file: str, cmd: str, context: RuntimeContext) -> bool:
+        """Put the audio of every input into the m4b without decoding it
+
+        :return: True if ffmpeg succeeded
+        """
+        codec = self.__audio_list[0].codec
+        context.print_unlessquiet("All input files are {0}, joining them without re-encoding...".format(codec.upper()))
+        return self.__join([audio.file_name for audio in self.__audio_list],
+                           [audio.stream_duration for audio in self.__audio_list], output_file, cmd, context)
+
+    def __join(self, segments: List[str], durations: List[float], output_file: str, cmd: str,
+               context: RuntimeContext) -> bool:
+        """Join audio files with a stream copy, adding the chapters and cover
+
+        :param durations: Length of every frame in each file's audio stream.  Encoder delay and padding are included,
+            as a stream copy can't trim them, so the chapters line up exactly with the joined audio.
+        :return: True if ffmpeg succeeded
+        """
+        metadata_file = self.__create_metadata_file(context, durations)
+        list_file = self.__create_concat_list(segments, durations, context)
+
+        args = [cmd, "-f", "concat", "-safe", "0", "-i", list_file, "-i", metadata_file]
+        args.extend(self.__cover_arguments(2, cmd, context))
+        args.extend(["-map", "0:a", "-map_metadata", "1", "-map_chapters", "1", "-c:a", "copy",
+                     "-f", "mp4", "-y", output_file])
+
+        context.print_verbose("ffmpeg arguments: {0}".format(args))
+        return FfmpegProcess(args, self.__track_progress(0), show_output=context.is_veryverbose).run()
+
+    def __prepare_segment(self, index: int, start: float, encoder_settings: List[str], segment_directory: str,
+                          cmd: str, context: RuntimeContext) -> Optional[str]:
+        """Get the encoded segment for the audio source at index from the segment cache, or encode it
+
+        :param start: Position of the audio source in the book, for progress reports
+        :return: The segment's file name, or None if encoding failed
+        """
+        audio = self.__audio_list[index]
+        if self.__segment_cache is None:
+            (fd, segment) = tempfile.mkstemp(suffix=".m4a", dir=segment_directory)
+            os.close(fd)
+            return segment if self.__encode_segment(index, start, encoder_settings, segment, cmd, context) else None
+
+        key = SegmentCache.key(audio.file_name, encoder_settings)
+        segment = self.__segment_cache.get(key)
+        if segment is not None:
+            context.print_verbose("Reusing encoded {0}".format(audio.file_name))
+            if self.__progress is not None:
+                self.__progress.update(index, start, audio.duration, True)
+            return segment
+
+        temp_name = self.__segment_cache.create_temporary()
+        if not self.__encode_segment(index, start, encoder_settings, temp_name, cmd, context):
+            os.remove(temp_name)
+            return None
+        return self.__segment_cache.store(key, temp_name)
+
+    def __encode_segment(self, index: int, start: float, encoder_settings: List[str], segment: str, cmd: str,
+                         context: RuntimeContext) -> bool:
+        audio = self.__audio_list[index]
+        args = [cmd, "-nostdin", "-i", audio.file_name, "-map", "0:a:0", "-map_metadata", "-1"]
+        args.extend(encoder_settings)
+        args.extend(["-threads", str(context.resource_plan.segment_threads), "-f", "mp4", "-strict", "experimental",
+                     "-y", segment])
+
+        context.print_veryverbose("ffmpeg arguments: {0}".format(args))
+        process = FfmpegProcess(args, self.__track_progress(index, start), capture_errors=True)
+        if not process.run():
+            context.print_verbose("Encoding {0} failed: {1}".format(audio.file_name, process.errors))
+            return False
+
+        context.print_verbose("Encoded {0}".format(audio.file_name))
+        return True
+
+    @staticmethod
+    def __create_concat_list(segments: List[str], durations: List[float], context: RuntimeContext) -> str:
+        """Write an input list for ffmpeg's concat demuxer, placing each segment right after the previous one"""
+        (fd, list_file) = tempfile.mkstemp(suffix=".txt", dir=context.working_directory)
+        for (segment, duration) in zip(segments, durations):
+            os.write(fd, "file '{0}'\n".format(segment.replace("'", "'\\''")).encode("utf8"))
+            os.write(fd, "duration {0}\n".format(duration).encode("utf8"))
+
+        os.close(fd)
+        return list_file
+
+    def __convert_two_pass(self, output_file: str, metadata_file: str, cmd: str, context: RuntimeContext):
+        """Encode, then add the chapters and cover
+
+        They are written straight into the encoded output_file, unless the cover is a video stream, when the audio
+        is encoded to a temporary file and remuxed with them into output_file.
+        """
+        encoded_audio = output_file
+        if Book.needs_remux(context):
+            (tfd, encoded_audio) = tempfile.mkstemp(suffix=".m4a", dir=context.working_directory)
+            os.close(tfd)
+
+        args = Book.get_encode_arguments([audio.file_name for audio in self.__audio_list], encoded_audio, cmd, context)
+        if not FfmpegProcess(args, self.__track_progress(0), show_output=context.is_veryverbose).run():
+            raise ffmpeg.Error(cmd, None, None)
+
+        if encoded_audio == output_file:
+            self.__write_metadata(output_file, cmd, context)
+            return
+
+        self.__remux(encoded_audio, output_file, metadata_file, cmd, context)
+        os.remove(encoded_audio)
+
+    @staticmethod
+    def get_encode_arguments(input_files: List[str], output_file: str, cmd: str, context: RuntimeContext,
+                             sample_rate: int=44100, channels: Optional[int]=None) -> List[str]:
+        """ffmpeg arguments to concatenate and encode the audio of input_files, without any metadata
+
+        Only the order of the input files is needed, so the encode can start before they are probed.
+
+        :param channels: Number of channels to encode, if not the number the input files have
+        """
         f = ffmpeg
-        for i in (ffmpeg.input(mp3.file_name) for mp3 in self.__audio_list):
+        for i in (ffmpeg.input(file_name) for file_name in input_files):
             f = f.concat(i, a=1, v=0)
 
-        o = f.output(temp_name,
+        settings = {"ac": str(channels)} if channels is not None else {}
+        o = f.output(output_file,
                      acodec="aac",
                      ab="64k",
-                     ar="44100",
-                     threads=3,
+                     ar=str(sample_rate),
+                     threads=context.resource_plan.threads,
                      f="mp4",
                      map_metadata=-1,
-                     strict="experimental") \
+                     strict="experimental",
+                     **settings) \
             .overwrite_output()
 
         context.print_verbose("ffmpeg arguments: {0}".format(o.get_args()))
-        cmd = "../ffmpeg" if os.name == "nt" else "ffmpeg"
-        o.run(cmd=cmd)
+        return o.compile(cmd=cmd)
 
-        # Rebuild with the metadata and (optional) cover image
-        metadata_file = self.__create_metadata_file(context)
+    def __remux(self, encoded_audio: str, output_file: str, metadata_file: str, cmd: str, context: RuntimeContext):
+        """Copy encoded audio into output_file, adding the chapters and (optional) cover image"""
+        context.print_unlessquiet("Adding metadata and chapter information...")
+        args = [cmd, "-i", encoded_audio, "-i", metadata_file]
+        args.extend(self.__cover_arguments(2, cmd, context))
+        args.extend(["-map_metadata", "1", "-map", "0:0", "-c:a", "copy", "-f", "mp4", "-y", output_file])
+        context.print_verbose("ffmpeg arguments: {0}".format(args))
+        if not FfmpegProcess(args, show_output=context.is_veryverbose).run():
+            raise ffmpeg.Error(cmd, None, None)
 
+    def __write_metadata(self, file_name: str, cmd: str, context: RuntimeContext):
+        """Write the album tags, chapters and (attached) cover into an encoded mp4 file"""
         context.print_unlessquiet("Adding metadata and chapter information...")
-        (tfd, temp_name2) = tempfile.mkstemp(suffix=".m4a", dir=context.working_directory)
-        os.close(tfd)
-        args = [cmd, "-i", temp_name, "-i", metadata_file]
+        writer = Mp4Writer(file_name)
+        writer.set_tag("©alb", self.audio_list[0].album)
+        writer.set_tag("aART", self.audio_list[0].artist)
+
+        chapters = []
+        position = 0.0
+        for audio in self.audio_list:
+            chapters.append(Mp4Chapter(position, audio.title))
+            position += audio.duration
+        writer.set_chapters(chapters)
 
         if self.cover is not None:
+            context.print_unlessquiet("Adding cover image...")
+            cover = CoverImage(self.cover).prepare(cmd, context.cover_size)
+            context.print_verbose("Cover image: {0}".format(cover))
+            with open(cover, "rb") as f:
+                writer.set_cover(f.read())
+
+        writer.write()
+
+    def __track_progress(self, job: int, start: float=0.0) -> Optional[Callable[[float, bool], None]]:
+        return self.__progress.job(job, start) if self.__progress is not None else None
+
+    def __reset_progress(self):
+        if self.__progress is not None:
+            self.__progress.reset()
+
+    def __cover_arguments(self, cover_input: int, cmd: str, context: RuntimeContext) -> List[str]:
+        """ffmpeg arguments to add the cover image as input number cover_input and map it to the output"""
+        if self.cover is None:
+            return []
+
+        if context.cover_mode == "video":
             context.print_unlessquiet("Adding cover image (this may take some time)...")
 
             # noinspection SpellCheckingInspection
-            args.extend(["-loop", "1", "-i", self.cover,
-                         "-map", "2:0",
-                         "-c:v", "libx264", "-tune", "stillimage", "-crf", "25", "-r", "1",
-                         "-strict", "experimental",
-                         "-threads", "3",
-                         "-shortest"])
-
-        args.extend(["-map_metadata", "1", "-map", "0:0", "-c:a", "copy", "-y", temp_name2])
-        context.print_verbose("ffmpeg arguments: {0}".format(args))
-        stdout = None if context.is_veryverbose else subprocess.DEVNULL
-        subprocess.run(args, stdout=stdout)
+            return ["-loop", "1", "-i", self.cover,
+                    "-map", "{0}:0".format(cover_input),
+                    "-c:v", "libx264", "-tune", "stillimage", "-crf", "25", "-r", "1",
+                    "-strict", "experimental",
+                    "-threads", str(context.resource_plan.cover_threads),
+                    "-shortest"]
 
-        copyfile(temp_name2, output_file)
+        context.print_unlessquiet("Adding cover image...")
+        cover = CoverImage(self.cover).prepare(cmd, context.cover_size)
+        context.print_verbose("Cover image: {0}".format(cover))
 
-    def __create_metadata_file(self, context: RuntimeContext) -> str:
-        (fd, metadata_file) = tempfile.mkstemp(suffix=".txt", dir=context.working_directory)
-        # noinspection SpellCheckingInspection
-        os.write(fd, ";FFMETADATA1\n".encode("utf8"))
-        os.write(fd, "album={0}\n".format(Book.__metadata_escape(self.audio_list[0].album)).encode("utf8"))
-        os.write(fd, "album_artist={0}\n".format(Book.__metadata_escape(self.audio_list[0].artist)).encode("utf8"))
+        return ["-i", cover,
+                "-map", "{0}:0".format(cover_input),
+                "-c:v", "copy", "-disposition:v:0", "attached_pic"]
+
+    def __create_metadata_file(self, context: RuntimeContext, durations: Optional[List[float]]=None) -> str:
+        """Write the album tags and chapters in ffmpeg's metadata format
+
+        :param durations: Length of each chapter, in seconds, if not the duration of its audio source
+        """
+        if durations is None:
+            durations = [track.duration for track in self.audio_list]
 
+        metadata = FfMetadata(self.audio_list[0].album, self.audio_list[0].artist)
         position = 0
-        for track in self.audio_list:
-            os.write(fd, "\n[CHAPTER]\nTIMEBASE=1/1000\n".encode("utf8"))
-            os.write(fd, "START={0}\n".format(position).encode("utf8"))
-            position += int(track.duration * 1000)
-            os.write(fd, "END={0}\n".format(position).encode("utf8"))
-            os.write(fd, "title={0}\n".format(Book.__metadata_escape(track.title)).encode("utf8"))
-            position += 1
+        for (track, duration) in zip(self.audio_list, durations):
+            metadata.add_chapter(position, position + int(duration * 1000), track.title)
+            position += int(duration * 1000) + 1
 
+        (fd, metadata_file) = tempfile.mkstemp(suffix=".txt", dir=context.working_directory)
+        os.write(fd, metadata.format().encode("utf8"))
         os.close(fd)
         return metadata_file
 
-    @staticmethod
-    def __metadata_escape(s: Optional[str]) -> str:
-        if s is None:
-            return ""
-
-        s = s.replace("\\", "\\\\")
-        s = s.replace("=", "\\=")
-        s = s.replace(";", "\\;")
-        s = s.replace("#", "\\#")
-        s = s.replace("\n", "\\\n")
-
-        return s
-
-    def __init__(self, input_files: Iterator[str], cover_image: str=None, sort: bool=False):
-        factory = AudioSourceFactory(Mp3Validator(), FlacValidator())
-        self.__audio_list = [factory.get_audio_source(file) for file in input_files]
+    def __init__(self, input_files: Iterator[str], cover_image: str=None, sort: bool=False,
+                 probe_cache: Optional[ProbeCache]=None, probe_workers: int=1, probe_processes: bool=False,
+                 segment_cache: Optional[SegmentCache]=None):
+        factory = AudioSourceFactory(Mp3Validator(), FlacValidator(), probe_cache, Mp4Validator())
+        self.__audio_list = factory.get_audio_sources(list(input_files), probe_workers, probe_processes)
         if sort and self.__audio_list[0].track is not None:
             self.__audio_list = sorted(self.__audio_list, key=lambda a: a.track if a.track is not None else 0)
         self.__cover = cover_image
+        self.__segment_cache = segment_cache
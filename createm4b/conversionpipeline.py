@@ -0,0 +1,169 @@
+"""Encoding a book's audio while its input files are still being probed"""
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from .book import Book
+from .diskspacecheck import DiskSpaceCheck
+from .ffmpegprocess import FfmpegProcess
+from .probecache import ProbeCache
+from .progressreporter import ProgressReporter
+from .runtime import RuntimeContext
+from .segmentcache import SegmentCache
+
+
+class ConversionPipeline:
+    """Converts a book in stages run by asyncio, so that probing the input files overlaps with encoding them
+
+    Encoding the audio only needs the order of the input files, so it starts straight away, while a worker thread
+    probes the files for their tags and durations.  The chapters (which need the durations) are added by a remux of
+    the encoded audio once both are done, so a conversion takes about as long as the longer of the two rather than
+    their sum.
+    """
+
+    __progress: Optional[ProgressReporter] = None
+    __position: Optional[Tuple[float, bool]] = None
+
+    # mp3 audio is at most 320 kbit/s, so an mp3 file lasts at least this long per byte
+    __mp3_seconds_per_byte: float = 8 / 320000
+
+    @staticmethod
+    def sniff_format(file_name: str) -> str:
+        """Guess an input's format ("flac", "mp4" or "mp3") from its first bytes, without probing it"""
+        with open(file_name, "rb") as f:
+            magic = f.read(12)
+        if magic[0:4] == b"fLaC":
+            return "flac"
+        if magic[4:8] == b"ftyp":
+            return "mp4"
+        return "mp3"
+
+    @staticmethod
+    def can_overlap(context: RuntimeContext) -> bool:
+        """Whether the book will be encoded by a single ffmpeg run, in an order known before probing
+
+        Sorting needs the tags, and joining without re-encoding or in segments needs every file's codec or duration,
+        so those conversions probe first.  Appending to a book is done by Book.append instead.
+        """
+        if not context.overlap or context.append or context.sort or context.encode_jobs > 1 or \
+                len(context.input_files) < 2:
+            return False
+
+        formats = [ConversionPipeline.sniff_format(f) for f in context.input_files]
+        if context.stream_copy and "mp4" in formats:
+            return False
+        if context.copy_mp3 and all(f == "mp3" for f in formats):
+            return False
+        return True
+
+    def run(self) -> Book:
+        """Convert the book, returning it"""
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.__run())
+        finally:
+            loop.close()
+
+    async def __run(self) -> Book:
+        context = self.__context
+        if Book.needs_remux(context):
+            (fd, encoded_audio) = tempfile.mkstemp(suffix=".m4a", dir=context.working_directory)
+            os.close(fd)
+        else:
+            # Becomes the m4b once the chapters are written into it
+            encoded_audio = Book.create_output_temporary(context.output_file)
+        try:
+            return await self.__convert(encoded_audio)
+        finally:
+            if os.path.exists(encoded_audio):
+                os.remove(encoded_audio)
+
+    async def __convert(self, encoded_audio: str) -> Book:
+        context = self.__context
+        cmd = "../ffmpeg" if os.name == "nt" else "ffmpeg"
+        if context.check_space:
+            self.__check_space_before_encoding(encoded_audio)
+
+        context.print_unlessquiet("Encoding while reading input files...")
+        encoder = FfmpegProcess(Book.get_encode_arguments(self.__context.input_files, encoded_audio, cmd, context),
+                                self.__on_progress, show_output=context.is_veryverbose)
+
+        loop = asyncio.get_event_loop()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            encode = loop.run_in_executor(executor, encoder.run)
+            try:
+                book = await loop.run_in_executor(executor, self.__probe)
+                if context.check_space:
+                    book.check_space(context.output_file, context)
+            except BaseException:
+                encoder.terminate()
+                await asyncio.wait([encode])
+                raise
+
+            self.__start_progress(book)
+            encoded = await encode
+
+        if self.__progress is not None:
+            self.__progress.finish()
+
+        if encoded:
+            book.convert(context.output_file, context, encoded_audio)
+        else:
+            context.print_unlessquiet("Encoding failed, converting again...")
+            book.convert(context.output_file, context)
+        return book
+
+    def __check_space_before_encoding(self, encoded_audio: str):
+        """Check there is room for the encoded audio before the encoder starts writing it
+
+        Nothing has been probed yet, so the audio's length is worked out from the size of the mp3 input files alone,
+        which gives a lower bound: the conversion certainly won't fit if this doesn't.  The size of the other formats
+        says too little about their length to count.  Book.check_space makes the full check once the probe is done.
+
+        :raises DiskSpaceError: if there isn't room
+        """
+        mp3_size = sum(os.path.getsize(f) for f in self.__context.input_files
+                       if ConversionPipeline.sniff_format(f) == "mp3")
+        check = DiskSpaceCheck()
+        check.add(encoded_audio, DiskSpaceCheck.estimate_audio_size(
+            mp3_size * ConversionPipeline.__mp3_seconds_per_byte, Book.BIT_RATE))
+        check.check()
+
+    def __probe(self) -> Book:
+        """Probe the input files, on a worker thread (so with its own connection to the probe cache)"""
+        context = self.__context
+        probe_cache = ProbeCache(context.probe_cache_file, context.probe_cache_size) \
+            if context.probe_cache_file is not None else None
+        try:
+            book = Book(context.input_files, context.cover_image, context.sort, probe_cache, context.probe_workers,
+                        context.probe_processes, self.__segment_cache)
+        finally:
+            if probe_cache is not None:
+                probe_cache.close()
+
+        context.print_veryverbose("Input file durations:")
+        for audio in book.audio_list:
+            context.print_veryverbose("{0} (duration: {1}, from {2})".format(audio.title, audio.duration,
+                                                                             audio.duration_source))
+        return book
+
+    def __start_progress(self, book: Book):
+        """Start reporting progress, now that the durations are known"""
+        if self.__context.progress_format == "none":
+            return
+
+        progress = book.create_progress_reporter(self.__context)
+        if self.__position is not None:
+            progress.update(0, 0.0, *self.__position)
+        self.__progress = progress
+
+    def __on_progress(self, position: float, finished: bool):
+        self.__position = (position, finished)
+        if self.__progress is not None:
+            self.__progress.update(0, 0.0, position, finished)
+
+    def __init__(self, context: RuntimeContext, segment_cache: Optional[SegmentCache]=None):
+        self.__context = context
+        self.__segment_cache = segment_cache
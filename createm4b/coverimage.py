@@ -0,0 +1,81 @@
+"""Cover image preparation"""
+import hashlib
+import os
+import subprocess
+import tempfile
+from typing import Optional
+
+from . import util
+
+
+class CoverImage:
+    """Cover image to be stored in the m4b as an attached picture
+
+    mp4 players only understand jpeg and png covers, so other formats are converted to jpeg, and large
+    images can be scaled down.  Converted images are cached by the hash of the original so that this
+    only ever happens once per image.
+    """
+
+    @staticmethod
+    def default_cache_directory() -> str:
+        return os.path.join(util.cache_directory(), "covers")
+
+    @property
+    def file_name(self) -> str:
+        return self.__file_name
+
+    @property
+    def format(self) -> Optional[str]:
+        """Image format ("jpeg" or "png"), or None if it's something an m4b can't hold as is"""
+        with open(self.__file_name, "rb") as f:
+            magic = f.read(8)
+
+        if magic[0:3] == b"\xff\xd8\xff":
+            return "jpeg"
+        if magic == b"\x89PNG\r\n\x1a\n":
+            return "png"
+        return None
+
+    def prepare(self, ffmpeg_cmd: str, max_size: Optional[int]=None) -> str:
+        """Get an image file that can be attached to the m4b as is
+
+        :param ffmpeg_cmd: ffmpeg executable used to convert the image
+        :param max_size: Scale the image down to fit in a square of this many pixels
+        :return: The original file name, or the name of a converted copy in the cache
+        """
+        if max_size is None and self.format is not None:
+            return self.__file_name
+
+        cached_name = os.path.join(self.__cache_directory, "{0}-{1}.jpg".format(self.__hash(), max_size or "full"))
+        if os.path.exists(cached_name):
+            return cached_name
+
+        os.makedirs(self.__cache_directory, exist_ok=True)
+        (fd, temp_name) = tempfile.mkstemp(suffix=".jpg", dir=self.__cache_directory)
+        os.close(fd)
+        try:
+            args = [ffmpeg_cmd, "-v", "error", "-i", self.__file_name]
+            if max_size is not None:
+                args.extend(["-vf", "scale=w='min({0},iw)':h='min({0},ih)':force_original_aspect_ratio=decrease"
+                            .format(max_size)])
+            args.extend(["-frames:v", "1", "-q:v", "3", "-y", temp_name])
+            subprocess.run(args, check=True)
+
+            # Other processes may be converting the same image; whichever finishes last wins
+            os.replace(temp_name, cached_name)
+        finally:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+
+        return cached_name
+
+    def __hash(self) -> str:
+        sha = hashlib.sha256()
+        with open(self.__file_name, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def __init__(self, file_name: str, cache_directory: Optional[str]=None):
+        self.__file_name = file_name
+        self.__cache_directory = cache_directory or CoverImage.default_cache_directory()
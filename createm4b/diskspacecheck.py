@@ -0,0 +1,59 @@
+"""Checking there is room for a conversion before starting it"""
+import os
+import shutil
+from typing import Dict, List, Tuple
+
+from .diskspaceerror import DiskSpaceError
+
+
+class DiskSpaceCheck:
+    """Adds up the bytes a conversion will write to each filesystem, and compares them with the free space
+
+    Paths on the same filesystem (by device number) share its free space, so a temporary file and the output written
+    next to each other both count against it.
+    """
+
+    # Estimates are padded for the container, chapters and bit rate overshoot
+    __margin: float = 1.1
+
+    @staticmethod
+    def estimate_audio_size(duration: float, bit_rate: int) -> int:
+        """Bytes of audio encoded at bit_rate bits per second for duration seconds"""
+        return int(duration * bit_rate / 8)
+
+    @property
+    def requirements(self) -> List[Tuple[str, int]]:
+        """The bytes needed on each filesystem, with the first path given for it"""
+        return list(self.__needed.values())
+
+    def add(self, path: str, size: int):
+        """Count size bytes to be written to path, a directory or a file in it"""
+        directory = path if os.path.isdir(path) else os.path.dirname(path) or os.curdir
+        device = os.stat(directory).st_dev
+        (first_path, needed) = self.__needed.get(device, (directory, 0))
+        self.__needed[device] = (first_path, needed + int(size * DiskSpaceCheck.__margin))
+
+    def check(self):
+        """
+        :raises DiskSpaceError: if any filesystem has less free space than is needed on it
+        """
+        shortfalls = []
+        for (directory, needed) in self.__needed.values():
+            free = shutil.disk_usage(directory).free
+            if free < needed:
+                shortfalls.append("{0} needs {1}, but only {2} is free".format(
+                    directory, DiskSpaceCheck.__format_size(needed), DiskSpaceCheck.__format_size(free)))
+
+        if len(shortfalls) > 0:
+            raise DiskSpaceError("Not enough disk space:\n{0}".format("\n".join("\t" + s for s in shortfalls)))
+
+    @staticmethod
+    def __format_size(size: int) -> str:
+        for unit in ("bytes", "KB", "MB", "GB"):
+            if size < 1024:
+                return "{0:.0f} {1}".format(size, unit) if unit == "bytes" else "{0:.1f} {1}".format(size, unit)
+            size /= 1024
+        return "{0:.1f} TB".format(size)
+
+    def __init__(self):
+        self.__needed: Dict[int, Tuple[str, int]] = {}
@@ -0,0 +1,3 @@
+class DiskSpaceError(Exception):
+    """A filesystem doesn't have room for the files a conversion will write"""
+    pass
@@ -0,0 +1,130 @@
+"""Album tags and chapters in ffmpeg's metadata file format"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .mp4 import Mp4Chapter
+
+
+class FfMetadata:
+    """The album, album artist and chapters of a book, as in an ;FFMETADATA1 file
+
+    This is the file createm4b gives ffmpeg to tag a book, and the one createm4b-retag exports and reads back.
+    """
+
+    # noinspection SpellCheckingInspection
+    __header: str = ";FFMETADATA1"
+
+    @property
+    def album(self) -> Optional[str]:
+        return self.__album
+
+    @album.setter
+    def album(self, value: Optional[str]):
+        self.__album = value
+
+    @property
+    def artist(self) -> Optional[str]:
+        """The album artist"""
+        return self.__artist
+
+    @artist.setter
+    def artist(self, value: Optional[str]):
+        self.__artist = value
+
+    @property
+    def chapters(self) -> List[Mp4Chapter]:
+        return [Mp4Chapter(start / 1000, title) for (start, _, title) in self.__chapters]
+
+    def add_chapter(self, start: int, end: int, title: Optional[str]):
+        """Add a chapter running from start to end, in milliseconds"""
+        self.__chapters.append((start, end, title or ""))
+
+    def set_chapter_title(self, index: int, title: str):
+        (start, end, _) = self.__chapters[index]
+        self.__chapters[index] = (start, end, title)
+
+    def format(self) -> str:
+        lines = [FfMetadata.__header,
+                 "album={0}".format(FfMetadata.escape(self.__album)),
+                 "album_artist={0}".format(FfMetadata.escape(self.__artist))]
+        for (start, end, title) in self.__chapters:
+            lines.extend(["", "[CHAPTER]", "TIMEBASE=1/1000", "START={0}".format(start), "END={0}".format(end),
+                          "title={0}".format(FfMetadata.escape(title))])
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def escape(s: Optional[str]) -> str:
+        if s is None:
+            return ""
+
+        s = s.replace("\\", "\\\\")
+        s = s.replace("=", "\\=")
+        s = s.replace(";", "\\;")
+        s = s.replace("#", "\\#")
+        s = s.replace("\n", "\\\n")
+
+        return s
+
+    @staticmethod
+    def parse(text: str) -> "FfMetadata":
+        """Read a metadata file, such as one written by format
+
+        Tags other than the album, album artist and chapter titles are ignored, as are sections other than chapters.
+
+        :raises ValueError: if it isn't a metadata file, or a chapter's times aren't numbers
+        """
+        if not text.startswith(FfMetadata.__header):
+            raise ValueError("Not an ffmpeg metadata file (it should start with {0})".format(FfMetadata.__header))
+
+        metadata = FfMetadata()
+        section = None
+        chapters: List[Dict[str, str]] = []
+        for (key, value) in FfMetadata.__entries(text[len(FfMetadata.__header):]):
+            if value is None:
+                section = key
+                if section == "[CHAPTER]":
+                    chapters.append({"timebase": "1/1000"})
+            elif section is None:
+                if key == "album":
+                    metadata.album = value
+                elif key == "album_artist":
+                    metadata.artist = value
+            elif section == "[CHAPTER]":
+                chapters[-1][key.lower() if key.lower() in ("timebase", "start", "end") else key] = value
+
+        for entries in chapters:
+            (numerator, denominator) = (int(n) for n in entries["timebase"].split("/"))
+            start = int(entries.get("start", 0)) * numerator * 1000 // denominator
+            end = int(entries.get("end", 0)) * numerator * 1000 // denominator
+            metadata.add_chapter(start, end, entries.get("title"))
+        return metadata
+
+    @staticmethod
+    def __entries(text: str) -> Iterator[Tuple[str, Optional[str]]]:
+        """Each line of a metadata file as (key, value), or (section, None) for a section header
+
+        A backslash escapes the next character, including a newline; comments start with ; or #.
+        """
+        line: List[Tuple[str, bool]] = []
+        escaped = False
+        for c in text + "\n":
+            if escaped:
+                line.append((c, True))
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c != "\n":
+                line.append((c, False))
+            elif len(line) > 0:
+                if line[0] in ((";", False), ("#", False)):
+                    pass
+                elif line[0] == ("[", False):
+                    yield "".join(c for (c, _) in line).strip(), None
+                else:
+                    split = next((i for (i, entry) in enumerate(line) if entry == ("=", False)), len(line))
+                    yield "".join(c for (c, _) in line[:split]), "".join(c for (c, _) in line[split + 1:])
+                line = []
+
+    def __init__(self, album: Optional[str]=None, artist: Optional[str]=None):
+        self.__album = album
+        self.__artist = artist
+        self.__chapters: List[Tuple[int, int, str]] = []
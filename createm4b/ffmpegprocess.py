@@ -0,0 +1,110 @@
+"""Running ffmpeg and following its progress"""
+import subprocess
+import threading
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+
+class FfmpegProcess:
+    """A single ffmpeg run
+
+    When on_progress is given, ffmpeg writes its machine readable progress (-progress) to stdout, which is parsed on
+    a background thread.  on_progress is called with the number of seconds of output written so far, and whether
+    ffmpeg has finished.
+    """
+
+    __errors: str = ""
+    __process: Optional[subprocess.Popen] = None
+    __terminated: bool = False
+
+    @property
+    def args(self) -> List[str]:
+        return self.__args
+
+    @property
+    def errors(self) -> str:
+        """What ffmpeg wrote to stderr, if capture_errors was set"""
+        return self.__errors
+
+    @staticmethod
+    def parse_position(values: Dict[str, str]) -> Optional[float]:
+        """Seconds of output written, from a block of -progress values"""
+        # out_time_ms is in microseconds too, despite its name
+        for key in ("out_time_us", "out_time_ms"):
+            try:
+                return max(int(values[key]) / 1000000, 0.0)
+            except (KeyError, ValueError):
+                pass
+
+        try:
+            (hours, minutes, seconds) = values["out_time"].split(":")
+            return max(int(hours) * 3600 + int(minutes) * 60 + float(seconds), 0.0)
+        except (KeyError, ValueError):
+            return None
+
+    def run(self) -> bool:
+        """Run ffmpeg to completion
+
+        :return: True if ffmpeg succeeded
+        """
+        stdout = subprocess.PIPE if self.__on_progress is not None else None if self.__show_output \
+            else subprocess.DEVNULL
+        stderr = subprocess.PIPE if self.__capture_errors else None
+
+        with subprocess.Popen(self.__args, stdout=stdout, stderr=stderr) as process:
+            self.__process = process
+            if self.__terminated:
+                process.terminate()
+            reader = None
+            if self.__on_progress is not None:
+                reader = threading.Thread(target=self.__read_progress, args=(process.stdout,), daemon=True)
+                reader.start()
+
+            if self.__capture_errors:
+                self.__errors = process.stderr.read().decode("utf8", "replace")
+            return_code = process.wait()
+            if reader is not None:
+                reader.join()
+
+        return return_code == 0 and not self.__terminated
+
+    def terminate(self):
+        """Stop ffmpeg from another thread, making run return False"""
+        self.__terminated = True
+        if self.__process is not None and self.__process.poll() is None:
+            self.__process.terminate()
+
+    def __read_progress(self, stream: BinaryIO):
+        values: Dict[str, str] = {}
+        for line in stream:
+            (key, _, value) = line.decode("utf8", "replace").strip().partition("=")
+            if key != "progress":
+                values[key] = value
+                continue
+
+            position = FfmpegProcess.parse_position(values)
+            if position is not None:
+                self.__on_progress(position, value == "end")
+            values = {}
+
+    def __init__(self, args: List[str], on_progress: Optional[Callable[[float, bool], None]]=None,
+                 capture_errors: bool=False, show_output: bool=False):
+        """
+        :param args: The ffmpeg command and its arguments
+        :param capture_errors: Keep stderr in errors rather than letting it through
+        :param show_output: Let ffmpeg's log and stats through; otherwise only errors are shown, and stdout is
+            discarded when not following progress
+        """
+        self.__on_progress = on_progress
+        self.__capture_errors = capture_errors
+        self.__show_output = show_output
+
+        # Global options, so they go before any input
+        global_options = []
+        if not show_output:
+            global_options.extend(["-hide_banner", "-loglevel", "error"])
+        if on_progress is not None:
+            global_options.extend(["-progress", "pipe:1", "-nostdin"])
+        if on_progress is not None or not show_output:
+            global_options.append("-nostats")
+        self.__args = list(args)
+        self.__args[1:1] = global_options
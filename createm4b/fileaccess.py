@@ -0,0 +1,138 @@
+"""Bounded access to the input files while they are probed"""
+import io
+import mmap
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class CountingFileIO(io.FileIO):
+    """Unbuffered file, opened for reading, that reports how many bytes it reads"""
+
+    def readinto(self, buffer) -> Optional[int]:
+        count = super().readinto(buffer)
+        if count:
+            self.__on_read(count)
+        return count
+
+    def readall(self) -> bytes:
+        data = super().readall()
+        self.__on_read(len(data))
+        return data
+
+    def __init__(self, file_name: str, on_read: Callable[[int], None]):
+        super().__init__(file_name, "rb")
+        self.__on_read = on_read
+
+
+class FileAccess:
+    """Opens input files for reading, with a limit on how many of them are open at once
+
+    Opening a file that the same thread already has open shares its handle, so looking at a file again during a probe
+    (to read the body of a flac metadata block, say) doesn't take another descriptor; whoever moves the shared
+    position puts it back.  The handle is closed as soon as its last user is done with it.  A count of the files
+    opened and the bytes read from them is kept, for verbose output and tests; a file memory mapped by map_file
+    counts as read in full.
+    """
+
+    DEFAULT_MAX_OPEN: int = 64
+
+    __default: Optional["FileAccess"] = None
+    __default_lock = threading.Lock()
+
+    @staticmethod
+    def default() -> "FileAccess":
+        """The FileAccess shared by the mp3, flac and mp4 probers"""
+        with FileAccess.__default_lock:
+            if FileAccess.__default is None:
+                FileAccess.__default = FileAccess(FileAccess.__descriptor_budget())
+            return FileAccess.__default
+
+    @property
+    def max_open(self) -> int:
+        return self.__max_open
+
+    @property
+    def open_files(self) -> int:
+        """Number of files open now"""
+        with self.__lock:
+            return len(self.__handles)
+
+    @property
+    def opens(self) -> int:
+        """Number of times a file has been opened (not counting shared handles)"""
+        return self.__opens
+
+    @property
+    def bytes_read(self) -> int:
+        return self.__bytes_read
+
+    @contextmanager
+    def open(self, file_name: str) -> Iterator[BinaryIO]:
+        """Open a file for reading, waiting while max_open files are open
+
+        :raises OSError: if the file can't be opened
+        """
+        key = (threading.get_ident(), file_name)
+        with self.__lock:
+            entry = self.__handles.get(key)
+            if entry is not None:
+                entry[1] += 1
+
+        if entry is None:
+            self.__slots.acquire()
+            try:
+                handle = io.BufferedReader(CountingFileIO(file_name, self.__count_read))
+            except BaseException:
+                self.__slots.release()
+                raise
+            entry = [handle, 1]
+            with self.__lock:
+                self.__handles[key] = entry
+                self.__opens += 1
+
+        try:
+            yield entry[0]
+        finally:
+            with self.__lock:
+                entry[1] -= 1
+                last = entry[1] == 0
+                if last:
+                    del self.__handles[key]
+            if last:
+                entry[0].close()
+                self.__slots.release()
+
+    def map_file(self, file_handle: BinaryIO) -> mmap.mmap:
+        """Memory map the whole of an open file, read only, for the caller to close
+
+        :raises ValueError: if the file is empty (which can't be mapped)
+        """
+        data = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__count_read(len(data))
+        return data
+
+    def __count_read(self, count: int):
+        with self.__lock:
+            self.__bytes_read += count
+
+    @staticmethod
+    def __descriptor_budget() -> int:
+        """A quarter of the process's descriptor limit, leaving the rest to sqlite, pipes and the output, up to
+        DEFAULT_MAX_OPEN"""
+        try:
+            import resource
+            (soft_limit, _) = resource.getrlimit(resource.RLIMIT_NOFILE)
+        except (ImportError, OSError, ValueError):
+            return FileAccess.DEFAULT_MAX_OPEN
+        if soft_limit == resource.RLIM_INFINITY:
+            return FileAccess.DEFAULT_MAX_OPEN
+        return max(1, min(FileAccess.DEFAULT_MAX_OPEN, soft_limit // 4))
+
+    def __init__(self, max_open: int=DEFAULT_MAX_OPEN):
+        self.__max_open = max(max_open, 1)
+        self.__slots = threading.BoundedSemaphore(self.__max_open)
+        self.__lock = threading.Lock()
+        self.__handles: Dict[Tuple[int, str], List] = {}
+        self.__opens = 0
+        self.__bytes_read = 0
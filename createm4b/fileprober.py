@@ -0,0 +1,37 @@
+from abc import abstractmethod
+from typing import BinaryIO, List, Optional
+
+from .fileaccess import FileAccess
+from .filevalidator import FileValidator
+from .proberesult import ProbeResult
+
+
+class FileProber(FileValidator):
+    """Validator that gathers tags, stream parameters and duration in the same pass as validation"""
+
+    @abstractmethod
+    def probe(self, file_handle: BinaryIO, file_name: str, reasons: Optional[List[str]]=None) \
+            -> Optional[ProbeResult]:
+        """Probe an open file from its current position
+
+        :param reasons: If given, why the file isn't in this prober's format is added to it
+        :return: The probe result, or None if the file is not in this prober's format
+        """
+        pass
+
+    @staticmethod
+    def reject(reasons: Optional[List[str]], reason: str) -> None:
+        """Add why a file isn't in a prober's format to reasons (if given), and return None for probe to return"""
+        if reasons is not None:
+            reasons.append(reason)
+        return None
+
+    def probe_file(self, file_name: str) -> Optional[ProbeResult]:
+        with FileAccess.default().open(file_name) as f:
+            return self.probe(f, file_name)
+
+    def is_valid(self, file_name: str) -> bool:
+        return self.probe_file(file_name) is not None
+
+
+del abstractmethod, BinaryIO, List, Optional
@@ -1,23 +1,41 @@
-from typing import Optional, cast, Iterator
+from typing import Optional, Iterator
 
+from ..fileaccess import FileAccess
 from ..filevalidator import FileValidator
+from ..proberesult import ProbeResult
 from .flacerror import FlacError
-from .flacmetadata import FlacMetadata, FlacMetadataStreamInfo, FlacMetadataVorbis
+from .flacmetadata import FlacMetadata
+from .flacvalidator import FlacValidator
 from ..audiosource import AudioSource
 
 
 class Flac(AudioSource):
-    __title: Optional[str] = None
-    __artist: Optional[str] = None
-    __album: Optional[str] = None
-    __track: Optional[int] = None
-    __metadata: Optional[FlacMetadata] = None
+    __probe_result: Optional[ProbeResult] = None
 
     @property
     def duration(self) -> float:
         """Duration of the flac, in seconds"""
-        stream_info = cast(FlacMetadataStreamInfo, next(self.metadata("StreamInfo")))
-        return float(stream_info.total_samples) / stream_info.sample_rate
+        return self.probe_result.duration
+
+    @property
+    def stream_duration(self) -> float:
+        return self.probe_result.stream_duration
+
+    @property
+    def duration_source(self) -> Optional[str]:
+        return self.probe_result.duration_source
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self.probe_result.sample_rate
+
+    @property
+    def channels(self) -> Optional[int]:
+        return self.probe_result.channels
+
+    @property
+    def codec(self) -> Optional[str]:
+        return self.probe_result.codec
 
     @property
     def file_name(self) -> str:
@@ -25,66 +43,38 @@ class Flac(AudioSource):
 
     @property
     def title(self) -> str:
-        self.__title = self.__title or self.__get_tag("TITLE")
-
-        return self.__title
+        return self.probe_result.title
 
     @property
     def artist(self) -> str:
-        self.__artist = self.__artist or self.__get_tag("ARTIST")
-
-        return self.__artist
+        return self.probe_result.artist
 
     @property
     def album(self) -> str:
-        self.__album = self.__album or self.__get_tag("ALBUM")
-
-        return self.__album
+        return self.probe_result.album
 
     @property
     def track(self) -> Optional[int]:
-        if self.__track is None:
-            try:
-                # noinspection SpellCheckingInspection
-                self.__track = int(self.__get_tag("TRACKNUMBER"))
-            except (ValueError, TypeError):
-                self.__track = None
-
-        return self.__track
+        return self.probe_result.track
 
-    def __get_tag(self, name: str) -> Optional[str]:
-        comment_block = cast(Optional[FlacMetadataVorbis], next((self.metadata("VorbisComment")), None))
-        return comment_block.tag(name) if comment_block else None
+    @property
+    def probe_result(self) -> ProbeResult:
+        """Everything read from the file, probing it now if that wasn't done when it was validated"""
+        if self.__probe_result is None:
+            self.__probe_result = FlacValidator().probe_file(self.__file_name)
+            if self.__probe_result is None:
+                raise FlacError("{0} is not a flac file".format(self.__file_name))
 
-    def metadata(self, block_type: str) -> Iterator[FlacMetadata]:
-        self.__metadata = self.__metadata or [f for f in Flac.get_metadata(self.__file_name)]
-        return (x for x in self.__metadata if x.block_type == block_type)
+        return self.__probe_result
 
-    def __init__(self, flac_validator: FileValidator, file_name: str):
-        if not flac_validator.is_valid(file_name):
+    def __init__(self, flac_validator: FileValidator, file_name: str, probe_result: Optional[ProbeResult]=None):
+        if probe_result is None and not flac_validator.is_valid(file_name):
             raise FlacError("{0} is not a flac file".format(file_name))
 
         self.__file_name = file_name
+        self.__probe_result = probe_result
 
     @staticmethod
     def get_metadata(file_name: str) -> Iterator[FlacMetadata]:
-        f = None
-
-        try:
-            f = open(file_name, "rb")
-            block = f.read(4)
-
-            if block.decode("ascii") != "fLaC":
-                raise FlacError
-
-            metadata_block = FlacMetadata.read_metadata(f)
-
-            yield metadata_block
-
-            while not metadata_block.last_block:
-                metadata_block = FlacMetadata.read_metadata(f)
-                yield metadata_block
-
-        finally:
-            if f is not None:
-                f.close()
+        with FileAccess.default().open(file_name) as f:
+            yield from FlacMetadata.read_all(f)
@@ -0,0 +1,172 @@
+from typing import Iterator, List, Optional
+
+from .flacerror import FlacError
+
+
+class FlacFrame:
+    """A flac frame header: its position in the stream, block size, and coded frame or sample number
+
+    Frames of a fixed block size stream carry their frame number; frames of a variable block size stream carry the
+    number of their first sample.  Either is stored in a UTF-8 style variable length code.
+    """
+
+    __block_sizes: List[int] = [0, 192, 576, 1152, 2304, 4608, 0, 0, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768]
+    __sample_rates: List[int] = [0, 88200, 176400, 192000, 8000, 16000, 22050, 24000, 32000, 44100, 48000, 96000,
+                                 0, 0, 0, 0]
+    __sample_sizes: List[int] = [0, 8, 12, 0, 16, 20, 24, 32]
+
+    __crc8_table: Optional[List[int]] = None
+
+    @property
+    def offset(self) -> int:
+        """Position of the frame in the data it was found in"""
+        return self.__offset
+
+    @property
+    def variable_block_size(self) -> bool:
+        return self.__variable_block_size
+
+    @property
+    def number(self) -> int:
+        """Frame number, or first sample number for a variable block size stream"""
+        return self.__number
+
+    @property
+    def next_number(self) -> int:
+        """The number the frame after this one has"""
+        return self.__number + (self.__block_size if self.__variable_block_size else 1)
+
+    @property
+    def block_size(self) -> int:
+        """Samples (per channel) in the frame"""
+        return self.__block_size
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        """Sample rate, or None if the header refers to the stream info"""
+        return self.__sample_rate
+
+    @property
+    def channels(self) -> int:
+        return self.__channels
+
+    @property
+    def sample_size(self) -> Optional[int]:
+        """Bits per sample, or None if the header refers to the stream info"""
+        return self.__sample_size
+
+    def end_sample(self, nominal_block_size: int) -> int:
+        """Number of samples in the stream up to the end of this frame
+
+        :param nominal_block_size: Block size of every frame but the last, in a fixed block size stream
+        """
+        if self.__variable_block_size:
+            return self.__number + self.__block_size
+        return self.__number * nominal_block_size + self.__block_size
+
+    @staticmethod
+    def find_all(data: bytes, start: int=0, end: Optional[int]=None) -> Iterator["FlacFrame"]:
+        """Find every valid frame header starting between start and end in data, in order
+
+        A header is only valid if its reserved bits are clear, its codes are all defined, and its CRC-8 matches, but
+        audio data can still look like one.
+        """
+        end = len(data) - 1 if end is None else min(end, len(data) - 1)
+        position = data.find(b"\xff", start, end)
+        while position >= 0:
+            if data[position + 1] & 0xfe == 0xf8:
+                try:
+                    yield FlacFrame(data, position)
+                except (FlacError, IndexError):
+                    pass
+            position = data.find(b"\xff", position + 1, end)
+
+    @staticmethod
+    def __crc8(data: bytes) -> int:
+        """CRC-8 with polynomial x^8 + x^2 + x + 1, as used for frame headers"""
+        if FlacFrame.__crc8_table is None:
+            table = []
+            for i in range(256):
+                crc = i
+                for _ in range(8):
+                    crc = (crc << 1 ^ 0x07 if crc & 0x80 else crc << 1) & 0xff
+                table.append(crc)
+            FlacFrame.__crc8_table = table
+
+        crc = 0
+        for byte in data:
+            crc = FlacFrame.__crc8_table[crc ^ byte]
+        return crc
+
+    def __read_coded_number(self, data: bytes, position: int) -> int:
+        """Decode the UTF-8 style number at position, returning the position after it"""
+        first = data[position]
+        if first & 0x80 == 0:
+            self.__number = first
+            return position + 1
+
+        length = 2
+        while length <= 7 and first & (0x80 >> length):
+            length += 1
+        if first & 0xc0 != 0xc0 or length > 7:
+            raise FlacError("Invalid coded number")
+
+        number = first & (0x7f >> length)
+        for byte in data[position + 1:position + length]:
+            if byte & 0xc0 != 0x80:
+                raise FlacError("Invalid coded number")
+            number = number << 6 | byte & 0x3f
+        if position + length > len(data):
+            raise FlacError("Truncated coded number")
+
+        self.__number = number
+        return position + length
+
+    def __init__(self, data: bytes, offset: int):
+        """Parse the frame header at offset in data
+
+        :raises FlacError: if there isn't a valid frame header there
+        """
+        if data[offset] != 0xff or data[offset + 1] & 0xfe != 0xf8:
+            raise FlacError("No frame sync")
+
+        self.__offset = offset
+        self.__variable_block_size = data[offset + 1] & 0x01 == 1
+        block_size_code = data[offset + 2] >> 4
+        sample_rate_code = data[offset + 2] & 0x0f
+        channel_code = data[offset + 3] >> 4
+        sample_size_code = (data[offset + 3] >> 1) & 0x07
+        if block_size_code == 0 or sample_rate_code == 15 or channel_code > 10 or sample_size_code == 3 or \
+                data[offset + 3] & 0x01:
+            raise FlacError("Reserved value in frame header")
+
+        position = self.__read_coded_number(data, offset + 4)
+        if not self.__variable_block_size and self.__number >= 1 << 31:
+            raise FlacError("Invalid frame number")
+
+        if block_size_code == 6:
+            self.__block_size = data[position] + 1
+            position += 1
+        elif block_size_code == 7:
+            self.__block_size = (data[position] << 8 | data[position + 1]) + 1
+            position += 2
+        else:
+            self.__block_size = FlacFrame.__block_sizes[block_size_code]
+
+        if sample_rate_code == 12:
+            self.__sample_rate = data[position] * 1000
+            position += 1
+        elif sample_rate_code == 13:
+            self.__sample_rate = data[position] << 8 | data[position + 1]
+            position += 2
+        elif sample_rate_code == 14:
+            self.__sample_rate = (data[position] << 8 | data[position + 1]) * 10
+            position += 2
+        else:
+            self.__sample_rate = FlacFrame.__sample_rates[sample_rate_code] or None
+
+        self.__channels = channel_code + 1 if channel_code < 8 else 2
+        self.__sample_size = FlacFrame.__sample_sizes[sample_size_code] or None
+
+        if FlacFrame.__crc8(data[offset:position]) != data[position]:
+            raise FlacError("Frame header CRC mismatch")
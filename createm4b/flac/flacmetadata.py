@@ -1,13 +1,26 @@
+import os
 from abc import ABC, abstractmethod
-from typing import List, Iterator, Optional
+from typing import Dict, List, Iterator, Optional
 
 from io import FileIO
 
 from createm4b import util
+from createm4b.fileaccess import FileAccess
 from .flacerror import FlacError
 
 
 class FlacMetadata(ABC):
+    """A metadata block: its 4 byte header, and its body
+
+    Only the bodies of the blocks createm4b reads (stream info and vorbis comments) are loaded with the header.  The
+    others, such as pictures and padding, can be large, so they are skipped and only read if raw_data is used.
+    """
+
+    # Whether the block's body is read along with its header
+    _load_body: bool = False
+
+    __data: Optional[bytes] = None
+
     @property
     @abstractmethod
     def block_type(self) -> str:  # pragma: no cover
@@ -21,19 +34,61 @@ class FlacMetadata(ABC):
     def last_block(self) -> bool:
         return self.__last_block
 
+    @property
+    def offset(self) -> int:
+        """Position of the block's header in the file"""
+        return self.__offset
+
     @property
     def raw_data(self) -> bytes:
+        """The block's header and body, reading the body now if it wasn't loaded with the header"""
+        if self.__data is None:
+            self.__data = self.__header + self.__read_body()
         return self.__data
 
     @abstractmethod
     def validate(self) -> bool:  # pragma: no cover
         pass
 
+    def __read_body(self) -> bytes:
+        if not self.__file_handle.closed:
+            position = self.__file_handle.tell()
+            self.__file_handle.seek(self.__offset + 4)
+            body = self.__file_handle.read(self.__block_size - 4)
+            self.__file_handle.seek(position)
+            return body
+
+        if self.__file_name is None:
+            raise FlacError("The file this block was read from is closed")
+        with FileAccess.default().open(self.__file_name) as f:
+            f.seek(self.__offset + 4)
+            return f.read(self.__block_size - 4)
+
     def __init__(self, file_handle):
-        data = file_handle.read(4)
-        self.__last_block = data[0] & 0x80 == 0x80
-        self.__block_size = (data[1] << 16 | data[2] << 8 | data[3]) + 4
-        self.__data = data + file_handle.read(self.__block_size-4)
+        self.__offset = file_handle.tell()
+        self.__header = file_handle.read(4)
+        self.__last_block = self.__header[0] & 0x80 == 0x80
+        self.__block_size = (self.__header[1] << 16 | self.__header[2] << 8 | self.__header[3]) + 4
+        self.__file_handle = file_handle
+        self.__file_name = getattr(file_handle, "name", None)
+
+        if self._load_body:
+            self.__data = self.__header + file_handle.read(self.__block_size - 4)
+        else:
+            file_handle.seek(self.__block_size - 4, os.SEEK_CUR)
+
+    @staticmethod
+    def read_all(file_handle) -> Iterator["FlacMetadata"]:
+        """Read the metadata blocks of a flac from an open file positioned at the "fLaC" marker"""
+        if file_handle.read(4) != b"fLaC":
+            raise FlacError("No fLaC marker")
+
+        metadata_block = FlacMetadata.read_metadata(file_handle)
+        yield metadata_block
+
+        while not metadata_block.last_block:
+            metadata_block = FlacMetadata.read_metadata(file_handle)
+            yield metadata_block
 
     @staticmethod
     def read_metadata(file_handle):
@@ -48,6 +103,8 @@ class FlacMetadata(ABC):
 
 
 class FlacMetadataStreamInfo(FlacMetadata):
+    _load_body = True
+
     @property
     def block_type(self) -> str:
         return "StreamInfo"
@@ -60,6 +117,22 @@ class FlacMetadataStreamInfo(FlacMetadata):
     def sample_rate(self) -> int:
         return self.__sample_rate
 
+    @property
+    def channels(self) -> int:
+        return self.__number_of_channels
+
+    @property
+    def bits_per_sample(self) -> int:
+        return self.__bits_per_sample
+
+    @property
+    def minimum_block_size(self) -> int:
+        return self.__minimum_block_size
+
+    @property
+    def maximum_block_size(self) -> int:
+        return self.__maximum_block_size
+
     def validate(self) -> bool:
         if self.__sample_rate == 0:
             return False
@@ -85,11 +158,14 @@ class FlacMetadataStreamInfo(FlacMetadata):
 
 
 class FlacMetadataVorbis(FlacMetadata):
+    _load_body = True
+
     __comments: Optional[List[str]] = None
+    __tags: Optional[Dict[str, str]] = None
 
     def validate(self) -> bool:
         try:
-            self.__get_comments()
+            self.comments
         except FlacError:
             return False
         return True
@@ -100,9 +176,21 @@ class FlacMetadataVorbis(FlacMetadata):
 
     @property
     def comments(self) -> List[str]:
-        self.__comments = self.__comments or [x for x in self.__get_comments()]
+        if self.__comments is None:
+            self.__comments = [x for x in self.__get_comments()]
         return self.__comments
 
+    @property
+    def tags(self) -> Dict[str, str]:
+        """The first value of each tag, keyed by its name in lower case"""
+        if self.__tags is None:
+            self.__tags = {}
+            for comment in self.comments:
+                (name, separator, value) = comment.partition("=")
+                if separator:
+                    self.__tags.setdefault(name.lower(), value)
+        return self.__tags
+
     def __get_comments(self) -> Iterator[str]:
         try:
             pos = 4
@@ -116,11 +204,10 @@ class FlacMetadataVorbis(FlacMetadata):
                 yield self.raw_data[pos:pos + comment_length].decode("utf8")
                 pos += comment_length
         except LookupError:
-            raise FlacError
+            raise FlacError("Invalid Vorbis comment")
 
     def tag(self, tag_name: str) -> Optional[str]:
-        tag = next((x for x in self.comments if x.lower().startswith("{0}=".format(tag_name.lower()))), None)
-        return tag[len(tag_name) + 1:] if tag is not None else None
+        return self.tags.get(tag_name.lower())
 
     def __init__(self, file_handle):
         super().__init__(file_handle)
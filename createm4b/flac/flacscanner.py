@@ -0,0 +1,101 @@
+"""Finding the length of a flac stream from its frame headers"""
+import os
+from typing import BinaryIO, List, Optional
+
+from .flacframe import FlacFrame
+from .flacmetadata import FlacMetadataStreamInfo
+
+
+class FlacScanner:
+    """Counts the samples of a flac whose stream info doesn't say how many there are (a total of 0)
+
+    Encoders writing to a pipe can't go back to fill in the total, but every frame header carries its frame number
+    (or first sample number), so the total follows from the last frame.  It is found by reading backwards from the
+    end of the file; a header is only trusted when the one before it is found too and numbered consistently, as
+    audio data can pass for a header.  If that fails, every frame of the stream is walked instead.
+    """
+
+    # Bytes to read back from the end of the file at first, and the most to read before giving up on the last frame
+    __tail_size: int = 64 * 1024
+    __max_tail_size: int = 4 * 1024 * 1024
+
+    __chunk_size: int = 1024 * 1024
+
+    @property
+    def total_samples(self) -> int:
+        return self.__total_samples
+
+    @property
+    def method(self) -> str:
+        """How the total was found: from the "last frame", or a "frame scan" of the whole stream"""
+        return self.__method
+
+    def __is_consistent(self, frame: FlacFrame) -> bool:
+        """Whether a frame header matches the stream info, as every real one does"""
+        stream_info = self.__stream_info
+        return (frame.sample_rate is None or frame.sample_rate == stream_info.sample_rate) and \
+            frame.channels == stream_info.channels and \
+            (frame.sample_size is None or frame.sample_size == stream_info.bits_per_sample) and \
+            (stream_info.maximum_block_size == 0 or frame.block_size <= stream_info.maximum_block_size)
+
+    def __find_frames(self, data: bytes, start: int=0, end: Optional[int]=None) -> List[FlacFrame]:
+        return [f for f in FlacFrame.find_all(data, start, end) if self.__is_consistent(f)]
+
+    def __find_last_frame(self, file_handle: BinaryIO, audio_start: int, file_size: int) -> Optional[FlacFrame]:
+        """Find the last frame of the stream by reading back from the end of the file"""
+        tail_size = FlacScanner.__tail_size
+        while True:
+            start = max(file_size - tail_size, audio_start)
+            file_handle.seek(start)
+            frames = self.__find_frames(file_handle.read(file_size - start))
+
+            for (i, frame) in reversed(list(enumerate(frames))):
+                if any(earlier.next_number == frame.number for earlier in frames[:i]):
+                    return frame
+                if start == audio_start and frame.offset == 0 and frame.number == 0:
+                    # The only frame in the stream
+                    return frame
+
+            if start == audio_start or tail_size >= FlacScanner.__max_tail_size:
+                return None
+            tail_size *= 4
+
+    def __walk_frames(self, file_handle: BinaryIO, audio_start: int) -> Optional[FlacFrame]:
+        """Follow the frames from the start of the stream, returning the last one"""
+        # Headers are at most 16 bytes long; one starting this close to the end of a chunk is found in the next one
+        overlap = 16
+        last_frame = None
+        expected = 0
+        position = audio_start
+        while True:
+            file_handle.seek(position)
+            data = file_handle.read(FlacScanner.__chunk_size)
+            last_chunk = len(data) < FlacScanner.__chunk_size
+            end = len(data) if last_chunk else len(data) - overlap
+            for frame in self.__find_frames(data, 0, end):
+                if frame.number == expected:
+                    last_frame = frame
+                    expected = frame.next_number
+
+            if last_chunk:
+                return last_frame
+            position += end
+
+    def __nominal_block_size(self, frame: FlacFrame) -> int:
+        # Every frame but the last has the largest block size in a fixed block size stream
+        return self.__stream_info.maximum_block_size or frame.block_size
+
+    def __init__(self, file_handle: BinaryIO, stream_info: FlacMetadataStreamInfo, audio_start: int):
+        """
+        :param audio_start: Position of the first frame, right after the metadata blocks
+        """
+        self.__stream_info = stream_info
+        file_size = file_handle.seek(0, os.SEEK_END)
+
+        self.__method = "last frame"
+        frame = self.__find_last_frame(file_handle, audio_start, file_size)
+        if frame is None:
+            self.__method = "frame scan"
+            frame = self.__walk_frames(file_handle, audio_start)
+
+        self.__total_samples = frame.end_sample(self.__nominal_block_size(frame)) if frame is not None else 0
@@ -1,19 +1,48 @@
-from createm4b.filevalidator import FileValidator
-from . import Flac, FlacError
+from typing import BinaryIO, List, Optional, cast
 
+from createm4b.fileprober import FileProber
+from createm4b.proberesult import ProbeResult
+from .flacerror import FlacError
+from .flacmetadata import FlacMetadata, FlacMetadataStreamInfo, FlacMetadataVorbis
+from .flacscanner import FlacScanner
 
-class FlacValidator(FileValidator):
-    def is_valid(self, file_name: str) -> bool:
+
+class FlacValidator(FileProber):
+    def probe(self, file_handle: BinaryIO, file_name: str, reasons: Optional[List[str]]=None) \
+            -> Optional[ProbeResult]:
+        """Validate a flac and read its tags and duration from a single read of its metadata blocks"""
         try:
-            metadata = [f for f in Flac.get_metadata(file_name)]
-            if metadata[0].block_type != "StreamInfo":
-                return False
+            metadata = [f for f in FlacMetadata.read_all(file_handle)]
+        except (FlacError, IndexError) as e:
+            return FileProber.reject(reasons, "not a flac ({0})".format(e if isinstance(e, FlacError) else
+                                                                       "file is too short"))
+
+        if metadata[0].block_type != "StreamInfo":
+            return FileProber.reject(reasons, "not a flac (no StreamInfo block)")
 
-            for m in metadata:
-                if not m.validate():
-                    return False
+        for m in metadata:
+            if not m.validate():
+                return FileProber.reject(reasons, "not a flac (invalid {0} block)".format(m.block_type))
+
+        stream_info = cast(FlacMetadataStreamInfo, metadata[0])
+        comments = cast(Optional[FlacMetadataVorbis], next((m for m in metadata if m.block_type == "VorbisComment"),
+                                                           None))
+        title = comments.tag("TITLE") if comments else None
+        artist = comments.tag("ARTIST") if comments else None
+        album = comments.tag("ALBUM") if comments else None
+        try:
+            # noinspection SpellCheckingInspection
+            track = int(comments.tag("TRACKNUMBER"))
+        except (AttributeError, ValueError, TypeError):
+            track = None
 
-            return True
+        total_samples = stream_info.total_samples
+        duration_source = "StreamInfo"
+        if total_samples == 0:
+            # Not known when the flac was written, e.g. by an encoder writing to a pipe
+            scanner = FlacScanner(file_handle, stream_info, file_handle.tell())
+            (total_samples, duration_source) = (scanner.total_samples, scanner.method)
 
-        except FlacError:
-            return False
+        return ProbeResult(file_name, "flac", title, artist, album, track, stream_info.sample_rate,
+                           stream_info.channels, float(total_samples) / stream_info.sample_rate, duration_source,
+                           "flac")
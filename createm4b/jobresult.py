@@ -0,0 +1,28 @@
+"""Outcome of a scheduled job"""
+from typing import Optional
+
+
+class JobResult:
+    """Whether a job succeeded, how long it took, and the error that stopped it if it didn't"""
+
+    @property
+    def job(self) -> object:
+        return self.__job
+
+    @property
+    def succeeded(self) -> bool:
+        return self.__error is None
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.__error
+
+    @property
+    def seconds(self) -> float:
+        """Time spent preparing and running the job, not counting time waiting for a free slot"""
+        return self.__seconds
+
+    def __init__(self, job: object, error: Optional[str]=None, seconds: float=0.0):
+        self.__job = job
+        self.__error = error
+        self.__seconds = seconds
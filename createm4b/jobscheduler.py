@@ -0,0 +1,105 @@
+"""Running many jobs without oversubscribing the CPUs or the disk"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from .jobresult import JobResult
+
+
+class JobScheduler:
+    """Runs jobs in two stages: an I/O bound preparation (probing), then a CPU bound run (encoding)
+
+    At most disk_slots jobs are prepared at once, and running jobs together use at most cpu_slots CPUs, each taking
+    as many as its weight.  Jobs are prepared as soon as a disk slot is free, so preparing the next jobs overlaps with
+    running the current ones, but no more than disk_slots + cpu_slots jobs are prepared ahead of the ones started.
+    Jobs are started in the order they were given, a heavy job holding back the lighter ones after it.
+    """
+
+    @property
+    def cpu_slots(self) -> int:
+        return self.__cpu_slots
+
+    @property
+    def disk_slots(self) -> int:
+        return self.__disk_slots
+
+    @property
+    def cpus_in_use(self) -> int:
+        return self.__cpus_in_use
+
+    def run(self, jobs: List[object], prepare: Callable[[object], object], execute: Callable[[object, object], None],
+            weight: Optional[Callable[[object], int]]=None,
+            on_result: Optional[Callable[[JobResult], None]]=None) -> List[JobResult]:
+        """Prepare and run every job, carrying on past ones that fail
+
+        :param prepare: Called with a job, returning what execute needs to run it
+        :param execute: Called with a job and what prepare returned
+        :param weight: Number of CPUs a job uses while it runs (1 by default)
+        :param on_result: Called with each job's result as soon as it finishes
+        :return: The result of each job, in the order they were given
+        """
+        with ThreadPoolExecutor(max_workers=self.__disk_slots) as prepare_executor, \
+                ThreadPoolExecutor(max_workers=self.__cpu_slots) as execute_executor:
+            self.__turn = 0
+            results = []
+            for (ticket, job) in enumerate(jobs):
+                self.__lookahead.acquire()
+                preparation = prepare_executor.submit(JobScheduler.__timed, prepare, job)
+                results.append(execute_executor.submit(self.__run_job, ticket, job, preparation, execute, weight,
+                                                       on_result))
+            return [result.result() for result in results]
+
+    @staticmethod
+    def __timed(function: Callable[[object], object], job: object):
+        started = time.monotonic()
+        return function(job), time.monotonic() - started
+
+    def __run_job(self, ticket: int, job: object, preparation: Future, execute: Callable[[object, object], None],
+                  weight: Optional[Callable[[object], int]],
+                  on_result: Optional[Callable[[JobResult], None]]) -> JobResult:
+        try:
+            (prepared, seconds) = preparation.result()
+        except Exception as e:
+            # Give up the job's turn, so the jobs after it can start
+            self.__acquire(ticket, 0)
+            self.__lookahead.release()
+            result = JobResult(job, str(e) or type(e).__name__)
+        else:
+            cpus = min(max(weight(job) if weight is not None else 1, 1), self.__cpu_slots)
+            self.__acquire(ticket, cpus)
+            self.__lookahead.release()
+            started = time.monotonic()
+            try:
+                execute(job, prepared)
+                result = JobResult(job, seconds=seconds + time.monotonic() - started)
+            except Exception as e:
+                result = JobResult(job, str(e) or type(e).__name__, seconds + time.monotonic() - started)
+            finally:
+                self.__release(cpus)
+
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    def __acquire(self, ticket: int, cpus: int):
+        """Wait until every job before ticket has started and cpus CPUs are free, then take them"""
+        with self.__condition:
+            while self.__turn != ticket or self.__cpus_in_use + cpus > self.__cpu_slots:
+                self.__condition.wait()
+            self.__cpus_in_use += cpus
+            self.__turn += 1
+            self.__condition.notify_all()
+
+    def __release(self, cpus: int):
+        with self.__condition:
+            self.__cpus_in_use -= cpus
+            self.__condition.notify_all()
+
+    def __init__(self, cpu_slots: int, disk_slots: int=1):
+        self.__cpu_slots = max(cpu_slots, 1)
+        self.__disk_slots = max(disk_slots, 1)
+        self.__cpus_in_use = 0
+        self.__turn = 0
+        self.__condition = threading.Condition()
+        self.__lookahead = threading.BoundedSemaphore(self.__disk_slots + self.__cpu_slots)
@@ -1,10 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
-from io import FileIO, SEEK_END, SEEK_SET
+from io import FileIO, SEEK_CUR, SEEK_END, SEEK_SET
 
 from createm4b import util
-from .mp3error import Mp3Error
 
 
 class ID3Base(ABC):
@@ -71,36 +70,122 @@ class ID3:
         return id3
 
 
+class ID3v2TagReader:
+    """Reads an id3v2 tag body sequentially, undoing tag-wide unsynchronisation as it goes
+
+    Only the bytes asked for are kept.  Without unsynchronisation skipped bytes are seeked past; with
+    it (id3v2.2/2.3, where frame sizes count the bytes before unsynchronisation was applied) they
+    still have to be read, but in fixed size chunks that are thrown away.
+    """
+    CHUNK_SIZE: int = 64 * 1024
+
+    @property
+    def remaining(self) -> int:
+        return self.__remaining + len(self.__buffer)
+
+    def read(self, size: int) -> bytes:
+        if not self.__unsynchronised:
+            data = self.__file_handle.read(min(size, self.__remaining))
+            self.__remaining -= len(data)
+            return data
+
+        while len(self.__buffer) < size and self.__remaining > 0:
+            self.__fill()
+        data = self.__buffer[:size]
+        self.__buffer = self.__buffer[size:]
+        return data
+
+    def skip(self, size: int):
+        if not self.__unsynchronised:
+            size = min(size, self.__remaining)
+            self.__file_handle.seek(size, SEEK_CUR)
+            self.__remaining -= size
+            return
+
+        while size > 0 and (self.__buffer or self.__remaining > 0):
+            if not self.__buffer:
+                self.__fill()
+            skipped = min(size, len(self.__buffer))
+            self.__buffer = self.__buffer[skipped:]
+            size -= skipped
+
+    def __fill(self):
+        chunk = self.__file_handle.read(min(ID3v2TagReader.CHUNK_SIZE, self.__remaining))
+        if len(chunk) == 0:
+            self.__remaining = 0
+            return
+
+        self.__remaining -= len(chunk)
+        if self.__pending_ff and chunk[0] == 0:
+            chunk = chunk[1:]
+        self.__pending_ff = chunk.endswith(b"\xff")
+        self.__buffer += chunk.replace(b"\xff\x00", b"\xff")
+
+    def __init__(self, file_handle: FileIO, size: int, unsynchronised: bool):
+        self.__file_handle = file_handle
+        self.__remaining = size
+        self.__unsynchronised = unsynchronised
+        self.__buffer = b""
+        self.__pending_ff = False
+
+
 class ID3v2(ID3Base):
+    """id3v2.2, 2.3 or 2.4 tag
+
+    Frame headers are walked and only the frames behind the properties below are read; everything else
+    (cover art in particular) is skipped without being loaded.  Text is decoded on first access.
+    """
     __id3_size: int = 0
+    __is_id3: bool = False
+
+    # Frames that are read, by id3v2.3/2.4 and id3v2.2 frame id
+    __wanted_frames = {"TIT2", "TPE1", "TALB", "TYER", "TDRC", "TRCK", "TCON", "COMM",
+                       "TT2", "TP1", "TAL", "TYE", "TRK", "TCO", "COM"}
 
     @property
-    def album(self) -> str:
-        return self.__album
+    def album(self) -> Optional[str]:
+        return self.__text("TALB", "TAL")
 
     @property
-    def genre(self) -> str:
-        return self.__genre
+    def genre(self) -> Optional[str]:
+        genre = self.__text("TCON", "TCO")
+        return ID3v2.__decode_genre(genre) if genre else genre
 
     @property
     def track(self) -> Optional[int]:
-        return self.__track
+        track = self.__text("TRCK", "TRK")
+        try:
+            return int(track.split("/")[0]) if track is not None else None
+        except ValueError:
+            return None
 
     @property
     def year(self) -> Optional[int]:
-        return self.__year
+        year = self.__text("TYER", "TYE", "TDRC")
+        try:
+            return int(year[0:4]) if year is not None else None
+        except ValueError:
+            return None
 
     @property
     def comments(self) -> Dict[str, str]:
+        if self.__comments is None:
+            self.__comments = {}
+            for body in self.__comment_frames:
+                if len(body) < 4 or bytes(body[1:4]).lower() != b"eng":
+                    continue
+                comments = ID3v2.__decode_id3_text(body[4:], body[0]).split("\0", 1)
+                self.__comments[comments[0]] = comments[1] if len(comments) > 1 else ""
+
         return self.__comments
 
     @property
-    def title(self) -> str:
-        return self.__title
+    def title(self) -> Optional[str]:
+        return self.__text("TIT2", "TT2")
 
     @property
-    def artist(self) -> str:
-        return self.__artist
+    def artist(self) -> Optional[str]:
+        return self.__text("TPE1", "TP1")
 
     @property
     def is_valid_id3(self) -> bool:
@@ -110,139 +195,157 @@ class ID3v2(ID3Base):
     def size(self) -> int:
         return self.__id3_size
 
-    # noinspection SpellCheckingInspection
-    def __parse_id3_data(self):
-        if self.__unsynchronisation:
-            raise Mp3Error("Unsynchronisation bit is not supported.")
+    def __text(self, *frame_ids: str) -> Optional[str]:
+        for frame_id in frame_ids:
+            if frame_id in self.__decoded:
+                return self.__decoded[frame_id]
 
-        position = 0
-        self.__comments = {}
-        d = self.__data
-        if self.__extended_header:
-            # Skip the extended header.
-            size = util.parse_32bit_little_endian(d[0:4])
-            position += 4 + size
+            body = self.__frames.get(frame_id)
+            if body is not None and len(body) > 0:
+                text = ID3v2.__decode_id3_text(body[1:], body[0]).split("\0")[0]
+                self.__decoded[frame_id] = text
+                return text
 
-        tag_size = 3 if self.__id3_version == 2 else 4
+        return None
 
-        while position < self.__id3_size:
-            if self.__id3_size - position < 6:
+    # noinspection SpellCheckingInspection
+    def __read_frames(self, reader: ID3v2TagReader):
+        if self.__id3_version == 2:
+            header_size = 6
+        else:
+            header_size = 10
+            if self.__extended_header:
+                # Skip the extended header.  Its size includes itself in id3v2.4, but not in id3v2.3
+                size = reader.read(4)
+                if len(size) < 4:
+                    return
+                reader.skip(util.parse_syncsafe_integer(size) - 4 if self.__id3_version == 4
+                            else util.parse_32bit_big_endian(size))
+
+        while reader.remaining >= header_size:
+            header = reader.read(header_size)
+            if len(header) < header_size or header[0] == 0:
+                # Padding
                 break
 
-            # Read a frame header
-            frame_type = d[position:position + tag_size].decode("ascii")
-            raw_frame_size = d[position + tag_size:position + (tag_size * 2)]
-            frame_size = util.parse_32bit_little_endian(raw_frame_size) if self.__id3_version > 2 \
-                else (raw_frame_size[0] << 24 | raw_frame_size[1] << 16 | raw_frame_size[2])
-            frame_flags = d[position + 8:position + 10] if self.__id3_version > 2 else b"\0\0"
-
-            position += 6 if self.__id3_version == 2 else 10
-            if ((not frame_type.startswith("T"))
-                    and frame_type != "COMM"
-                    and frame_type != "COM")\
-                    or frame_flags[1] & 0xc0 > 0:
-                # Not a frame we care about, or encrypted, or compressed
-                position += frame_size
+            if self.__id3_version == 2:
+                frame_id = header[0:3].decode("latin-1")
+                frame_size = header[3] << 16 | header[4] << 8 | header[5]
+                frame_flags = 0
+            else:
+                frame_id = header[0:4].decode("latin-1")
+                frame_size = util.parse_syncsafe_integer(header[4:8]) if self.__id3_version == 4 \
+                    else util.parse_32bit_big_endian(header[4:8])
+                frame_flags = header[9]
+
+            if frame_id not in ID3v2.__wanted_frames:
+                reader.skip(frame_size)
+                continue
+
+            body = ID3v2.__frame_body(memoryview(reader.read(frame_size)), frame_flags, self.__id3_version,
+                                      self.__unsynchronisation)
+            if body is None:
                 continue
+            if frame_id == "COMM" or frame_id == "COM":
+                self.__comment_frames.append(body)
+            else:
+                self.__frames.setdefault(frame_id, body)
 
-            data_size = frame_size - 1
-
-            if frame_flags[1] & 0x20 > 0:
-                # Group number is appended to the frame header, skip it.
-                position += 1
-                data_size -= 1
-
-            # Text encoding byte
-            encoding = d[position]
-            position += 1
-
-            language = None
-            if frame_type == "COMM" or frame_type == "COM":
-                language = d[position:position+3].decode("ascii")
-                position += 3
-                data_size -= 3
-
-            decoded_text = ID3v2.__decode_id3_text(d[position:position + data_size], encoding)
-            if frame_type == "TALB" or frame_type == "TAL":
-                self.__album = decoded_text
-            elif frame_type == "TIT2" or frame_type == "TT2":
-                self.__title = decoded_text
-            elif frame_type == "TPE1" or frame_type == "TP1":
-                self.__artist = decoded_text
-            elif frame_type == "TYE":
-                try:
-                    self.__year = int(decoded_text)
-                except ValueError:
-                    self.__year = None
-            elif frame_type == "TDRC":
-                try:
-                    self.__year = int(decoded_text[0:4])
-                except ValueError:
-                    self.__year = None
-            elif frame_type == "TRCK" or frame_type == "TRK":
-                try:
-                    self.__track = int(decoded_text.split("/")[0])
-                except ValueError:
-                    self.__track = None
-            elif frame_type == "TCON" or frame_type == "TCO":
-                self.__genre = ID3v2.__decode_genre(decoded_text)
-            elif frame_type == "COMM" or frame_type == "COM":
-                if language.lower() == "eng":
-                    comments = decoded_text.split("\0")
-                    self.__comments[comments[0]] = comments[1]
-
-            position += data_size
+    @staticmethod
+    def __frame_body(body: memoryview, flags: int, version: int, tag_unsynchronised: bool) -> Optional[memoryview]:
+        """Strip the extra data that frame format flags add to a frame's body
+
+        :return: The body, or None for compressed or encrypted frames
+        """
+        if version == 3:
+            if flags & 0xc0 > 0:
+                return None
+            return body[1:] if flags & 0x20 else body
+
+        if flags & 0x0c > 0:
+            return None
+        if flags & 0x40:
+            # Group id
+            body = body[1:]
+        if flags & 0x01:
+            # Data length indicator
+            body = body[4:]
+        if version == 4 and (flags & 0x02 or tag_unsynchronised):
+            body = memoryview(bytes(body).replace(b"\xff\x00", b"\xff"))
+        return body
 
     @staticmethod
     def __decode_genre(genre_text: str) -> str:
         if genre_text[0] == "(":
             # Version 2 format
-            if genre_text[1] == "(":
+            if genre_text[1:2] == "(":
                 # escaped paren
                 return genre_text[1:]
             close_paren = genre_text.find(")")
-            numeric_genre = int(genre_text[1:close_paren])
+            try:
+                numeric_genre = int(genre_text[1:close_paren])
+            except ValueError:
+                return genre_text
             if len(genre_text[close_paren + 1:]) > 0 and (genre_text[close_paren + 1] != "("
                                                           or genre_text[close_paren + 1:close_paren + 2] == "(("):
                 return genre_text[close_paren + 1:]
             return str(numeric_genre)
 
         genres = genre_text.split("\0")
-        if len(genres) > 1:
+        if len(genres) > 1 and genres[1]:
             return genres[1]
         return genres[0]
 
     @staticmethod
-    def __decode_id3_text(data: bytes, encoding: int) -> str:
-        return data.decode(ID3v2.__get_encoding(encoding))[:-1]
+    def __decode_id3_text(data: memoryview, encoding: int) -> str:
+        return str(data, ID3v2.__get_encoding(encoding), "replace").rstrip("\0")
 
     @staticmethod
     def __get_encoding(encoding: int) -> str:
         if encoding == 0:
-            return "ascii"
+            return "latin-1"
+        if encoding == 2:
+            return "utf-16-be"
         if encoding == 3:
             return "utf-8"
         return "utf-16"
 
     def __init__(self, file_handle: FileIO):
+        self.__frames: Dict[str, memoryview] = {}
+        self.__comment_frames: List[memoryview] = []
+        self.__decoded: Dict[str, str] = {}
+        self.__comments: Optional[Dict[str, str]] = None
+
         data = file_handle.read(10)
-        if data[0:3].decode("ascii") != "ID3":
-            self.__is_id3 = False
+        if data[0:3] != b"ID3" or len(data) < 10:
             return
 
-        self.__id3_size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
         flags = data[5]
         self.__id3_version = int(data[3])
         self.__unsynchronisation = flags & 0x80 == 0x80
-        self.__extended_header = flags & 0x40 == 0x40
-        self.__experimental = flags & 0x20 == 0x20
-        self.__is_id3 = flags & 0x1f == 0
-        self.__data = file_handle.read(self.__id3_size)
-        self.__parse_id3_data()
+        self.__extended_header = flags & 0x40 == 0x40 and self.__id3_version > 2
+        footer = flags & 0x10 == 0x10 and self.__id3_version == 4
+        self.__is_id3 = 2 <= self.__id3_version <= 4 and flags & 0x0f == 0
+        if not self.__is_id3:
+            return
+
+        tag_size = util.parse_syncsafe_integer(data[6:10])
+        self.__id3_size = tag_size + (10 if footer else 0)
+
+        # id3v2.4 frame sizes already count unsynchronisation, so the tag can be walked with seeks
+        reader = ID3v2TagReader(file_handle, tag_size, self.__unsynchronisation and self.__id3_version < 4)
+        self.__read_frames(reader)
 
 
 class ID3v1(ID3Base):
     __is_id3: bool = False
+    __title: Optional[str] = None
+    __artist: Optional[str] = None
+    __album: Optional[str] = None
+    __year: Optional[int] = None
+    __track: Optional[int] = None
+    __genre: Optional[str] = None
+    __comments: Dict[str, str] = {}
 
     @property
     def album(self) -> str:
@@ -280,18 +383,23 @@ class ID3v1(ID3Base):
     def size(self) -> int:
         return 0
 
+    @staticmethod
+    def __decode_text(data: bytes) -> str:
+        return data.decode("latin-1").rstrip("\0 ")
+
     def __init__(self, data: bytes):
-        try:
-            if data[0:3].decode("ascii") == "TAG":
-                self.__is_id3 = True
-        except UnicodeDecodeError:
+        if len(data) < 128 or data[0:3] != b"TAG":
             return
 
+        self.__is_id3 = True
         self.__comments = {}
-        self.__title = data[3:30].decode("ascii")
-        self.__artist = data[33:63].decode("ascii")
-        self.__album = data[63:93].decode("ascii")
-        self.__year = int(data[93:97].decode("ascii"))
-        self.__comments["id3v1"] = data[97:127].decode("ascii")
-        self.__track = int(data[127]) if data[126] == 0 else None  # id3v1.1
-        self.__genre = str(int(data[128]))
+        self.__title = ID3v1.__decode_text(data[3:33])
+        self.__artist = ID3v1.__decode_text(data[33:63])
+        self.__album = ID3v1.__decode_text(data[63:93])
+        try:
+            self.__year = int(ID3v1.__decode_text(data[93:97]))
+        except ValueError:
+            self.__year = None
+        self.__comments["id3v1"] = ID3v1.__decode_text(data[97:127])
+        self.__track = int(data[126]) if data[125] == 0 and data[126] != 0 else None  # id3v1.1
+        self.__genre = str(int(data[127]))
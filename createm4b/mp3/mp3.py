@@ -1,59 +1,60 @@
-from io import SEEK_CUR
 from typing import Optional
 
 from ..audiosource import AudioSource
 from ..filevalidator import FileValidator
-from .id3 import ID3Base, ID3
+from ..proberesult import ProbeResult
 from .mp3error import Mp3Error
-from .mp3frame import Mp3Frame
+from .mp3validator import Mp3Validator
 
 
 class Mp3(AudioSource):
     """mp3 file"""
 
     __file_name: Optional[str] = None
-    __duration: Optional[float] = None
-    __id3: Optional[ID3Base] = None
+    __probe_result: Optional[ProbeResult] = None
 
     @property
     def title(self) -> str:
         """Title of the mp3 from id3 tag"""
-        return self.tags.title
+        return self.probe_result.title
 
     @property
     def artist(self) -> str:
-        return self.tags.artist
+        return self.probe_result.artist
 
     @property
     def album(self) -> str:
-        return self.tags.album
+        return self.probe_result.album
 
     @property
     def track(self) -> int:
-        return self.tags.track
+        return self.probe_result.track
 
     @property
     def duration(self) -> float:
         """Duration of the mp3, in seconds"""
-        self.__duration = self.__duration or self.__get_duration()
-
-        return self.__duration
-
-    def __get_duration(self):
-        f = open(self.__file_name, 'rb')
-        if self.__id3 is None:
-            self.__id3 = ID3.read_id3(f)
-        else:
-            f.seek(self.__id3.size + 10)
-
-        duration = 0.0
-        data = f.read(4)
-        while len(data) == 4:
-            frame = Mp3Frame(data)
-            duration += frame.frame_duration
-            f.seek(frame.frame_length - 4, SEEK_CUR)
-            data = f.read(4)
-        return duration
+        return self.probe_result.duration
+
+    @property
+    def stream_duration(self) -> float:
+        return self.probe_result.stream_duration
+
+    @property
+    def duration_source(self) -> Optional[str]:
+        """How the duration was determined: Xing, Info or VBRI header, or a full frame scan"""
+        return self.probe_result.duration_source
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self.probe_result.sample_rate
+
+    @property
+    def channels(self) -> Optional[int]:
+        return self.probe_result.channels
+
+    @property
+    def codec(self) -> Optional[str]:
+        return self.probe_result.codec
 
     @property
     def file_name(self) -> str:
@@ -61,16 +62,17 @@ class Mp3(AudioSource):
         return self.__file_name
 
     @property
-    def tags(self) -> ID3Base:
-        self.__id3 = self.__id3 or self.__read_id3()
-
-        return self.__id3
+    def probe_result(self) -> ProbeResult:
+        """Everything read from the file, probing it now if that wasn't done when it was validated"""
+        if self.__probe_result is None:
+            self.__probe_result = Mp3Validator().probe_file(self.__file_name)
+            if self.__probe_result is None:
+                raise Mp3Error("file is not an mp3 file")
 
-    def __read_id3(self):
-        f = open(self.__file_name, 'rb')
-        return ID3.read_id3(f)
+        return self.__probe_result
 
-    def __init__(self, mp3_validator: FileValidator, file_name: str):
-        if not mp3_validator.is_valid(file_name):
+    def __init__(self, mp3_validator: FileValidator, file_name: str, probe_result: Optional[ProbeResult]=None):
+        if probe_result is None and not mp3_validator.is_valid(file_name):
             raise Mp3Error("file is not an mp3 file")
         self.__file_name = file_name
+        self.__probe_result = probe_result
@@ -1,8 +1,18 @@
-from typing import List
+from typing import Dict, List, NamedTuple, Union
 
 from .mp3error import Mp3Error
 
 
+class Mp3FrameInfo(NamedTuple):
+    """Everything that can be derived from the version, layer, bitrate, sample rate and padding bits"""
+    frame_length: int
+    samples: int
+    sample_rate: int
+    bitrate: int
+    frame_duration: float
+    mpeg_version: str
+
+
 class Mp3Frame:
     __bitrate_chart: List[List[int]] = [
         [0, 0, 0, 0, 0],
@@ -34,61 +44,92 @@ class Mp3Frame:
         [384, 1152, 576]
     ]
 
+    # Decoded headers (or the reason they are invalid), keyed by the second and third header bytes
+    __decode_cache: Dict[int, Union[Mp3FrameInfo, str]] = {}
+
+    @property
+    def info(self) -> Mp3FrameInfo:
+        return self.__info
+
     @property
     def frame_length(self) -> int:
-        return self.__frame_length
+        return self.__info.frame_length
 
     @property
     def sample_rate(self) -> int:
-        return self.__sample_rate
+        return self.__info.sample_rate
 
     @property
     def bitrate(self) -> int:
-        return self.__bitrate
+        return self.__info.bitrate
+
+    @property
+    def mpeg_version(self) -> str:
+        return self.__info.mpeg_version
+
+    @property
+    def is_mono(self) -> bool:
+        return self.__channel_mode == 3
 
     @property
     def samples(self) -> int:
-        return Mp3Frame.__sample_count_chart[self.__version_index][self.__layer_index]
+        return self.__info.samples
 
     @property
     def frame_duration(self) -> float:
-        return float(self.samples) / self.sample_rate
+        return self.__info.frame_duration
 
-    def __init__(self, data: bytes):
-        frame_hdr = data[0:4]
-        if frame_hdr[0] != 255:
+    @staticmethod
+    def decode_header(data: bytes) -> Mp3FrameInfo:
+        """Decode the first three bytes of a frame header, using the shared cache
+
+        :raises Mp3Error: if the header is not a valid frame header
+        """
+        if data[0] != 255:
             raise Mp3Error("Invalid Frame Sync")
 
-        if frame_hdr[1] & 0xe0 != 0xe0:  # validate the rest of the frame_sync bits exist
+        if data[1] & 0xe0 != 0xe0:  # validate the rest of the frame_sync bits exist
             raise Mp3Error("Invalid Frame Sync")
 
-        version_id = (frame_hdr[1] & 0x18) >> 3
+        key = data[1] << 8 | data[2]
+        info = Mp3Frame.__decode_cache.get(key)
+        if info is None:
+            try:
+                info = Mp3Frame.__decode(data[1], data[2])
+            except Mp3Error as e:
+                info = str(e)
+            Mp3Frame.__decode_cache[key] = info
+
+        if isinstance(info, str):
+            raise Mp3Error(info)
+        return info
+
+    @staticmethod
+    def __decode(version_byte: int, bitrate_byte: int) -> Mp3FrameInfo:
+        version_id = (version_byte & 0x18) >> 3
         if version_id == 0:
-            self.__mpeg_version = '2.5'
-            self.__version_index = 2
+            mpeg_version = '2.5'
+            version_index = 2
         elif version_id == 2:
-            self.__mpeg_version = '2'
-            self.__version_index = 1
+            mpeg_version = '2'
+            version_index = 1
         elif version_id == 3:
-            self.__mpeg_version = '1'
-            self.__version_index = 0
+            mpeg_version = '1'
+            version_index = 0
         else:
             raise Mp3Error("Unknown MPEG version")
 
-        layer_description = (frame_hdr[1] & 6) >> 1
+        layer_description = (version_byte & 6) >> 1
         if layer_description == 1:
-            self.__layer_desc = 'Layer III'
-            self.__layer_index = 2
+            layer_index = 2
         elif layer_description == 2:
-            self.__layer_desc = 'Layer II'
-            self.__layer_index = 1
+            layer_index = 1
         elif layer_description == 3:
-            self.__layer_desc = 'Layer I'
-            self.__layer_index = 0
+            layer_index = 0
         else:
             raise Mp3Error("Unknown MPEG Layer")
 
-        bitrate_index = frame_hdr[2] >> 4
+        bitrate_index = bitrate_byte >> 4
         if bitrate_index == 15:
             raise Mp3Error("Unknown bitrate")
 
@@ -104,25 +145,32 @@ class Mp3Frame:
         #         bitrate_col = 3
         #     else:
         #         bitrate_col = 4
-        bitrate_col = self.__layer_index
-        if self.__version_index > 0:
-            bitrate_col += 3 + min(self.__layer_index, 1)
+        bitrate_col = layer_index
+        if version_index > 0:
+            bitrate_col = 3 + min(layer_index, 1)
 
-        self.__bitrate = Mp3Frame.__bitrate_chart[bitrate_index][bitrate_col]
-        if self.__bitrate <= 0:
+        bitrate = Mp3Frame.__bitrate_chart[bitrate_index][bitrate_col]
+        if bitrate <= 0:
             raise Mp3Error("Invalid bitrate")
 
-        sample_rate_index = (frame_hdr[2] & 0xc) >> 2
+        sample_rate_index = (bitrate_byte & 0xc) >> 2
         if sample_rate_index == 3:
             raise Mp3Error("Invalid sample rate")
 
-        self.__sample_rate = Mp3Frame.__sample_rate_chart[sample_rate_index][self.__version_index]
+        sample_rate = Mp3Frame.__sample_rate_chart[sample_rate_index][version_index]
+        samples = Mp3Frame.__sample_count_chart[version_index][layer_index]
 
-        padding = frame_hdr[2] & 2 == 2
+        padding = bitrate_byte & 2 == 2
 
         padding_length = 1 if padding else 0
-        if self.__layer_index == 0:
-            padding_length *= 4
-            self.__frame_length = int((12 * self.__bitrate * 1000 / self.__sample_rate + padding_length) * 4)
+        if layer_index == 0:
+            frame_length = int((12 * bitrate * 1000 / sample_rate + padding_length) * 4)
         else:
-            self.__frame_length = int(144 * self.__bitrate * 1000 / self.__sample_rate + padding_length)
+            # 144 bytes per kbps for 1152 sample frames, 72 for MPEG-2/2.5 Layer III's 576 sample frames
+            frame_length = int(samples // 8 * bitrate * 1000 / sample_rate + padding_length)
+
+        return Mp3FrameInfo(frame_length, samples, sample_rate, bitrate, float(samples) / sample_rate, mpeg_version)
+
+    def __init__(self, data: bytes):
+        self.__info = Mp3Frame.decode_header(data)
+        self.__channel_mode = data[3] >> 6
@@ -0,0 +1,92 @@
+"""Fast frame-by-frame scan of an mp3 stream"""
+from typing import List, Optional, Tuple
+
+from ..fileaccess import FileAccess
+from .mp3error import Mp3Error
+from .mp3frame import Mp3Frame
+
+
+class Mp3Scanner:
+    """Walks every frame header of an mp3 stream to count frames and total duration
+
+    The file is memory mapped and each header is looked up in a table indexed by its second and third
+    bytes, read through a memoryview over the map, so the walk costs a few byte reads and a list lookup
+    per frame instead of a seek, a read and an Mp3Frame instance.
+    """
+
+    __frame_tables: Optional[Tuple[List[int], List[float]]] = None
+
+    @property
+    def frame_count(self) -> int:
+        return self.__frame_count
+
+    @property
+    def duration(self) -> float:
+        """Duration of the scanned stream, in seconds"""
+        return self.__duration
+
+    @staticmethod
+    def __get_frame_tables() -> Tuple[List[int], List[float]]:
+        """Flatten the Mp3Frame decode cache into frame length and frame duration tables
+
+        Both are indexed by the second and third header bytes; invalid headers have a length of 0.
+        """
+        if Mp3Scanner.__frame_tables is None:
+            lengths = [0] * 0x10000
+            durations = [0.0] * 0x10000
+            for key in range(0xe000, 0x10000):
+                try:
+                    info = Mp3Frame.decode_header(bytes([0xff, key >> 8, key & 0xff]))
+                except Mp3Error:
+                    continue
+                lengths[key] = info.frame_length
+                durations[key] = info.frame_duration
+            Mp3Scanner.__frame_tables = (lengths, durations)
+
+        return Mp3Scanner.__frame_tables
+
+    def __scan(self, data, position: int):
+        (lengths, durations) = Mp3Scanner.__get_frame_tables()
+        end = len(data)
+        frame_count = 0
+        duration = 0.0
+
+        view = memoryview(data)
+        try:
+            while position + 4 <= end:
+                key = view[position + 1] << 8 | view[position + 2]
+                length = lengths[key] if view[position] == 0xff else 0
+                if length == 0:
+                    if end - position == 128 and view[position:position + 3] == b"TAG":
+                        # Trailing id3v1 tag
+                        break
+                    raise Mp3Error("Invalid Frame Sync")
+
+                frame_count += 1
+                duration += durations[key]
+                position += length
+        finally:
+            view.release()
+
+        self.__frame_count += frame_count
+        self.__duration += duration
+
+    def __init__(self, file_handle, start: int=0):
+        """Scan the stream in an open file
+
+        :param file_handle: File opened in binary mode
+        :param start: Offset of the first frame header (i.e. just past any id3v2 tag)
+        """
+        self.__frame_count = 0
+        self.__duration = 0.0
+
+        try:
+            data = FileAccess.default().map_file(file_handle)
+        except ValueError:
+            # Empty files can't be mapped
+            return
+
+        try:
+            self.__scan(data, start)
+        finally:
+            data.close()
@@ -1,34 +1,59 @@
-from io import SEEK_CUR
+import os
+from io import SEEK_END
+from typing import BinaryIO, List, Optional
 
-from createm4b.filevalidator import FileValidator
-from .id3 import ID3
+from createm4b.fileprober import FileProber
+from createm4b.proberesult import ProbeResult
+from .id3 import ID3Base, ID3v1, ID3v2
 from .mp3error import Mp3Error
 from .mp3frame import Mp3Frame
+from .mp3scanner import Mp3Scanner
+from .vbrheader import VbrHeader
 
 
-class Mp3Validator(FileValidator):
-    def is_valid(self, file_path: str) -> bool:
-        f = None
+class Mp3Validator(FileProber):
+    def probe(self, file_handle: BinaryIO, file_name: str, reasons: Optional[List[str]]=None) \
+            -> Optional[ProbeResult]:
+        """Validate an mp3 and read its tags and duration in one forward pass over the open file"""
+        start = file_handle.tell()
+        id3 = ID3v2(file_handle)
+        audio_start = start + id3.size + 10 if id3.is_valid_id3 else start
+        file_handle.seek(audio_start)
 
-        # noinspection PyBroadException
         try:
-            f = open(file_path, 'rb')
-
-            # Skip over any id3 block, if it exists
-            ID3.read_id3(f, True)
-
-            try:
-                block = f.read(4)
-                frame = Mp3Frame(block)
-
-                # Verify the next frame
-                f.seek(frame.frame_length - 4, SEEK_CUR)
-                block = f.read(4)
-                Mp3Frame(block)
-            except Mp3Error:
-                return False
-        finally:
-            if f is not None:
-                f.close()
-
-        return True
+            data = file_handle.read(4)
+            frame = Mp3Frame(data)
+            data += file_handle.read(frame.frame_length - 4)
+
+            # Verify the next frame
+            Mp3Frame(file_handle.read(4))
+        except (Mp3Error, IndexError) as e:
+            return FileProber.reject(reasons, "not an mp3 ({0})".format(e if isinstance(e, Mp3Error) else
+                                                                       "file is too short"))
+
+        file_size = os.fstat(file_handle.fileno()).st_size
+        tags = id3 if id3.is_valid_id3 else Mp3Validator.__read_id3v1(file_handle, file_size)
+        audio_size = file_size - audio_start - (128 if isinstance(tags, ID3v1) and tags.is_valid_id3 else 0)
+
+        header = VbrHeader.read_vbr_header(frame, data)
+        if header is not None and header.is_plausible(frame, audio_size):
+            duration = header.duration(frame)
+            duration_source = header.header_type
+            stream_duration = float(header.frame_count * frame.samples) / frame.sample_rate
+        else:
+            duration = Mp3Scanner(file_handle, audio_start).duration
+            duration_source = "scan"
+            # A summary header frame is counted by the scan, but it holds no audio
+            stream_duration = duration - (frame.frame_duration if header is not None else 0)
+
+        return ProbeResult(file_name, "mp3", tags.title, tags.artist, tags.album, tags.track,
+                           frame.sample_rate, 1 if frame.is_mono else 2, duration, duration_source, "mp3",
+                           stream_duration)
+
+    @staticmethod
+    def __read_id3v1(file_handle: BinaryIO, file_size: int) -> ID3Base:
+        if file_size < 128:
+            return ID3v1(b"")
+
+        file_handle.seek(-128, SEEK_END)
+        return ID3v1(file_handle.read(128))
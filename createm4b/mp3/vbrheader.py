@@ -0,0 +1,137 @@
+"""Xing/Info and VBRI summary headers"""
+from typing import Optional
+
+from createm4b import util
+from .mp3frame import Mp3Frame
+
+
+class VbrHeader:
+    """Summary header stored in the first frame of an mp3 by the encoder
+
+    Xing (VBR) and Info (CBR) headers are written by LAME and most other encoders, VBRI by the
+    Fraunhofer encoder.  Either one gives the number of audio frames without walking the file.
+    """
+
+    @property
+    def header_type(self) -> str:
+        """One of Xing, Info or VBRI"""
+        return self.__header_type
+
+    @property
+    def frame_count(self) -> Optional[int]:
+        """Number of audio frames following the header frame"""
+        return self.__frame_count
+
+    @property
+    def byte_count(self) -> Optional[int]:
+        """Size of the audio stream in bytes, including the header frame"""
+        return self.__byte_count
+
+    @property
+    def encoder(self) -> Optional[str]:
+        """Encoder string from the LAME extension, if present"""
+        return self.__encoder
+
+    @property
+    def encoder_delay(self) -> int:
+        """Samples of padding inserted at the start of the stream by the encoder"""
+        return self.__encoder_delay
+
+    @property
+    def encoder_padding(self) -> int:
+        """Samples of padding appended at the end of the stream by the encoder"""
+        return self.__encoder_padding
+
+    def sample_count(self, frame: Mp3Frame) -> int:
+        """Number of audible samples in the stream described by this header"""
+        samples = self.__frame_count * frame.samples - self.__encoder_delay - self.__encoder_padding
+        return max(samples, 0)
+
+    def duration(self, frame: Mp3Frame) -> float:
+        """Duration of the stream, in seconds"""
+        return float(self.sample_count(frame)) / frame.sample_rate
+
+    def is_plausible(self, frame: Mp3Frame, audio_size: int) -> bool:
+        """Sanity check the header against the amount of audio actually in the file
+
+        Truncated or re-tagged files often carry a header that no longer matches the stream, in which
+        case the frames have to be counted instead.
+        """
+        if not self.__frame_count:
+            return False
+
+        if self.__byte_count is not None:
+            if abs(self.__byte_count - audio_size) > max(audio_size // 20, 4096):
+                return False
+
+        duration = float(self.__frame_count * frame.samples) / frame.sample_rate
+        average_bitrate = audio_size * 8 / duration / 1000
+        return 8 <= average_bitrate <= 448
+
+    def __parse_xing(self, data: bytes, position: int):
+        flags = util.parse_32bit_big_endian(data[position + 4:position + 8])
+        position += 8
+        if flags & 0x1:
+            self.__frame_count = util.parse_32bit_big_endian(data[position:position + 4])
+            position += 4
+        if flags & 0x2:
+            self.__byte_count = util.parse_32bit_big_endian(data[position:position + 4])
+            position += 4
+        if flags & 0x4:
+            # Seek table of contents
+            position += 100
+        if flags & 0x8:
+            # VBR quality indicator
+            position += 4
+
+        lame = data[position:position + 24]
+        if len(lame) < 24 or lame[0:4] not in (b"LAME", b"Lavf", b"Lavc", b"L3.9"):
+            return
+
+        self.__encoder = lame[0:9].decode("ascii", "replace").rstrip("\0 ")
+        self.__encoder_delay = lame[21] << 4 | lame[22] >> 4
+        self.__encoder_padding = (lame[22] & 0x0f) << 8 | lame[23]
+
+    def __parse_vbri(self, data: bytes, position: int):
+        self.__encoder_delay = data[position + 6] << 8 | data[position + 7]
+        self.__byte_count = util.parse_32bit_big_endian(data[position + 10:position + 14])
+        self.__frame_count = util.parse_32bit_big_endian(data[position + 14:position + 18])
+
+    @staticmethod
+    def xing_offset(frame: Mp3Frame) -> int:
+        """Offset of the Xing/Info header from the start of the frame (after the side information)"""
+        if frame.mpeg_version == '1':
+            return 21 if frame.is_mono else 36
+        return 13 if frame.is_mono else 21
+
+    @staticmethod
+    def read_vbr_header(frame: Mp3Frame, data: bytes) -> Optional["VbrHeader"]:
+        """Look for a summary header in the first frame of an mp3
+
+        :param frame: The decoded header of the first frame
+        :param data: The contents of the first frame, starting with the frame header
+        :return: The parsed header, or None if the frame is a plain audio frame
+        """
+        position = VbrHeader.xing_offset(frame)
+        tag = data[position:position + 4]
+        if tag in (b"Xing", b"Info") and len(data) >= position + 8:
+            return VbrHeader(tag.decode("ascii"), data, position)
+
+        # VBRI always sits 32 bytes after the frame header
+        if data[36:40] == b"VBRI" and len(data) >= 36 + 18:
+            return VbrHeader("VBRI", data, 36)
+
+        return None
+
+    def __init__(self, header_type: str, data: bytes, position: int):
+        self.__header_type = header_type
+        self.__frame_count = None
+        self.__byte_count = None
+        self.__encoder = None
+        self.__encoder_delay = 0
+        self.__encoder_padding = 0
+
+        if header_type == "VBRI":
+            self.__parse_vbri(data, position)
+        else:
+            self.__parse_xing(data, position)
@@ -0,0 +1,10 @@
+"""MP4/M4A file handling"""
+
+from .mp4 import Mp4
+from .mp4atom import Mp4Atom
+from .mp4chapter import Mp4Chapter
+from .mp4error import Mp4Error
+from .mp4sampletable import Mp4SampleTable
+from .mp4track import Mp4Track
+from .mp4validator import Mp4Validator
+from .mp4writer import Mp4Writer
@@ -0,0 +1,76 @@
+from typing import Optional
+
+from ..audiosource import AudioSource
+from ..filevalidator import FileValidator
+from ..proberesult import ProbeResult
+from .mp4error import Mp4Error
+from .mp4validator import Mp4Validator
+
+
+class Mp4(AudioSource):
+    """mp4 (m4a/m4b) file"""
+
+    __probe_result: Optional[ProbeResult] = None
+
+    @property
+    def title(self) -> str:
+        return self.probe_result.title
+
+    @property
+    def artist(self) -> str:
+        return self.probe_result.artist
+
+    @property
+    def album(self) -> str:
+        return self.probe_result.album
+
+    @property
+    def track(self) -> Optional[int]:
+        return self.probe_result.track
+
+    @property
+    def duration(self) -> float:
+        """Duration of the audio track, in seconds"""
+        return self.probe_result.duration
+
+    @property
+    def stream_duration(self) -> float:
+        return self.probe_result.stream_duration
+
+    @property
+    def duration_source(self) -> Optional[str]:
+        """How the duration was determined: from the edit list (elst) or media header (mdhd)"""
+        return self.probe_result.duration_source
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self.probe_result.sample_rate
+
+    @property
+    def channels(self) -> Optional[int]:
+        return self.probe_result.channels
+
+    @property
+    def codec(self) -> Optional[str]:
+        return self.probe_result.codec
+
+    @property
+    def file_name(self) -> str:
+        return self.__file_name
+
+    @property
+    def probe_result(self) -> ProbeResult:
+        """Everything read from the file, probing it now if that wasn't done when it was validated"""
+        if self.__probe_result is None:
+            self.__probe_result = Mp4Validator().probe_file(self.__file_name)
+            if self.__probe_result is None:
+                raise Mp4Error("{0} is not an mp4 file".format(self.__file_name))
+
+        return self.__probe_result
+
+    def __init__(self, mp4_validator: FileValidator, file_name: str, probe_result: Optional[ProbeResult]=None):
+        if probe_result is None and not mp4_validator.is_valid(file_name):
+            raise Mp4Error("{0} is not an mp4 file".format(file_name))
+
+        self.__file_name = file_name
+        self.__probe_result = probe_result
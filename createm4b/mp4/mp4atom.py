@@ -0,0 +1,124 @@
+import os
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from createm4b import util
+from .mp4error import Mp4Error
+
+
+class Mp4Atom:
+    """Header of a single atom (box) in an mp4 file; the body is only read on request"""
+
+    @property
+    def atom_type(self) -> str:
+        return self.__atom_type
+
+    @property
+    def offset(self) -> int:
+        """Offset of the atom header in the file"""
+        return self.__offset
+
+    @property
+    def size(self) -> int:
+        """Size of the atom, including its header"""
+        return self.__size
+
+    @property
+    def body_offset(self) -> int:
+        return self.__offset + self.__header_size
+
+    @property
+    def body_size(self) -> int:
+        return self.__size - self.__header_size
+
+    @property
+    def end(self) -> int:
+        return self.__offset + self.__size
+
+    def read_body(self, file_handle: BinaryIO) -> bytes:
+        file_handle.seek(self.body_offset)
+        return file_handle.read(self.body_size)
+
+    def children(self, file_handle: BinaryIO, skip: int=0) -> Iterator["Mp4Atom"]:
+        """Child atoms of a container atom
+
+        :param skip: Bytes of the body to skip before the first child (e.g. 4 for the version/flags of meta)
+        """
+        return Mp4Atom.read_atoms(file_handle, self.body_offset + skip, self.end)
+
+    @staticmethod
+    def read_atoms(file_handle: BinaryIO, start: int, end: int) -> Iterator["Mp4Atom"]:
+        """Walk the atoms between two offsets without reading their bodies"""
+        position = start
+        while position + 8 <= end:
+            file_handle.seek(position)
+            atom = Mp4Atom(file_handle, position, end)
+            yield atom
+            position = atom.end
+
+    @staticmethod
+    def find(file_handle: BinaryIO, *path: str, start: int=0, end: Optional[int]=None) -> Optional["Mp4Atom"]:
+        """Find an atom by its path from the top level (or from start), e.g. find(f, "moov", "mvhd")"""
+        if end is None:
+            end = os.fstat(file_handle.fileno()).st_size
+
+        atom = None
+        for atom_type in path:
+            atom = next((a for a in Mp4Atom.read_atoms(file_handle, start, end) if a.atom_type == atom_type), None)
+            if atom is None:
+                return None
+            start = atom.body_offset + (4 if atom_type == "meta" else 0)
+            end = atom.end
+        return atom
+
+    @staticmethod
+    def split_atoms(data: bytes, start: int=0) -> List[Tuple[bytes, bytes]]:
+        """Split atoms already read into memory into the (type, body) of each"""
+        atoms = []
+        position = start
+        while position + 8 <= len(data):
+            size = util.parse_32bit_big_endian(data[position:position + 4])
+            header_size = 8
+            if size == 1:
+                size = int.from_bytes(data[position + 8:position + 16], "big")
+                header_size = 16
+            elif size == 0:
+                size = len(data) - position
+            if size < header_size or position + size > len(data):
+                raise Mp4Error("Invalid atom size at {0}".format(position))
+            atoms.append((data[position + 4:position + 8], data[position + header_size:position + size]))
+            position += size
+        return atoms
+
+    @staticmethod
+    def build_atom(atom_type: bytes, body: bytes) -> bytes:
+        return Mp4Atom.build_header(atom_type, len(body)) + body
+
+    @staticmethod
+    def build_header(atom_type: bytes, body_size: int) -> bytes:
+        """Header of an atom with a body of body_size bytes, using a 64 bit size if it needs one"""
+        if body_size + 8 > 0xffffffff:
+            return b"\0\0\0\x01" + atom_type + (body_size + 16).to_bytes(8, "big")
+        return (body_size + 8).to_bytes(4, "big") + atom_type
+
+    def __init__(self, file_handle: BinaryIO, offset: int, end: int):
+        """Read the atom header at the current position, which is offset in the file"""
+        header = file_handle.read(8)
+        if len(header) < 8:
+            raise Mp4Error("Truncated atom at {0}".format(offset))
+
+        self.__offset = offset
+        self.__atom_type = header[4:8].decode("latin-1")
+        self.__size = util.parse_32bit_big_endian(header)
+        self.__header_size = 8
+        if self.__size == 1:
+            large_size = file_handle.read(8)
+            if len(large_size) < 8:
+                raise Mp4Error("Truncated atom at {0}".format(offset))
+            self.__size = util.parse_32bit_big_endian(large_size) << 32 | util.parse_32bit_big_endian(large_size[4:])
+            self.__header_size = 16
+        elif self.__size == 0:
+            # Extends to the end of the file (or enclosing atom)
+            self.__size = end - offset
+
+        if self.__size < self.__header_size:
+            raise Mp4Error("Invalid {0} atom size at {1}".format(self.__atom_type, offset))
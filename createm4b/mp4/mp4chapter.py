@@ -0,0 +1,120 @@
+from typing import BinaryIO, List, Optional
+
+from createm4b import util
+from .mp4atom import Mp4Atom
+
+
+class Mp4Chapter:
+    """A chapter of an mp4 file: where it starts and its title"""
+
+    @property
+    def start(self) -> float:
+        """Start of the chapter, in seconds from the start of the audio"""
+        return self.__start
+
+    @property
+    def title(self) -> str:
+        return self.__title
+
+    @staticmethod
+    def read_chapters(file_handle: BinaryIO, moov: Mp4Atom) -> List["Mp4Chapter"]:
+        """Read the chapters of an mp4 file from its QuickTime chapter track, or failing that its Nero chapter list"""
+        tracks = [atom for atom in moov.children(file_handle) if atom.atom_type == "trak"]
+        chapter_tracks = []
+        for trak in tracks:
+            chap = Mp4Atom.find(file_handle, "tref", "chap", start=trak.body_offset, end=trak.end)
+            if chap is not None:
+                ids = chap.read_body(file_handle)
+                chapter_tracks.extend(util.parse_32bit_big_endian(ids[i:i + 4]) for i in range(0, len(ids), 4))
+
+        for trak in tracks:
+            tkhd = Mp4Atom.find(file_handle, "tkhd", start=trak.body_offset, end=trak.end)
+            header = tkhd.read_body(file_handle) if tkhd is not None else b""
+            if util.parse_32bit_big_endian(header[20:24] if header[:1] == b"\x01" else header[12:16]) in \
+                    chapter_tracks:
+                chapters = Mp4Chapter.__read_track(file_handle, trak)
+                if len(chapters) > 0:
+                    return chapters
+
+        chpl = Mp4Atom.find(file_handle, "udta", "chpl", start=moov.body_offset, end=moov.end)
+        return Mp4Chapter.__parse_chpl(chpl.read_body(file_handle)) if chpl is not None else []
+
+    @staticmethod
+    def __read_track(file_handle: BinaryIO, trak: Mp4Atom) -> List["Mp4Chapter"]:
+        """Chapters from a text track: each sample is a title, lasting until the next one"""
+        mdhd = Mp4Atom.find(file_handle, "mdia", "mdhd", start=trak.body_offset, end=trak.end)
+        stbl = Mp4Atom.find(file_handle, "mdia", "minf", "stbl", start=trak.body_offset, end=trak.end)
+        if mdhd is None or stbl is None:
+            return []
+        header = mdhd.read_body(file_handle)
+        timescale = util.parse_32bit_big_endian(header[20:24] if header[0] == 1 else header[12:16])
+        tables = {atom.atom_type: atom.read_body(file_handle) for atom in stbl.children(file_handle)}
+        if timescale == 0 or any(t not in tables for t in ("stts", "stsc", "stsz")):
+            return []
+
+        starts = []
+        position = 0
+        stts = tables["stts"]
+        for i in range(8, 8 + 8 * util.parse_32bit_big_endian(stts[4:8]), 8):
+            for _ in range(util.parse_32bit_big_endian(stts[i:i + 4])):
+                starts.append(position / timescale)
+                position += util.parse_32bit_big_endian(stts[i + 4:i + 8])
+
+        stsz = tables["stsz"]
+        count = util.parse_32bit_big_endian(stsz[8:12])
+        sample_size = util.parse_32bit_big_endian(stsz[4:8])
+        sizes = [sample_size] * count if sample_size != 0 else \
+            [util.parse_32bit_big_endian(stsz[i:i + 4]) for i in range(12, 12 + 4 * count, 4)]
+
+        if "co64" in tables:
+            co64 = tables["co64"]
+            chunk_offsets = [int.from_bytes(co64[i:i + 8], "big")
+                             for i in range(8, 8 + 8 * util.parse_32bit_big_endian(co64[4:8]), 8)]
+        else:
+            stco = tables.get("stco", b"\0" * 8)
+            chunk_offsets = [util.parse_32bit_big_endian(stco[i:i + 4])
+                             for i in range(8, 8 + 4 * util.parse_32bit_big_endian(stco[4:8]), 4)]
+
+        # Samples per chunk, from runs of chunks (numbered from 1) with the same count
+        stsc = tables["stsc"]
+        runs = [(util.parse_32bit_big_endian(stsc[i:i + 4]), util.parse_32bit_big_endian(stsc[i + 4:i + 8]))
+                for i in range(8, 8 + 12 * util.parse_32bit_big_endian(stsc[4:8]), 12)]
+        offsets = []
+        for (chunk, offset) in enumerate(chunk_offsets, 1):
+            per_chunk = next((n for (first, n) in reversed(runs) if first <= chunk), 0)
+            for _ in range(per_chunk):
+                if len(offsets) == len(sizes):
+                    break
+                offsets.append(offset)
+                offset += sizes[len(offsets) - 1]
+
+        chapters = []
+        for (start, offset, size) in zip(starts, offsets, sizes):
+            file_handle.seek(offset)
+            sample = file_handle.read(size)
+            length = sample[0] << 8 | sample[1] if len(sample) >= 2 else 0
+            text = sample[2:2 + length]
+            title = text[2:].decode("utf-16-be", "replace") if text[:2] == b"\xfe\xff" else \
+                text.decode("utf8", "replace")
+            chapters.append(Mp4Chapter(start, title))
+        return chapters
+
+    @staticmethod
+    def __parse_chpl(data: bytes) -> List["Mp4Chapter"]:
+        """Chapters from a Nero chapter list: each start (in 100ns units) and title"""
+        position = 8 if data[0] == 1 else 4
+        count = data[position]
+        position += 1
+        chapters = []
+        for _ in range(count):
+            if position + 9 > len(data):
+                break
+            start = int.from_bytes(data[position:position + 8], "big") / 10000000
+            length = data[position + 8]
+            chapters.append(Mp4Chapter(start, data[position + 9:position + 9 + length].decode("utf8", "replace")))
+            position += 9 + length
+        return chapters
+
+    def __init__(self, start: float, title: Optional[str]):
+        self.__start = start
+        self.__title = title or ""
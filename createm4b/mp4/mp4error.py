@@ -0,0 +1,2 @@
+class Mp4Error(Exception):
+    pass
@@ -0,0 +1,159 @@
+import struct
+from typing import List, Optional, Tuple
+
+from createm4b import util
+from .mp4atom import Mp4Atom
+from .mp4error import Mp4Error
+
+
+class Mp4SampleTable:
+    """The sample table (stbl) of a track: each sample's size and duration, and the chunks the samples are stored in
+
+    Only what's needed to add one track's samples to the end of another is decoded; the other atoms (such as the
+    sample descriptions) are kept as they are.
+    """
+
+    # Tables that depend on the samples, and can't be extended
+    __unsupported = (b"ctts", b"stz2", b"stdp", b"sdtp")
+
+    __sync: Optional[List[int]] = None
+    __groups: Optional[Tuple[bytes, bytes, List[Tuple[int, int]]]] = None
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.__sizes)
+
+    @property
+    def duration(self) -> int:
+        """Total duration of the samples, in the media timescale"""
+        return sum(count * delta for (count, delta) in self.__times)
+
+    @property
+    def data_range(self) -> Tuple[int, int]:
+        """Where the samples are: the offset of the first chunk, and the end of the last"""
+        ends = []
+        sample = 0
+        for (offset, samples, _) in self.__chunks:
+            ends.append(offset + sum(self.__sizes[sample:sample + samples]))
+            sample += samples
+        if len(ends) == 0:
+            return 0, 0
+        return min(offset for (offset, _, _) in self.__chunks), max(ends)
+
+    def append(self, other: "Mp4SampleTable", offset_delta: int):
+        """Add another track's samples after this track's
+
+        :param offset_delta: How far the other track's samples have been moved, from their offsets in its table
+        """
+        count = self.sample_count
+        for (samples, delta) in other.__times:
+            if len(self.__times) > 0 and self.__times[-1][1] == delta:
+                self.__times[-1] = (self.__times[-1][0] + samples, delta)
+            else:
+                self.__times.append((samples, delta))
+        self.__chunks.extend((offset + offset_delta, samples, description)
+                             for (offset, samples, description) in other.__chunks)
+        self.__sizes.extend(other.__sizes)
+
+        if self.__sync is not None:
+            # Without a sync sample table, every sample is a sync sample
+            new_sync = other.__sync if other.__sync is not None else range(1, other.sample_count + 1)
+            self.__sync.extend(count + number for number in new_sync)
+        if self.__groups is not None:
+            (grouping, header, entries) = self.__groups
+            if other.__groups is not None and other.__groups[0] == grouping:
+                entries.extend(other.__groups[2])
+            else:
+                entries.append((other.sample_count, 0))
+
+    def build(self) -> bytes:
+        """Body of the stbl atom"""
+        result = []
+        for (atom_type, body) in self.__atoms:
+            if atom_type == b"stts":
+                body = Mp4SampleTable.__build_table([(count, delta) for (count, delta) in self.__times])
+            elif atom_type == b"stsc":
+                runs = []
+                for (chunk, (_, samples, description)) in enumerate(self.__chunks, 1):
+                    if len(runs) == 0 or runs[-1][1:] != (samples, description):
+                        runs.append((chunk, samples, description))
+                body = Mp4SampleTable.__build_table(runs)
+            elif atom_type == b"stsz":
+                if len(set(self.__sizes)) == 1:
+                    body = b"\0" * 4 + struct.pack(">II", self.__sizes[0], len(self.__sizes))
+                else:
+                    body = b"\0" * 8 + struct.pack(">I{0}I".format(len(self.__sizes)), len(self.__sizes),
+                                                   *self.__sizes)
+            elif atom_type in (b"stco", b"co64"):
+                offsets = [offset for (offset, _, _) in self.__chunks]
+                atom_type = b"co64" if max(offsets, default=0) > 0xffffffff else b"stco"
+                body = b"\0" * 4 + struct.pack(">I{0}{1}".format(len(offsets), "Q" if atom_type == b"co64" else "I"),
+                                               len(offsets), *offsets)
+            elif atom_type == b"stss" and self.__sync is not None:
+                body = Mp4SampleTable.__build_table([(number,) for number in self.__sync])
+            elif atom_type == b"sbgp" and self.__groups is not None and body[4:8] == self.__groups[0]:
+                (grouping, header, entries) = self.__groups
+                body = header + len(entries).to_bytes(4, "big") + \
+                    b"".join(struct.pack(">II", count, index) for (count, index) in entries)
+            result.append(Mp4Atom.build_atom(atom_type, body))
+        return b"".join(result)
+
+    @staticmethod
+    def __build_table(entries: List[Tuple[int, ...]]) -> bytes:
+        """Version and flags, the entry count, then each entry's 32 bit fields"""
+        return b"\0" * 4 + len(entries).to_bytes(4, "big") + \
+            b"".join(struct.pack(">{0}I".format(len(entry)), *entry) for entry in entries)
+
+    @staticmethod
+    def __read_table(body: bytes, fields: int, size: int=4) -> List[Tuple[int, ...]]:
+        count = util.parse_32bit_big_endian(body[4:8])
+        data = body[8:8 + count * fields * size]
+        if len(data) < count * fields * size:
+            raise Mp4Error("Truncated sample table")
+        values = struct.unpack(">{0}{1}".format(count * fields, "Q" if size == 8 else "I"), data)
+        return [values[i:i + fields] for i in range(0, len(values), fields)]
+
+    def __init__(self, body: bytes):
+        """
+        :param body: Body of the stbl atom
+        """
+        self.__atoms = Mp4Atom.split_atoms(body)
+        tables = dict(self.__atoms)
+        unsupported = [t.decode("latin-1") for t in Mp4SampleTable.__unsupported if t in tables]
+        if len(unsupported) > 0:
+            raise Mp4Error("Can't extend a track with {0} tables".format(", ".join(unsupported)))
+        if any(t not in tables for t in (b"stts", b"stsc", b"stsz")) or \
+                (b"stco" not in tables and b"co64" not in tables):
+            raise Mp4Error("Incomplete sample table")
+
+        self.__times: List[Tuple[int, int]] = [(count, delta) for (count, delta) in
+                                               Mp4SampleTable.__read_table(tables[b"stts"], 2)]
+
+        stsz = tables[b"stsz"]
+        (sample_size, count) = struct.unpack(">II", stsz[4:12])
+        if sample_size != 0:
+            self.__sizes: List[int] = [sample_size] * count
+        else:
+            self.__sizes = list(struct.unpack(">{0}I".format(count), stsz[12:12 + 4 * count]))
+
+        if b"co64" in tables:
+            offsets = [offset for (offset,) in Mp4SampleTable.__read_table(tables[b"co64"], 1, 8)]
+        else:
+            offsets = [offset for (offset,) in Mp4SampleTable.__read_table(tables[b"stco"], 1)]
+        runs = Mp4SampleTable.__read_table(tables[b"stsc"], 3)
+        self.__chunks: List[Tuple[int, int, int]] = []
+        for (chunk, offset) in enumerate(offsets, 1):
+            (_, samples, description) = next((run for run in reversed(runs) if run[0] <= chunk), (0, 0, 1))
+            self.__chunks.append((offset, samples, description))
+        if sum(samples for (_, samples, _) in self.__chunks) != len(self.__sizes):
+            raise Mp4Error("Sample table chunks don't match its sample count")
+
+        if b"stss" in tables:
+            self.__sync = [number for (number,) in Mp4SampleTable.__read_table(tables[b"stss"], 1)]
+        if b"sbgp" in tables:
+            sbgp = tables[b"sbgp"]
+            # Version 1 has a grouping type parameter after the grouping type
+            header_size = 16 if sbgp[0] == 1 else 12
+            self.__groups = (sbgp[4:8], sbgp[:header_size - 4],
+                             [(count, index) for (count, index) in
+                              Mp4SampleTable.__read_table(sbgp[header_size - 8:], 2)])
@@ -0,0 +1,56 @@
+from typing import BinaryIO, Dict, Optional
+
+from .mp4atom import Mp4Atom
+
+
+class Mp4Tags:
+    """iTunes style tags, from the moov/udta/meta/ilst atom"""
+
+    # Tags createm4b uses, by atom type
+    __wanted = ("©nam", "©ART", "aART", "©alb", "trkn")
+
+    @property
+    def title(self) -> Optional[str]:
+        return self.__text("©nam")
+
+    @property
+    def artist(self) -> Optional[str]:
+        return self.__text("©ART") or self.__text("aART")
+
+    @property
+    def album_artist(self) -> Optional[str]:
+        return self.__text("aART")
+
+    @property
+    def album(self) -> Optional[str]:
+        return self.__text("©alb")
+
+    @property
+    def track(self) -> Optional[int]:
+        data = self.__values.get("trkn")
+        if data is None or len(data) < 4:
+            return None
+        return data[2] << 8 | data[3]
+
+    def __text(self, atom_type: str) -> Optional[str]:
+        data = self.__values.get(atom_type)
+        if data is None:
+            return None
+        return data.decode("utf8", "replace")
+
+    def __init__(self, file_handle: BinaryIO, moov: Mp4Atom):
+        self.__values: Dict[str, bytes] = {}
+
+        ilst = Mp4Atom.find(file_handle, "udta", "meta", "ilst", start=moov.body_offset, end=moov.end)
+        if ilst is None:
+            return
+
+        for item in ilst.children(file_handle):
+            atom_type = item.atom_type
+            if atom_type not in Mp4Tags.__wanted:
+                continue
+
+            data = next((a for a in item.children(file_handle) if a.atom_type == "data"), None)
+            if data is not None:
+                # Skip the type indicator and locale
+                self.__values[atom_type] = data.read_body(file_handle)[8:]
@@ -0,0 +1,209 @@
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from createm4b import util
+from .mp4atom import Mp4Atom
+from .mp4error import Mp4Error
+
+
+class Mp4Track:
+    """Stream parameters and duration of a track, read from its trak atom"""
+
+    __codec: Optional[str] = None
+    __sample_rate: Optional[int] = None
+    __channels: Optional[int] = None
+
+    @property
+    def handler_type(self) -> str:
+        """Kind of track: "soun" for audio, "vide", "text" (chapters), ..."""
+        return self.__handler_type
+
+    @property
+    def codec(self) -> Optional[str]:
+        """Codec of an audio track: "aac" (AAC LC), "aac-he", "mp3", "alac", or the sample entry type"""
+        return self.__codec
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self.__sample_rate
+
+    @property
+    def channels(self) -> Optional[int]:
+        return self.__channels
+
+    @property
+    def media_duration(self) -> float:
+        """Length of every sample in the track, in seconds, including encoder priming hidden by an edit list"""
+        return self.__media_duration
+
+    @property
+    def duration(self) -> float:
+        """Length of the track as it is played, in seconds"""
+        return self.__duration
+
+    @property
+    def duration_source(self) -> str:
+        """Where the duration came from: the edit list (elst) or the media header (mdhd)"""
+        return self.__duration_source
+
+    @staticmethod
+    def read_tracks(file_handle: BinaryIO, moov: Mp4Atom) -> Iterator["Mp4Track"]:
+        mvhd = Mp4Atom.find(file_handle, "mvhd", start=moov.body_offset, end=moov.end)
+        if mvhd is None:
+            raise Mp4Error("No movie header")
+        (movie_timescale, _) = Mp4Track.__parse_times(mvhd.read_body(file_handle))
+
+        for atom in moov.children(file_handle):
+            if atom.atom_type == "trak":
+                yield Mp4Track(file_handle, atom, movie_timescale)
+
+    @staticmethod
+    def find_sound_track(file_handle: BinaryIO, moov: Mp4Atom) -> Optional["Mp4Track"]:
+        return next((t for t in Mp4Track.read_tracks(file_handle, moov) if t.handler_type == "soun"), None)
+
+    @staticmethod
+    def read_sound_track(file_name: str) -> "Mp4Track":
+        """Read the first audio track of an mp4 file
+
+        :raises Mp4Error: if the file has no audio track
+        """
+        with open(file_name, "rb") as f:
+            moov = Mp4Atom.find(f, "moov")
+            track = Mp4Track.find_sound_track(f, moov) if moov is not None else None
+        if track is None:
+            raise Mp4Error("{0} has no audio track".format(file_name))
+        return track
+
+    @staticmethod
+    def __parse_times(data: bytes) -> Tuple[int, int]:
+        """Timescale and duration from the body of a movie (mvhd) or media (mdhd) header"""
+        if data[0] == 1:
+            timescale = util.parse_32bit_big_endian(data[20:24])
+            duration = util.parse_32bit_big_endian(data[24:28]) << 32 | util.parse_32bit_big_endian(data[28:32])
+        else:
+            timescale = util.parse_32bit_big_endian(data[12:16])
+            duration = util.parse_32bit_big_endian(data[16:20])
+
+        if timescale == 0:
+            raise Mp4Error("Invalid timescale")
+        return timescale, duration
+
+    @staticmethod
+    def __parse_edit_duration(data: bytes) -> int:
+        """Total duration of an edit list (elst body), in the movie timescale"""
+        entry_count = util.parse_32bit_big_endian(data[4:8])
+        entry_size = 20 if data[0] == 1 else 12
+        duration = 0
+        for i in range(entry_count):
+            entry = data[8 + i * entry_size:8 + (i + 1) * entry_size]
+            if len(entry) < entry_size:
+                raise Mp4Error("Truncated edit list")
+            if data[0] == 1:
+                duration += util.parse_32bit_big_endian(entry[0:4]) << 32 | util.parse_32bit_big_endian(entry[4:8])
+            else:
+                duration += util.parse_32bit_big_endian(entry[0:4])
+        return duration
+
+    def __parse_sample_description(self, data: bytes):
+        """Read the first entry of the sample description (stsd body) of an audio track"""
+        entry_type = data[12:16].decode("latin-1")
+        self.__channels = data[32] << 8 | data[33]
+        self.__sample_rate = util.parse_32bit_big_endian(data[40:44]) >> 16
+        self.__codec = entry_type
+
+        if entry_type != "mp4a":
+            return
+
+        # QuickTime sound description versions 1 and 2 have extra fields before the child atoms
+        version = data[24] << 8 | data[25]
+        children = 44 + {1: 16, 2: 36}.get(version, 0)
+        esds = Mp4Track.__find_child(data, children, "esds")
+        if esds is not None:
+            self.__codec = Mp4Track.__parse_esds(esds) or entry_type
+
+    @staticmethod
+    def __find_child(data: bytes, position: int, atom_type: str) -> Optional[bytes]:
+        end = 8 + util.parse_32bit_big_endian(data[8:12])
+        while position + 8 <= min(end, len(data)):
+            size = util.parse_32bit_big_endian(data[position:position + 4])
+            if size < 8:
+                return None
+            if data[position + 4:position + 8] == atom_type.encode("latin-1"):
+                return data[position + 8:position + size]
+            position += size
+        return None
+
+    @staticmethod
+    def __parse_esds(data: bytes) -> Optional[str]:
+        """Codec name from an elementary stream descriptor (esds body)"""
+        position = 4
+        object_type = None
+        while position + 2 <= len(data):
+            tag = data[position]
+            position += 1
+            length = 0
+            for _ in range(4):
+                byte = data[position]
+                position += 1
+                length = length << 7 | byte & 0x7f
+                if byte & 0x80 == 0:
+                    break
+
+            if tag == 0x03:
+                # ES descriptor: id, flags, and optional dependency, URL and OCR fields before the nested descriptors
+                flags = data[position + 2]
+                position += 3
+                if flags & 0x80:
+                    position += 2
+                if flags & 0x40:
+                    position += 1 + data[position]
+                if flags & 0x20:
+                    position += 2
+            elif tag == 0x04:
+                # Decoder config: object type, stream type, buffer size and bitrates, then the decoder specific info
+                object_type = data[position]
+                position += 13
+            elif tag == 0x05:
+                if object_type in (0x69, 0x6b):
+                    return "mp3"
+                if object_type not in (0x40, 0x66, 0x67, 0x68):
+                    return None
+                audio_object_type = data[position] >> 3
+                if audio_object_type == 31:
+                    audio_object_type = 32 + ((data[position] & 0x7) << 3 | data[position + 1] >> 5)
+                if audio_object_type == 2:
+                    return "aac"
+                if audio_object_type in (5, 29):
+                    return "aac-he"
+                return "aac-{0}".format(audio_object_type)
+            else:
+                position += length
+
+        if object_type in (0x69, 0x6b):
+            return "mp3"
+        return None
+
+    def __init__(self, file_handle: BinaryIO, trak: Mp4Atom, movie_timescale: int):
+        mdia = Mp4Atom.find(file_handle, "mdia", start=trak.body_offset, end=trak.end)
+        hdlr = Mp4Atom.find(file_handle, "hdlr", start=mdia.body_offset, end=mdia.end) if mdia else None
+        mdhd = Mp4Atom.find(file_handle, "mdhd", start=mdia.body_offset, end=mdia.end) if mdia else None
+        if hdlr is None or mdhd is None:
+            raise Mp4Error("Incomplete track at {0}".format(trak.offset))
+
+        self.__handler_type = hdlr.read_body(file_handle)[8:12].decode("latin-1")
+        (timescale, duration) = Mp4Track.__parse_times(mdhd.read_body(file_handle))
+        self.__media_duration = float(duration) / timescale
+        self.__duration = self.__media_duration
+        self.__duration_source = "mdhd"
+
+        elst = Mp4Atom.find(file_handle, "edts", "elst", start=trak.body_offset, end=trak.end)
+        if elst is not None:
+            edit_duration = Mp4Track.__parse_edit_duration(elst.read_body(file_handle))
+            if edit_duration > 0:
+                self.__duration = float(edit_duration) / movie_timescale
+                self.__duration_source = "elst"
+
+        if self.__handler_type == "soun":
+            stsd = Mp4Atom.find(file_handle, "minf", "stbl", "stsd", start=mdia.body_offset, end=mdia.end)
+            if stsd is None:
+                raise Mp4Error("Audio track at {0} has no sample description".format(trak.offset))
+            self.__parse_sample_description(stsd.read_body(file_handle))
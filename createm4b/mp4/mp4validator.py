@@ -0,0 +1,36 @@
+import os
+from typing import BinaryIO, List, Optional
+
+from createm4b.fileprober import FileProber
+from createm4b.proberesult import ProbeResult
+from .mp4atom import Mp4Atom
+from .mp4error import Mp4Error
+from .mp4tags import Mp4Tags
+from .mp4track import Mp4Track
+
+
+class Mp4Validator(FileProber):
+    def probe(self, file_handle: BinaryIO, file_name: str, reasons: Optional[List[str]]=None) \
+            -> Optional[ProbeResult]:
+        """Validate an mp4 (m4a/m4b) file and read its tags and audio track from the moov atom"""
+        try:
+            end = os.fstat(file_handle.fileno()).st_size
+            first = next(Mp4Atom.read_atoms(file_handle, 0, end), None)
+            if first is None or first.atom_type != "ftyp":
+                return FileProber.reject(reasons, "not an mp4 (no ftyp atom)")
+
+            moov = Mp4Atom.find(file_handle, "moov", end=end)
+            if moov is None:
+                return FileProber.reject(reasons, "not an mp4 (no moov atom)")
+
+            track = Mp4Track.find_sound_track(file_handle, moov)
+            if track is None:
+                return FileProber.reject(reasons, "not an mp4 (no audio track)")
+            tags = Mp4Tags(file_handle, moov)
+        except (Mp4Error, IndexError) as e:
+            return FileProber.reject(reasons, "not an mp4 ({0})".format(e if isinstance(e, Mp4Error) else
+                                                                        "file is too short"))
+
+        return ProbeResult(file_name, "mp4", tags.title, tags.artist, tags.album, tags.track, track.sample_rate,
+                           track.channels, track.duration, track.duration_source, track.codec,
+                           track.media_duration)
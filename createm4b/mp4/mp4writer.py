@@ -0,0 +1,562 @@
+import os
+from typing import BinaryIO, Callable, Dict, List, Optional, Set, Tuple
+
+from createm4b import util
+from .mp4atom import Mp4Atom
+from .mp4chapter import Mp4Chapter
+from .mp4error import Mp4Error
+from .mp4sampletable import Mp4SampleTable
+from .mp4track import Mp4Track
+
+
+class Mp4Writer:
+    """Sets the iTunes tags, cover and chapters of an mp4 file by rewriting just its moov atom
+
+    Only the moov atom, and a small mdat holding the chapter titles, are written, so this costs kilobytes of I/O
+    however long the audio is.  The audio is never moved, so its chunk offsets stay valid.  The old moov is left as it
+    is until the new one has been written and flushed to disk, so the file is never without a complete moov: the new
+    one goes into the free atoms before or after the old one if it fits there, otherwise at the end of the file, and
+    only then is the old one turned into a free atom (or cut off, if it was at the end).
+
+    Like ffmpeg, chapters are written both as a QuickTime chapter track (for Apple's players) and as a Nero chpl atom
+    (for most others).
+    """
+
+    __chapter_timescale: int = 1000
+
+    # Nero chapter lists count their chapters in a single byte
+    __max_chpl_chapters: int = 255
+
+    # Follows each chapter title, marking it as UTF-8
+    __encd: bytes = b"\0\0\0\x0cencd\0\0\x01\0"
+
+    # Text sample description after the data reference index: display flags, justification, colours, text box,
+    # style record and font table, as ffmpeg writes for chapter tracks
+    __text_description: bytes = bytes.fromhex("00000001 0000 00000000 0000000000000000 00000000 0001 0000 00000000 "
+                                              "0000000d 66746162 0001 0001 00")
+
+    __identity_matrix: bytes = b"".join(value.to_bytes(4, "big") for value in
+                                        (0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000))
+
+    __image_types: Dict[bytes, int] = {b"\xff\xd8\xff": 13, b"\x89PNG": 14}
+
+    # Bytes of appended audio copied at a time
+    __copy_size: int = 1024 * 1024
+
+    __chapters: Optional[List[Mp4Chapter]] = None
+    __appended_file: Optional[str] = None
+    __offset_delta: int = 0
+
+    @property
+    def file_name(self) -> str:
+        return self.__file_name
+
+    def set_tag(self, atom_type: str, value: Optional[str]):
+        """Set a text tag, e.g. "©alb" for the album, or remove it if value is None"""
+        self.__items[atom_type] = None if value is None else Mp4Writer.__build_item(atom_type, 1, value.encode("utf8"))
+
+    def set_cover(self, image: Optional[bytes]):
+        """Set the cover to a jpeg or png image, or remove it if image is None"""
+        if image is None:
+            self.__items["covr"] = None
+            return
+
+        data_type = next((t for (magic, t) in Mp4Writer.__image_types.items() if image.startswith(magic)), None)
+        if data_type is None:
+            raise Mp4Error("Cover images must be jpeg or png")
+        self.__items["covr"] = Mp4Writer.__build_item("covr", data_type, image)
+
+    def set_chapters(self, chapters: List[Mp4Chapter]):
+        """Replace the chapters (removing them all if chapters is empty)"""
+        self.__chapters = chapters
+
+    def append_audio(self, file_name: str):
+        """Add the audio of another mp4 file to the end of this file's audio
+
+        The samples are copied as they are, so they must have been encoded with the same codec, sample rate and
+        number of channels.  Any encoder delay and padding at the join is played, as a moment of silence.
+        """
+        with open(file_name, "rb") as f:
+            moov = Mp4Atom.find(f, "moov")
+            track = Mp4Track.find_sound_track(f, moov) if moov is not None else None
+            if track is None:
+                raise Mp4Error("{0} has no audio track".format(file_name))
+            moov_body = moov.read_body(f)
+
+        trak = next(body for (atom_type, body) in Mp4Atom.split_atoms(moov_body)
+                    if atom_type == b"trak" and Mp4Writer.__handler_type(body) == b"soun")
+        mdia = Mp4Writer.__child(trak, b"mdia")
+        stbl = Mp4Writer.__child(Mp4Writer.__child(mdia, b"minf"), b"stbl")
+        if stbl is None:
+            raise Mp4Error("{0} has no sample table".format(file_name))
+
+        self.__appended_table = Mp4SampleTable(stbl)
+        self.__appended_file = file_name
+        self.__appended_track = track
+        self.__appended_timescale = Mp4Writer.__media_timescale(Mp4Writer.__child(mdia, b"mdhd"))
+
+    def write(self):
+        """Write the changes into the file"""
+        with open(self.__file_name, "r+b") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            atoms = list(Mp4Atom.read_atoms(f, 0, file_size))
+            index = next((i for (i, atom) in enumerate(atoms) if atom.atom_type == "moov"), None)
+            if index is None:
+                raise Mp4Error("{0} has no movie atom".format(self.__file_name))
+            moov = atoms[index]
+            moov_body = moov.read_body(f)
+            if self.__appended_file is not None:
+                self.__check_appendable(Mp4Track.find_sound_track(f, moov))
+
+            # The old moov goes, with the old chapter titles right before it, once the new one is written
+            old_start = moov.offset
+            first = index
+            if self.__chapters is not None and index > 0 and atoms[index - 1].atom_type == "mdat" and \
+                    Mp4Writer.__chapter_data(moov_body) == (atoms[index - 1].body_offset, atoms[index - 1].body_size):
+                old_start = atoms[index - 1].offset
+                first = index - 1
+
+            # Free atoms either side of it are room for the new one
+            space_start = old_start
+            for atom in reversed(atoms[:first]):
+                if atom.atom_type not in ("free", "skip"):
+                    break
+                space_start = atom.offset
+            space_end = moov.end
+            for atom in atoms[index + 1:]:
+                if atom.atom_type not in ("free", "skip"):
+                    break
+                space_end = atom.end
+            last = space_end == atoms[-1].end
+
+            samples = self.__chapter_samples()
+            size = len(self.__build_block(moov_body, samples, moov.end))
+            if self.__appended_file is None and Mp4Writer.__fits(size, old_start - space_start):
+                start = space_start
+            elif self.__appended_file is None and (last or Mp4Writer.__fits(size, space_end - moov.end)):
+                start = moov.end
+            else:
+                start = file_size
+            if start >= file_size:
+                Mp4Writer.__fix_open_ended(f, atoms[-1])
+
+            f.seek(start)
+            if self.__appended_file is not None:
+                # The appended audio goes at the end of the file, so nothing that's already there is moved
+                (data_start, data_end) = self.__appended_table.data_range
+                header = Mp4Atom.build_header(b"mdat", data_end - data_start)
+                self.__offset_delta = start + len(header) - data_start
+                f.write(header)
+                self.__copy_audio(f, data_start, data_end)
+                start = f.tell()
+
+            block = self.__build_block(moov_body, samples, start)
+            f.write(block)
+            end = start + len(block)
+            if start == moov.end and last:
+                f.truncate(end)
+            elif start == moov.end and end < space_end:
+                f.write(Mp4Writer.__build_free_header(space_end - end))
+            elif start == space_start and end < old_start:
+                f.write(Mp4Writer.__build_free_header(old_start - end))
+            f.flush()
+            os.fsync(f.fileno())
+
+            # Only now that the new moov is complete can the old one go
+            if last and start < old_start:
+                f.truncate(old_start)
+            else:
+                f.seek(old_start)
+                f.write(Mp4Writer.__build_free_header((moov.end if start == moov.end else space_end) - old_start))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __check_appendable(self, track: Optional[Mp4Track]):
+        appended = self.__appended_track
+        if track is None:
+            raise Mp4Error("{0} has no audio track".format(self.__file_name))
+        if (track.codec, track.sample_rate, track.channels) != \
+                (appended.codec, appended.sample_rate, appended.channels):
+            raise Mp4Error("Can't append {0} {1}Hz {2} channel audio to {3} {4}Hz {5} channel audio".format(
+                appended.codec, appended.sample_rate, appended.channels, track.codec, track.sample_rate,
+                track.channels))
+
+    def __copy_audio(self, file_handle: BinaryIO, start: int, end: int):
+        with open(self.__appended_file, "rb") as source:
+            source.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = source.read(min(remaining, Mp4Writer.__copy_size))
+                if len(chunk) == 0:
+                    raise Mp4Error("{0} is truncated".format(self.__appended_file))
+                file_handle.write(chunk)
+                remaining -= len(chunk)
+
+    def __build_block(self, moov_body: bytes, samples: bytes, start: int) -> bytes:
+        """The chapter titles' mdat, if there are any, followed by the new moov, to be written at start"""
+        if len(samples) == 0:
+            return Mp4Atom.build_atom(b"moov", self.__build_moov(moov_body, 0))
+
+        mdat = Mp4Atom.build_atom(b"mdat", samples)
+        return mdat + Mp4Atom.build_atom(b"moov", self.__build_moov(moov_body, start + 8))
+
+    def __build_moov(self, body: bytes, chunk_offset: int) -> bytes:
+        """Body of the new moov atom
+
+        :param chunk_offset: Offset of the chapter titles in the file
+        """
+        atoms = Mp4Atom.split_atoms(body)
+        mvhd = next((atom_body for (atom_type, atom_body) in atoms if atom_type == b"mvhd"), None)
+        if mvhd is None:
+            raise Mp4Error("No movie header")
+        (timescale, duration) = Mp4Writer.__movie_times(mvhd)
+
+        chapter_tracks: Set[int] = set()
+        if self.__chapters is not None:
+            for (atom_type, atom_body) in atoms:
+                if atom_type == b"trak":
+                    chapter_tracks.update(Mp4Writer.__chapter_references(atom_body))
+
+        result: List[bytes] = []
+        track_ids = []
+        audio_track = None
+        for (atom_type, atom_body) in atoms:
+            if atom_type == b"mvhd":
+                mvhd_index = len(result)
+            elif atom_type == b"trak":
+                track_id = Mp4Writer.__track_id(atom_body)
+                if track_id in chapter_tracks:
+                    continue
+                track_ids.append(track_id)
+                if self.__chapters is not None:
+                    atom_body = Mp4Writer.__remove_chapter_reference(atom_body)
+                if audio_track is None and Mp4Writer.__handler_type(atom_body) == b"soun":
+                    audio_track = len(result)
+                    if self.__appended_file is not None:
+                        (atom_body, duration) = self.__append_to_track(atom_body, timescale)
+            elif atom_type == b"udta":
+                continue
+            result.append(Mp4Atom.build_atom(atom_type, atom_body))
+
+        next_track_id = max(track_ids, default=0) + 1
+        if self.__chapters and audio_track is not None:
+            result.append(self.__build_chapter_track(next_track_id, timescale, duration, chunk_offset))
+            (_, trak) = Mp4Atom.split_atoms(result[audio_track])[0]
+            result[audio_track] = Mp4Atom.build_atom(b"trak", Mp4Writer.__add_chapter_reference(trak,
+                                                                                               next_track_id))
+            next_track_id += 1
+
+        mvhd = Mp4Writer.__set_duration(mvhd, duration)
+        result[mvhd_index] = Mp4Atom.build_atom(b"mvhd", mvhd[:-4] + next_track_id.to_bytes(4, "big"))
+        udta = next((atom_body for (atom_type, atom_body) in atoms if atom_type == b"udta"), None)
+        result.append(Mp4Atom.build_atom(b"udta", self.__build_udta(udta)))
+        return b"".join(result)
+
+    def __append_to_track(self, trak: bytes, movie_timescale: int) -> Tuple[bytes, int]:
+        """Add the appended audio's samples to the audio track
+
+        :return: The track's new body, and its new duration in the movie timescale
+        """
+        mdia = Mp4Writer.__child(trak, b"mdia")
+        timescale = Mp4Writer.__media_timescale(Mp4Writer.__child(mdia, b"mdhd"))
+        if timescale != self.__appended_timescale:
+            raise Mp4Error("Can't append audio with a different timescale")
+
+        stbl = Mp4Writer.__child(Mp4Writer.__child(mdia, b"minf"), b"stbl")
+        if stbl is None:
+            raise Mp4Error("Audio track without a sample table")
+        table = Mp4SampleTable(stbl)
+        table.append(self.__appended_table, self.__offset_delta)
+        media_duration = table.duration
+
+        # The edit list (if any) skips the encoder delay at the start; now it runs to the end of the appended audio
+        elst = Mp4Writer.__child(Mp4Writer.__child(trak, b"edts"), b"elst")
+        media_time = 0
+        if elst is not None:
+            if util.parse_32bit_big_endian(elst[4:8]) != 1:
+                raise Mp4Error("Can't append to a track with more than one edit")
+            media_time = int.from_bytes(elst[12:20], "big", signed=True) if elst[0] == 1 else \
+                int.from_bytes(elst[12:16], "big", signed=True)
+        duration = max(media_duration - max(media_time, 0), 0) * movie_timescale // timescale
+
+        def build_elst(body: bytes) -> bytes:
+            rate = body[-4:]
+            if duration > 0xffffffff or body[0] == 1:
+                return b"\x01\0\0\0\0\0\0\x01" + duration.to_bytes(8, "big") + \
+                    media_time.to_bytes(8, "big", signed=True) + rate
+            return b"\0\0\0\0\0\0\0\x01" + duration.to_bytes(4, "big") + \
+                media_time.to_bytes(4, "big", signed=True) + rate
+
+        trak = Mp4Writer.__map_atoms(trak, {
+            b"tkhd": lambda body: Mp4Writer.__set_duration(body, duration),
+            b"elst": build_elst,
+            b"mdhd": lambda body: Mp4Writer.__set_duration(body, media_duration),
+            b"stbl": lambda body: table.build()
+        })
+        return trak, duration
+
+    def __build_udta(self, body: Optional[bytes]) -> bytes:
+        atoms = Mp4Atom.split_atoms(body) if body is not None else []
+        result = []
+        meta = None
+        for (atom_type, atom_body) in atoms:
+            if atom_type == b"meta" and meta is None:
+                meta = atom_body
+                result.append(None)
+            elif atom_type != b"chpl" or self.__chapters is None:
+                result.append(Mp4Atom.build_atom(atom_type, atom_body))
+
+        meta_atom = Mp4Atom.build_atom(b"meta", self.__build_meta(meta))
+        if meta is None:
+            result.append(meta_atom)
+        if self.__chapters and len(self.__chapters) <= Mp4Writer.__max_chpl_chapters:
+            result.append(self.__build_chpl())
+        return b"".join(meta_atom if atom is None else atom for atom in result)
+
+    def __build_meta(self, body: Optional[bytes]) -> bytes:
+        if body is None:
+            # Version and flags, then a handler for iTunes metadata
+            body = b"\0" * 4 + Mp4Atom.build_atom(b"hdlr", b"\0" * 8 + b"mdirappl" + b"\0" * 9)
+
+        result = [body[:4]]
+        ilst = None
+        for (atom_type, atom_body) in Mp4Atom.split_atoms(body, 4):
+            if atom_type == b"ilst" and ilst is None:
+                ilst = atom_body
+                result.append(None)
+            else:
+                result.append(Mp4Atom.build_atom(atom_type, atom_body))
+
+        ilst_atom = Mp4Atom.build_atom(b"ilst", self.__build_ilst(ilst or b""))
+        if ilst is None:
+            result.append(ilst_atom)
+        return b"".join(ilst_atom if atom is None else atom for atom in result)
+
+    def __build_ilst(self, body: bytes) -> bytes:
+        items = [Mp4Atom.build_atom(atom_type, atom_body) for (atom_type, atom_body) in Mp4Atom.split_atoms(body)
+                 if atom_type.decode("latin-1") not in self.__items]
+        items.extend(item for item in self.__items.values() if item is not None)
+        return b"".join(items)
+
+    def __build_chpl(self) -> bytes:
+        """Nero chapter list: version 1, a reserved word, the chapter count, and each start (in 100ns) and title"""
+        body = [b"\x01\0\0\0", b"\0" * 4, bytes([len(self.__chapters)])]
+        for chapter in self.__chapters:
+            title = chapter.title.encode("utf8")[:255].decode("utf8", "ignore").encode("utf8")
+            body.append(int(round(chapter.start * 10000000)).to_bytes(8, "big") + bytes([len(title)]) + title)
+        return Mp4Atom.build_atom(b"chpl", b"".join(body))
+
+    def __chapter_samples(self) -> bytes:
+        """The chapter track's samples: each chapter's title"""
+        if not self.__chapters:
+            return b""
+
+        samples = []
+        for chapter in self.__chapters:
+            title = chapter.title.encode("utf8")[:0xffff]
+            samples.append(len(title).to_bytes(2, "big") + title + Mp4Writer.__encd)
+        return b"".join(samples)
+
+    def __chapter_durations(self, timescale: int, duration: int) -> List[int]:
+        """Length of each chapter, in the chapter track's timescale"""
+        total = duration * Mp4Writer.__chapter_timescale // timescale
+        starts = [min(max(int(round(chapter.start * Mp4Writer.__chapter_timescale)), 0), total)
+                  for chapter in self.__chapters]
+        ends = starts[1:] + [max(total, starts[-1])]
+        # A sample can't be empty, so chapters out of order get a moment each
+        return [max(end - start, 1) for (start, end) in zip(starts, ends)]
+
+    def __build_chapter_track(self, track_id: int, timescale: int, duration: int, chunk_offset: int) -> bytes:
+        """A disabled text track with the chapter titles, in one chunk at chunk_offset"""
+        durations = self.__chapter_durations(timescale, duration)
+        samples = [2 + len(chapter.title.encode("utf8")[:0xffff]) + len(Mp4Writer.__encd)
+                   for chapter in self.__chapters]
+
+        tkhd = Mp4Atom.build_atom(b"tkhd", b"\0" * 12 + track_id.to_bytes(4, "big") + b"\0" * 4 +
+                                      min(duration, 0xffffffff).to_bytes(4, "big") + b"\0" * 16 +
+                                      Mp4Writer.__identity_matrix + b"\0" * 8)
+        mdhd = Mp4Atom.build_atom(b"mdhd", b"\0" * 12 + Mp4Writer.__chapter_timescale.to_bytes(4, "big") +
+                                      min(sum(durations), 0xffffffff).to_bytes(4, "big") + b"\x55\xc4\0\0")
+        hdlr = Mp4Atom.build_atom(b"hdlr", b"\0" * 8 + b"text" + b"\0" * 12 + b"Chapters\0")
+
+        gmin = Mp4Atom.build_atom(b"gmin", b"\0" * 4 + b"\0\x40\x80\0\x80\0\x80\0" + b"\0" * 4)
+        text = Mp4Atom.build_atom(b"text", b"\0\x01" + b"\0" * 12 + b"\0\0\0\x01" + b"\0" * 16 +
+                                      b"\0\0\x40\0\0\0")
+        dinf = Mp4Atom.build_atom(b"dinf", Mp4Atom.build_atom(
+            b"dref", b"\0\0\0\0\0\0\0\x01" + Mp4Atom.build_atom(b"url ", b"\0\0\0\x01")))
+
+        stts = [(1, durations[0])]
+        for d in durations[1:]:
+            stts[-1:] = [(stts[-1][0] + 1, d)] if stts[-1][1] == d else [stts[-1], (1, d)]
+        if chunk_offset > 0xffffffff:
+            chunk_offsets = Mp4Atom.build_atom(b"co64", b"\0\0\0\0\0\0\0\x01" + chunk_offset.to_bytes(8, "big"))
+        else:
+            chunk_offsets = Mp4Atom.build_atom(b"stco", b"\0\0\0\0\0\0\0\x01" + chunk_offset.to_bytes(4, "big"))
+        stbl = Mp4Atom.build_atom(b"stbl", b"".join([
+            Mp4Atom.build_atom(b"stsd", b"\0\0\0\0\0\0\0\x01" + Mp4Atom.build_atom(
+                b"text", b"\0" * 6 + b"\0\x01" + Mp4Writer.__text_description)),
+            Mp4Atom.build_atom(b"stts", b"\0" * 4 + len(stts).to_bytes(4, "big") +
+                                   b"".join(c.to_bytes(4, "big") + d.to_bytes(4, "big") for (c, d) in stts)),
+            Mp4Atom.build_atom(b"stsc", b"\0\0\0\0\0\0\0\x01\0\0\0\x01" + len(samples).to_bytes(4, "big") +
+                                   b"\0\0\0\x01"),
+            Mp4Atom.build_atom(b"stsz", b"\0" * 8 + len(samples).to_bytes(4, "big") +
+                                   b"".join(s.to_bytes(4, "big") for s in samples)),
+            chunk_offsets]))
+
+        minf = Mp4Atom.build_atom(b"minf", Mp4Atom.build_atom(b"gmhd", gmin + text) + dinf + stbl)
+        return Mp4Atom.build_atom(b"trak", tkhd + Mp4Atom.build_atom(b"mdia", mdhd + hdlr + minf))
+
+    @staticmethod
+    def __chapter_data(moov: bytes) -> Optional[Tuple[int, int]]:
+        """Offset and size of the titles of an existing chapter track, if they are in a single chunk"""
+        atoms = Mp4Atom.split_atoms(moov)
+        chapter_tracks = set()
+        for (atom_type, body) in atoms:
+            if atom_type == b"trak":
+                chapter_tracks.update(Mp4Writer.__chapter_references(body))
+
+        for (atom_type, body) in atoms:
+            if atom_type != b"trak" or Mp4Writer.__track_id(body) not in chapter_tracks:
+                continue
+            for path in (b"mdia", b"minf", b"stbl"):
+                body = next((b for (t, b) in Mp4Atom.split_atoms(body) if t == path), b"")
+            tables = dict(Mp4Atom.split_atoms(body))
+            stsz = tables.get(b"stsz")
+            chunk_offsets = tables.get(b"stco") or tables.get(b"co64")
+            if stsz is None or chunk_offsets is None or util.parse_32bit_big_endian(chunk_offsets[4:8]) != 1:
+                return None
+
+            offset = int.from_bytes(chunk_offsets[8:], "big")
+            sample_size = util.parse_32bit_big_endian(stsz[4:8])
+            count = util.parse_32bit_big_endian(stsz[8:12])
+            if sample_size != 0:
+                return offset, sample_size * count
+            return offset, sum(util.parse_32bit_big_endian(stsz[i:i + 4]) for i in range(12, 12 + 4 * count, 4))
+        return None
+
+    @staticmethod
+    def __child(body: Optional[bytes], atom_type: bytes) -> Optional[bytes]:
+        """Body of the first child of a type, in the body of a container"""
+        if body is None:
+            return None
+        return next((child for (t, child) in Mp4Atom.split_atoms(body) if t == atom_type), None)
+
+    @staticmethod
+    def __map_atoms(body: bytes, functions: Dict[bytes, Callable[[bytes], bytes]]) -> bytes:
+        """Rebuild the atoms in body (and in the containers of a track), passing the bodies of the types in
+        functions through them"""
+        result = []
+        for (atom_type, child) in Mp4Atom.split_atoms(body):
+            if atom_type in functions:
+                child = functions[atom_type](child)
+            elif atom_type in (b"edts", b"mdia", b"minf"):
+                child = Mp4Writer.__map_atoms(child, functions)
+            result.append(Mp4Atom.build_atom(atom_type, child))
+        return b"".join(result)
+
+    @staticmethod
+    def __set_duration(body: bytes, duration: int) -> bytes:
+        """Set the duration in the body of a movie, track or media header
+
+        These all start with the creation and modification times, a 4 byte field and the duration, which are 64 bit
+        in version 1, so the header is changed to version 1 if the duration needs it.
+        """
+        if body[0] == 1:
+            (created, modified, field, rest) = (body[4:12], body[12:20], body[20:24], body[32:])
+        elif duration <= 0xffffffff:
+            return body[:16] + duration.to_bytes(4, "big") + body[20:]
+        else:
+            (created, modified, field, rest) = (body[4:8], body[8:12], body[12:16], body[20:])
+        return b"\x01" + body[1:4] + int.from_bytes(created, "big").to_bytes(8, "big") + \
+            int.from_bytes(modified, "big").to_bytes(8, "big") + field + duration.to_bytes(8, "big") + rest
+
+    @staticmethod
+    def __media_timescale(mdhd: bytes) -> int:
+        return util.parse_32bit_big_endian(mdhd[20:24] if mdhd[0] == 1 else mdhd[12:16])
+
+    @staticmethod
+    def __movie_times(mvhd: bytes) -> Tuple[int, int]:
+        """Timescale and duration from the body of the movie header"""
+        if mvhd[0] == 1:
+            return util.parse_32bit_big_endian(mvhd[20:24]), int.from_bytes(mvhd[24:32], "big")
+        return util.parse_32bit_big_endian(mvhd[12:16]), util.parse_32bit_big_endian(mvhd[16:20])
+
+    @staticmethod
+    def __track_id(trak: bytes) -> int:
+        tkhd = next((body for (atom_type, body) in Mp4Atom.split_atoms(trak) if atom_type == b"tkhd"), None)
+        if tkhd is None:
+            raise Mp4Error("Track without a header")
+        return util.parse_32bit_big_endian(tkhd[20:24] if tkhd[0] == 1 else tkhd[12:16])
+
+    @staticmethod
+    def __handler_type(trak: bytes) -> Optional[bytes]:
+        for (atom_type, body) in Mp4Atom.split_atoms(trak):
+            if atom_type == b"mdia":
+                return next((hdlr[8:12] for (t, hdlr) in Mp4Atom.split_atoms(body) if t == b"hdlr"), None)
+        return None
+
+    @staticmethod
+    def __chapter_references(trak: bytes) -> List[int]:
+        """Track ids of the chapter tracks a track refers to"""
+        references = []
+        for (atom_type, body) in Mp4Atom.split_atoms(trak):
+            if atom_type == b"tref":
+                for (reference_type, ids) in Mp4Atom.split_atoms(body):
+                    if reference_type == b"chap":
+                        references.extend(util.parse_32bit_big_endian(ids[i:i + 4]) for i in range(0, len(ids), 4))
+        return references
+
+    @staticmethod
+    def __remove_chapter_reference(trak: bytes) -> bytes:
+        result = []
+        for (atom_type, body) in Mp4Atom.split_atoms(trak):
+            if atom_type == b"tref":
+                body = b"".join(Mp4Atom.build_atom(t, ids) for (t, ids) in Mp4Atom.split_atoms(body)
+                                if t != b"chap")
+                if len(body) == 0:
+                    continue
+            result.append(Mp4Atom.build_atom(atom_type, body))
+        return b"".join(result)
+
+    @staticmethod
+    def __add_chapter_reference(trak: bytes, track_id: int) -> bytes:
+        """Refer to the chapter track from a track, in a tref atom right after its header"""
+        result = []
+        for (atom_type, body) in Mp4Atom.split_atoms(trak):
+            if atom_type == b"tref":
+                continue
+            result.append(Mp4Atom.build_atom(atom_type, body))
+            if atom_type == b"tkhd":
+                tref = next((b for (t, b) in Mp4Atom.split_atoms(trak) if t == b"tref"), b"")
+                result.append(Mp4Atom.build_atom(b"tref", tref + Mp4Atom.build_atom(
+                    b"chap", track_id.to_bytes(4, "big"))))
+        return b"".join(result)
+
+    @staticmethod
+    def __fix_open_ended(file_handle, atom: Mp4Atom):
+        """Give the last atom its real size if its header says it extends to the end of the file, before appending"""
+        file_handle.seek(atom.offset)
+        if util.parse_32bit_big_endian(file_handle.read(4)) != 0:
+            return
+        if atom.size > 0xffffffff:
+            raise Mp4Error("Can't append to a file ending with an open ended {0} atom".format(atom.atom_type))
+        file_handle.seek(atom.offset)
+        file_handle.write(atom.size.to_bytes(4, "big"))
+
+    @staticmethod
+    def __build_item(atom_type: str, data_type: int, value: bytes) -> bytes:
+        data = Mp4Atom.build_atom(b"data", data_type.to_bytes(4, "big") + b"\0" * 4 + value)
+        return Mp4Atom.build_atom(atom_type.encode("latin-1"), data)
+
+    @staticmethod
+    def __fits(size: int, space: int) -> bool:
+        """Whether size bytes fit in space bytes, exactly or leaving room for a free atom"""
+        return size == space or size + 8 <= space
+
+    @staticmethod
+    def __build_free_header(size: int) -> bytes:
+        return size.to_bytes(4, "big") + b"free"
+
+    def __init__(self, file_name: str):
+        self.__file_name = file_name
+        self.__items: Dict[str, Optional[bytes]] = {}
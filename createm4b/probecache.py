@@ -0,0 +1,113 @@
+"""Persistent cache of audio source probe results"""
+import os
+import sqlite3
+import time
+from typing import Optional
+
+from . import util
+from .proberesult import ProbeResult
+
+
+class ProbeCache:
+    """On-disk cache of what probing an input file found, keyed by path, size, mtime and inode
+
+    Backed by sqlite so several createm4b processes can share it safely.  The least recently used
+    entries are evicted once the database's pages in use take more than max_size bytes; sqlite reuses the pages
+    they free, so the file stays around that size.
+    """
+
+    DEFAULT_MAX_SIZE: int = 64 * 1024 * 1024
+
+    # Fraction of the entries evicted at a time when the cache is over max_size
+    __eviction_fraction: float = 0.1
+
+    # Bumped whenever the probes table changes, to discard caches written by older versions
+    __schema_version: int = 4
+
+    @staticmethod
+    def default_path() -> str:
+        return os.path.join(util.cache_directory(), "probe.sqlite")
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def max_size(self) -> int:
+        return self.__max_size
+
+    @property
+    def size(self) -> int:
+        """Bytes of the database in use, not counting pages that have been freed for reuse"""
+        (page_count,) = self.__connection.execute("PRAGMA page_count").fetchone()
+        (free_pages,) = self.__connection.execute("PRAGMA freelist_count").fetchone()
+        (page_size,) = self.__connection.execute("PRAGMA page_size").fetchone()
+        return (page_count - free_pages) * page_size
+
+    def get(self, file_name: str) -> Optional[ProbeResult]:
+        """Look up a file, returning None if it isn't cached or has changed since it was"""
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            return None
+
+        with self.__connection:
+            row = self.__connection.execute(
+                "SELECT format, title, artist, album, track, sample_rate, channels, duration, codec, stream_duration "
+                "FROM probes WHERE path = ? AND size = ? AND mtime = ? AND inode = ?",
+                (file_name, stat.st_size, stat.st_mtime_ns, stat.st_ino)).fetchone()
+            if row is None:
+                return None
+
+            self.__connection.execute("UPDATE probes SET last_used = ? WHERE path = ?", (time.time(), file_name))
+
+        return ProbeResult(file_name, *row[:8], "cache", *row[8:])
+
+    def store(self, result: ProbeResult):
+        stat = os.stat(result.file_name)
+        row = (result.file_name, stat.st_size, stat.st_mtime_ns, stat.st_ino, result.format, result.title,
+               result.artist, result.album, result.track, result.sample_rate, result.channels, result.duration,
+               result.codec, result.stream_duration, time.time())
+
+        with self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+        self.__evict(result.file_name)
+
+    def __evict(self, keep: str):
+        """Remove the least recently used entries, other than keep, until the cache fits in max_size"""
+        while self.size > self.__max_size:
+            (count,) = self.__connection.execute("SELECT COUNT(*) FROM probes WHERE path != ?", (keep,)).fetchone()
+            if count == 0:
+                return
+            with self.__connection:
+                self.__connection.execute(
+                    "DELETE FROM probes WHERE path IN "
+                    "(SELECT path FROM probes WHERE path != ? ORDER BY last_used LIMIT ?)",
+                    (keep, max(int(count * ProbeCache.__eviction_fraction), 1)))
+
+    def clear(self):
+        with self.__connection:
+            self.__connection.execute("DELETE FROM probes")
+
+    def close(self):
+        self.__connection.close()
+
+    def __init__(self, path: Optional[str]=None, max_size: int=DEFAULT_MAX_SIZE):
+        self.__path = path or ProbeCache.default_path()
+        self.__max_size = max_size
+
+        os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+        self.__connection = sqlite3.connect(self.__path, timeout=30)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        with self.__connection:
+            if self.__connection.execute("PRAGMA user_version").fetchone()[0] != ProbeCache.__schema_version:
+                self.__connection.execute("DROP TABLE IF EXISTS probes")
+                self.__connection.execute("PRAGMA user_version = {0}".format(ProbeCache.__schema_version))
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS probes ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, inode INTEGER, format TEXT, "
+                "title TEXT, artist TEXT, album TEXT, track INTEGER, sample_rate INTEGER, channels INTEGER, "
+                "duration REAL, codec TEXT, stream_duration REAL, last_used REAL)")
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS probes_last_used ON probes (last_used)")
@@ -0,0 +1,15 @@
+from typing import Dict
+
+
+class ProbeError(Exception):
+    """One or more input files could not be probed"""
+
+    @property
+    def errors(self) -> Dict[str, Exception]:
+        """The error raised for each file that failed, keyed by file name"""
+        return self.__errors
+
+    def __init__(self, errors: Dict[str, Exception]):
+        self.__errors = errors
+        super().__init__("Error loading {0} file(s):\n{1}".format(
+            len(errors), "\n".join("\t{0}: {1}".format(f, e) for (f, e) in errors.items())))
@@ -0,0 +1,76 @@
+"""Result of probing an audio file"""
+from typing import Optional
+
+
+class ProbeResult:
+    """Everything createm4b needs to know about an input file, gathered in a single pass over it"""
+
+    @property
+    def file_name(self) -> str:
+        return self.__file_name
+
+    @property
+    def format(self) -> str:
+        """Format the file was validated as ("mp3", "flac" or "mp4")"""
+        return self.__format
+
+    @property
+    def title(self) -> Optional[str]:
+        return self.__title
+
+    @property
+    def artist(self) -> Optional[str]:
+        return self.__artist
+
+    @property
+    def album(self) -> Optional[str]:
+        return self.__album
+
+    @property
+    def track(self) -> Optional[int]:
+        return self.__track
+
+    @property
+    def sample_rate(self) -> int:
+        return self.__sample_rate
+
+    @property
+    def channels(self) -> int:
+        return self.__channels
+
+    @property
+    def codec(self) -> Optional[str]:
+        """Codec of the audio stream ("mp3", "flac", "aac", ...)"""
+        return self.__codec
+
+    @property
+    def duration(self) -> float:
+        """Duration, in seconds"""
+        return self.__duration
+
+    @property
+    def stream_duration(self) -> float:
+        """Length of every frame in the audio stream, in seconds, including encoder delay and padding that players
+        trim from the duration"""
+        return self.__stream_duration if self.__stream_duration is not None else self.__duration
+
+    @property
+    def duration_source(self) -> Optional[str]:
+        """Where the duration came from (e.g. a Xing header, a frame scan, or the probe cache)"""
+        return self.__duration_source
+
+    def __init__(self, file_name: str, file_format: str, title: Optional[str], artist: Optional[str],
+                 album: Optional[str], track: Optional[int], sample_rate: int, channels: int, duration: float,
+                 duration_source: Optional[str], codec: Optional[str]=None, stream_duration: Optional[float]=None):
+        self.__file_name = file_name
+        self.__format = file_format
+        self.__title = title
+        self.__artist = artist
+        self.__album = album
+        self.__track = track
+        self.__sample_rate = sample_rate
+        self.__channels = channels
+        self.__duration = duration
+        self.__duration_source = duration_source
+        self.__codec = codec
+        self.__stream_duration = stream_duration
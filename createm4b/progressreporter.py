@@ -0,0 +1,124 @@
+"""Reporting the progress of a conversion"""
+import bisect
+import json
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+
+class ProgressReporter:
+    """Combines the progress of the ffmpeg runs making up a conversion into percent done, speed, chapter and ETA
+
+    Each run is a job covering part of the book's timeline (the whole book for a single pass, one chapter for a
+    segment).  Reports are either a human readable line, redrawn in place on a terminal, or JSON lines for tools.
+    """
+
+    # Seconds between reports: redrawing a terminal line, writing JSON, and writing a line to a log
+    __interval: float = 0.5
+    __json_interval: float = 1.0
+    __log_interval: float = 5.0
+
+    @property
+    def total(self) -> float:
+        """Length of the book, in seconds"""
+        return self.__total
+
+    def job(self, job: int, start: float=0.0) -> Callable[[float, bool], None]:
+        """Progress callback for an ffmpeg run that covers the timeline from start onwards"""
+        return lambda position, finished: self.update(job, start, position, finished)
+
+    def update(self, job: int, start: float, position: float, finished: bool=False):
+        """Record that job has converted position seconds of audio, from start in the book's timeline"""
+        with self.__lock:
+            self.__jobs[job] = (start, position, finished)
+            now = time.monotonic()
+            if now - self.__last_report >= self.__report_interval:
+                self.__last_report = now
+                self.__report(self.snapshot())
+
+    def reset(self):
+        """Start again, for a retry with another method"""
+        with self.__lock:
+            self.__jobs = {}
+            self.__started = time.monotonic()
+
+    def finish(self):
+        with self.__lock:
+            self.__report(self.snapshot())
+            if self.__interactive:
+                self.__stream.write("\n")
+                self.__stream.flush()
+
+    def snapshot(self) -> Dict[str, object]:
+        done = min(sum(position for (_, position, _) in self.__jobs.values()), self.__total)
+        elapsed = time.monotonic() - self.__started
+        speed = done / elapsed if elapsed > 0 else 0.0
+
+        # The chapter being worked on is the earliest one that isn't finished yet
+        running = [start + position for (start, position, finished) in self.__jobs.values() if not finished]
+        current = min(running) if len(running) > 0 else done
+        chapter = max(bisect.bisect_right(self.__chapter_starts, current), 1)
+
+        return {
+            "percent": round(100.0 * done / self.__total, 1) if self.__total > 0 else 0.0,
+            "position": round(done, 3),
+            "total": round(self.__total, 3),
+            "speed": round(speed, 2),
+            "chapter": chapter,
+            "chapters": len(self.__chapter_starts),
+            "chapter_title": self.__titles[chapter - 1],
+            "elapsed": round(elapsed, 1),
+            "eta": round((self.__total - done) / speed, 1) if speed > 0 else None
+        }
+
+    def __report(self, snapshot: Dict[str, object]):
+        if self.__output_format == "json":
+            self.__stream.write(json.dumps(snapshot) + "\n")
+            self.__stream.flush()
+            return
+
+        line = "{0:5.1f}%  {1:.1f}x  chapter {2}/{3}{4}  ETA {5}".format(
+            snapshot["percent"], snapshot["speed"], snapshot["chapter"], snapshot["chapters"],
+            ": {0}".format(snapshot["chapter_title"]) if snapshot["chapter_title"] else "",
+            ProgressReporter.__format_time(snapshot["eta"]))
+        if self.__interactive:
+            self.__stream.write("\r" + line.ljust(self.__line_length))
+            self.__line_length = len(line)
+        else:
+            self.__stream.write(line + "\n")
+        self.__stream.flush()
+
+    @staticmethod
+    def __format_time(seconds: Optional[float]) -> str:
+        if seconds is None:
+            return "--:--:--"
+        seconds = int(seconds)
+        return "{0}:{1:02}:{2:02}".format(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+    def __init__(self, durations: List[float], titles: List[Optional[str]], output_format: str="human",
+                 stream: Optional[TextIO]=None):
+        """
+        :param durations: Length of each chapter, in seconds
+        :param titles: Title of each chapter
+        :param output_format: "human" or "json"
+        :param stream: Where to write reports; by default stderr for human reports, stdout for JSON
+        """
+        self.__output_format = output_format
+        self.__stream = stream or (sys.stdout if output_format == "json" else sys.stderr)
+        self.__interactive = output_format != "json" and self.__stream.isatty()
+        self.__report_interval = self.__interval if self.__interactive else \
+            self.__json_interval if output_format == "json" else self.__log_interval
+        self.__titles = titles
+        self.__total = sum(durations)
+        self.__chapter_starts: List[float] = []
+        position = 0.0
+        for duration in durations:
+            self.__chapter_starts.append(position)
+            position += duration
+
+        self.__lock = threading.Lock()
+        self.__jobs: Dict[int, Tuple[float, float, bool]] = {}
+        self.__started = time.monotonic()
+        self.__last_report = 0.0
+        self.__line_length = 0
@@ -0,0 +1,165 @@
+"""Choosing thread and job counts for the machine"""
+import math
+import os
+from typing import List, Optional, Tuple
+
+
+class ResourcePlan:
+    """How many CPUs createm4b may use, and the ffmpeg thread and parallel job counts that follow from it
+
+    The CPUs available are the fewest of the machine's CPUs, the CPUs this process may run on (its affinity), and
+    the cgroup CPU quota (of the process's cgroup or any cgroup above it).  Any count can be overridden; the others
+    are derived from the CPUs.
+    """
+
+    # ffmpeg's AAC encoder runs on one thread, so more threads only help decoding and filtering
+    __max_threads: int = 4
+
+    # Probing is mostly waiting on the disk, so it can use more workers than there are CPUs, up to a point
+    __max_probe_workers: int = 8
+
+    @property
+    def cpus(self) -> int:
+        return self.__cpus
+
+    @property
+    def cpu_source(self) -> str:
+        """Where the CPU count came from: the --cpus option, the cgroup quota, the affinity, or os.cpu_count"""
+        return self.__cpu_source
+
+    @property
+    def threads(self) -> int:
+        """ffmpeg threads for a conversion done by a single ffmpeg run"""
+        return self.__threads
+
+    @property
+    def encode_jobs(self) -> int:
+        """Input files to encode at once; 1 encodes everything with a single ffmpeg run"""
+        return self.__encode_jobs
+
+    @property
+    def segment_threads(self) -> int:
+        """ffmpeg threads for each of the encode_jobs runs"""
+        return max(min(self.__threads, self.__cpus // self.__encode_jobs), 1)
+
+    @property
+    def cover_threads(self) -> int:
+        """Threads for encoding the cover as a video stream, which (unlike AAC) uses every thread it gets"""
+        return self.__cpus
+
+    @property
+    def probe_workers(self) -> int:
+        return self.__probe_workers
+
+    def describe(self) -> str:
+        return "{0} CPU(s) (from {1}), {2} ffmpeg thread(s), {3} encode job(s){4}, {5} probe worker(s)".format(
+            self.__cpus, self.__cpu_source, self.__threads, self.__encode_jobs,
+            " of {0} thread(s)".format(self.segment_threads) if self.__encode_jobs > 1 else "", self.__probe_workers)
+
+    @staticmethod
+    def detect_cpus(cgroup_root: str="/sys/fs/cgroup", process_cgroup: str="/proc/self/cgroup") -> Tuple[int, str]:
+        """Number of CPUs this process can use, and where that limit comes from
+
+        :param process_cgroup: File listing the cgroups the process is in, relative to cgroup_root
+        """
+        cpus = os.cpu_count() or 1
+        source = "cpu_count"
+
+        if hasattr(os, "sched_getaffinity"):
+            affinity = len(os.sched_getaffinity(0))
+            if 0 < affinity < cpus:
+                (cpus, source) = (affinity, "affinity")
+
+        quota = ResourcePlan.__read_cgroup_quota(cgroup_root, process_cgroup)
+        if quota is not None and quota < cpus:
+            (cpus, source) = (quota, "cgroup")
+
+        return cpus, source
+
+    @staticmethod
+    def __read_cgroup_quota(cgroup_root: str, process_cgroup: str) -> Optional[int]:
+        """CPUs allowed by the cgroup CPU quota, rounded up, or None if there is no quota
+
+        The quota can be set on the process's own cgroup (on a host, or in a container sharing the host's cgroup
+        namespace) or on any cgroup above it, so the tightest of them counts.  In a container with its own cgroup
+        namespace, the process's cgroup is the root.
+        """
+        (v2_path, v1_path) = ResourcePlan.__read_cgroup_paths(process_cgroup)
+
+        # cgroup v2
+        quotas = [ResourcePlan.__read_cgroup_v2_quota(directory)
+                  for directory in ResourcePlan.__cgroup_ancestors(cgroup_root, v2_path)]
+        quotas = [quota for quota in quotas if quota is not None]
+        if len(quotas) > 0:
+            return min(quotas)
+
+        # cgroup v1, with the cpu controller mounted under cgroup_root
+        quotas = [ResourcePlan.__read_cgroup_v1_quota(directory)
+                  for directory in ResourcePlan.__cgroup_ancestors(os.path.join(cgroup_root, "cpu"), v1_path)]
+        quotas = [quota for quota in quotas if quota is not None]
+        return min(quotas) if len(quotas) > 0 else None
+
+    @staticmethod
+    def __read_cgroup_paths(process_cgroup: str) -> Tuple[str, str]:
+        """The process's cgroup v2 path and cgroup v1 cpu controller path ("/" if it isn't listed)
+
+        Each line of /proc/self/cgroup is "<hierarchy>:<controllers>:<path>"; the v2 hierarchy is "0::<path>".
+        """
+        (v2_path, v1_path) = ("/", "/")
+        try:
+            with open(process_cgroup) as f:
+                for line in f:
+                    (hierarchy, controllers, path) = line.rstrip("\n").split(":", 2)
+                    if hierarchy == "0" and controllers == "":
+                        v2_path = path
+                    elif "cpu" in controllers.split(","):
+                        v1_path = path
+        except (OSError, ValueError):
+            pass
+        return v2_path, v1_path
+
+    @staticmethod
+    def __cgroup_ancestors(root: str, path: str) -> List[str]:
+        """Directories of the cgroup at path and each cgroup above it, up to root"""
+        parts = [part for part in path.split("/") if part not in ("", ".", "..")]
+        return [os.path.join(root, *parts[:i]) for i in range(len(parts), -1, -1)]
+
+    @staticmethod
+    def __read_cgroup_v2_quota(directory: str) -> Optional[int]:
+        # "<quota> <period>" in cpu.max, or "max <period>" without a quota
+        try:
+            with open(os.path.join(directory, "cpu.max")) as f:
+                (quota, period) = f.read().split()[:2]
+            return max(math.ceil(int(quota) / int(period)), 1) if quota != "max" else None
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def __read_cgroup_v1_quota(directory: str) -> Optional[int]:
+        # A quota of -1 means there isn't one
+        try:
+            with open(os.path.join(directory, "cpu.cfs_quota_us")) as f:
+                quota = int(f.read())
+            with open(os.path.join(directory, "cpu.cfs_period_us")) as f:
+                period = int(f.read())
+            return max(math.ceil(quota / period), 1) if quota > 0 and period > 0 else None
+        except (OSError, ValueError):
+            return None
+
+    def __init__(self, cpus: Optional[int]=None, threads: Optional[int]=None, encode_jobs: Optional[int]=None,
+                 probe_workers: Optional[int]=None, cgroup_root: str="/sys/fs/cgroup"):
+        """
+        :param cpus: CPUs to use, instead of detecting them
+        :param threads: ffmpeg threads, instead of one per CPU up to 4
+        :param encode_jobs: Input files to encode at once, instead of one per CPU
+        :param probe_workers: Input files to probe at once, instead of twice the CPUs up to 8
+        """
+        if cpus is not None:
+            (self.__cpus, self.__cpu_source) = (max(cpus, 1), "option")
+        else:
+            (self.__cpus, self.__cpu_source) = ResourcePlan.detect_cpus(cgroup_root)
+
+        self.__threads = max(threads, 1) if threads is not None else min(self.__cpus, ResourcePlan.__max_threads)
+        self.__encode_jobs = max(encode_jobs, 1) if encode_jobs is not None else self.__cpus
+        self.__probe_workers = max(probe_workers, 1) if probe_workers is not None else \
+            min(max(self.__cpus * 2, 2), ResourcePlan.__max_probe_workers)
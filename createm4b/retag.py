@@ -0,0 +1,102 @@
+"""Retag entry point: change the metadata of finished books"""
+import os
+import sys
+import time
+from typing import List, Optional
+
+from .coverimage import CoverImage
+from .ffmetadata import FfMetadata
+from .mp4 import Mp4Atom, Mp4Chapter, Mp4Error, Mp4Track, Mp4Writer
+from .mp4.mp4tags import Mp4Tags
+from .retagcontext import RetagContext
+from .retagerror import RetagError
+
+
+class Retag:
+    """Changes the album, artist, chapters and cover of m4b files, rewriting only their moov atoms"""
+
+    @staticmethod
+    def read_metadata(file_name: str) -> FfMetadata:
+        """The album, album artist and chapters of an m4b, as createm4b gives them to ffmpeg"""
+        with open(file_name, "rb") as f:
+            moov = Mp4Atom.find(f, "moov")
+            track = Mp4Track.find_sound_track(f, moov) if moov is not None else None
+            if track is None:
+                raise RetagError("not an m4b file with audio")
+            tags = Mp4Tags(f, moov)
+            chapters = Mp4Chapter.read_chapters(f, moov)
+
+        metadata = FfMetadata(tags.album, tags.album_artist or tags.artist)
+        ends = [chapter.start for chapter in chapters[1:]] + [max(track.duration, chapters[-1].start)] if chapters \
+            else []
+        for (chapter, end) in zip(chapters, ends):
+            metadata.add_chapter(int(round(chapter.start * 1000)), int(round(end * 1000)), chapter.title)
+        return metadata
+
+    def retag(self, file_name: str):
+        """Apply the changes to one file
+
+        :raises RetagError: if the file isn't an m4b, or a chapter to retitle doesn't exist
+        """
+        context = self.__context
+        metadata = Retag.read_metadata(file_name)
+        if context.export:
+            print(metadata.format(), end="")
+            return
+
+        if context.metadata_file is not None:
+            with open(context.metadata_file, encoding="utf8") as f:
+                try:
+                    metadata = FfMetadata.parse(f.read())
+                except ValueError as e:
+                    raise RetagError("{0}: {1}".format(context.metadata_file, e))
+        if context.album is not None:
+            metadata.album = context.album
+        if context.artist is not None:
+            metadata.artist = context.artist
+        for (number, title) in context.chapter_titles:
+            if not 1 <= number <= len(metadata.chapters):
+                raise RetagError("there is no chapter {0}".format(number))
+            metadata.set_chapter_title(number - 1, title)
+
+        started = time.monotonic()
+        writer = Mp4Writer(file_name)
+        writer.set_tag("©alb", metadata.album or None)
+        writer.set_tag("aART", metadata.artist or None)
+        writer.set_chapters(metadata.chapters)
+        if context.remove_cover:
+            writer.set_cover(None)
+        elif self.__cover is not None:
+            writer.set_cover(self.__cover)
+        writer.write()
+        context.print_verbose("Wrote {0} in {1:.3f}s".format(file_name, time.monotonic() - started))
+
+    def __init__(self, context: RetagContext):
+        self.__context = context
+        self.__cover = None
+        if context.cover_image is not None:
+            cmd = "../ffmpeg" if os.name == "nt" else "ffmpeg"
+            with open(CoverImage(context.cover_image).prepare(cmd, context.cover_size), "rb") as f:
+                self.__cover = f.read()
+
+
+def main(args: Optional[List[str]]=None) -> int:
+    """Retag entry point"""
+    args = args or sys.argv[1:]
+
+    context = RetagContext(args)
+    retag = Retag(context)
+    failed = 0
+    for file_name in context.files:
+        try:
+            retag.retag(file_name)
+            if not context.export:
+                context.print_unlessquiet("Updated {0}".format(file_name))
+        except (OSError, Mp4Error, RetagError) as e:
+            print("{0}: {1}".format(file_name, e), file=sys.stderr)
+            failed += 1
+    return 1 if failed > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
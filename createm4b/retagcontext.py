@@ -0,0 +1,110 @@
+"""Runtime context for retagging finished books"""
+import argparse
+from os import path
+from typing import List, Optional, Tuple
+
+
+class RetagContext:
+    """Options for changing the tags, chapters and cover of existing m4b files"""
+
+    __cover_image: Optional[str] = None
+
+    def print_unlessquiet(self, string: str):
+        if self.__verbosity >= 0:
+            print(string)
+
+    def print_verbose(self, string: str):
+        if self.__verbosity > 0:
+            print(string)
+
+    @property
+    def files(self) -> List[str]:
+        return self.__files
+
+    @property
+    def export(self) -> bool:
+        """Whether to print each book's metadata instead of changing it"""
+        return self.__export
+
+    @property
+    def metadata_file(self) -> Optional[str]:
+        """ffmpeg metadata file to take the album, artist and chapters from"""
+        return self.__metadata_file
+
+    @property
+    def album(self) -> Optional[str]:
+        return self.__album
+
+    @property
+    def artist(self) -> Optional[str]:
+        return self.__artist
+
+    @property
+    def chapter_titles(self) -> List[Tuple[int, str]]:
+        """New titles for chapters, by chapter number (from 1)"""
+        return self.__chapter_titles
+
+    @property
+    def cover_image(self) -> Optional[str]:
+        return self.__cover_image
+
+    @property
+    def cover_size(self) -> Optional[int]:
+        return self.__cover_size
+
+    @property
+    def remove_cover(self) -> bool:
+        return self.__remove_cover
+
+    @staticmethod
+    def __chapter_title(value: str) -> Tuple[int, str]:
+        (number, separator, title) = value.partition("=")
+        if separator == "" or not number.strip().isdigit():
+            raise argparse.ArgumentTypeError("expected NUMBER=TITLE, not {0}".format(value))
+        return int(number), title
+
+    @staticmethod
+    def __get_argument_parser() -> argparse.ArgumentParser:
+        parser = argparse.ArgumentParser(prog="createm4b-retag",
+                                         description="Change the album, artist, chapters or cover of finished m4b "
+                                                     "files in place, without re-encoding or copying them")
+
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("-v", "--verbose", help="increase verbosity", action="count", default=0)
+        group.add_argument("-q", "--quiet", help="be very quiet", action="store_true")
+        parser.add_argument("--export", help="print the book's album, artist and chapters as an ffmpeg metadata "
+                                             "file, to edit and give back with --metadata", action="store_true")
+        parser.add_argument("-m", "--metadata", help="take the album, artist and chapter titles and times from an "
+                                                     "ffmpeg metadata file", default=None)
+        parser.add_argument("--album", help="album name", default=None)
+        parser.add_argument("--artist", help="album artist", default=None)
+        parser.add_argument("-t", "--chapter-title", help="retitle a chapter, counting from 1 (may be repeated)",
+                            metavar="NUMBER=TITLE", type=RetagContext.__chapter_title, action="append", default=[])
+        cover = parser.add_mutually_exclusive_group()
+        cover.add_argument("-c", "--cover", help="path to a new cover image", default=None,
+                           type=argparse.FileType())
+        cover.add_argument("--no-cover", help="remove the cover image", action="store_true")
+        parser.add_argument("--cover-size", help="scale the cover image down to fit in this many pixels", type=int,
+                            default=None)
+        parser.add_argument("files", metavar="file", help="m4b file(s) to change", nargs="+")
+
+        return parser
+
+    def __init__(self, args: List[str]):
+        parser = self.__get_argument_parser()
+        parsed = parser.parse_args(args)
+        if (parsed.export or parsed.metadata is not None) and len(parsed.files) > 1:
+            parser.error("--export and --metadata work on one file at a time")
+
+        self.__verbosity = -1 if parsed.quiet else parsed.verbose
+        self.__export = parsed.export
+        self.__metadata_file = parsed.metadata
+        self.__album = parsed.album
+        self.__artist = parsed.artist
+        self.__chapter_titles = parsed.chapter_title
+        if parsed.cover is not None:
+            self.__cover_image = path.realpath(parsed.cover.name)
+            parsed.cover.close()
+        self.__cover_size = parsed.cover_size
+        self.__remove_cover = parsed.no_cover
+        self.__files = [path.realpath(f) for f in parsed.files]
@@ -0,0 +1,3 @@
+class RetagError(Exception):
+    """A book can't be retagged as asked"""
+    pass
@@ -1,27 +1,40 @@
 """Runtime Context"""
 import argparse
+import os
+import threading
 from os import path
 from typing import List, Optional
 
+from .probecache import ProbeCache
+from .resourceplan import ResourcePlan
+from .segmentcache import SegmentCache
+
 
 class RuntimeContext:
     """Class for storing context needed at runtime"""
     __working_directory: Optional[str] = None
+    __cover_image: Optional[str] = None
+
+    # Messages come from worker threads while probing and encoding
+    __print_lock = threading.Lock()
 
     def print_unlessquiet(self, string: str):
         """Utility method to print unless --quiet is specified"""
         if self.__verbosity >= 0:
-            print(string)
+            with self.__print_lock:
+                print(string)
 
     def print_verbose(self, string: str):
         """Utility method to wrap check for verbosity"""
         if self.__verbosity > 0:
-            print(string)
+            with self.__print_lock:
+                print(string)
 
     def print_veryverbose(self, string: str):
         """Utility method for higher verbose messages"""
         if self.__verbosity > 1:
-            print(string)
+            with self.__print_lock:
+                print(string)
 
     @property
     def is_verbose(self) -> bool:
@@ -49,6 +62,16 @@ class RuntimeContext:
         """Get the filename for the cover image"""
         return self.__cover_image
 
+    @property
+    def cover_mode(self) -> str:
+        """Get how the cover is stored: "attached" picture, or a still image "video" stream"""
+        return self.__cover_mode
+
+    @property
+    def cover_size(self) -> Optional[int]:
+        """Get the size, in pixels, to scale the cover image down to"""
+        return self.__cover_size
+
     @property
     def input_files(self) -> List[str]:
         """Get the list of input files"""
@@ -59,10 +82,108 @@ class RuntimeContext:
         """Get the output file name"""
         return self.__output_file
 
+    @property
+    def append(self) -> bool:
+        """Get whether to add the input files to the end of an existing output file"""
+        return self.__append
+
+    @property
+    def scratch_directory(self) -> Optional[str]:
+        """Get the directory to create the working directory in, or None to create it next to the output file"""
+        return self.__scratch_directory
+
+    @property
+    def check_space(self) -> bool:
+        """Whether to check there is enough free disk space before converting"""
+        return self.__check_space
+
     @property
     def sort(self) -> bool:
         return self.__sort
 
+    @property
+    def two_pass(self) -> bool:
+        """Whether to encode and add metadata with separate ffmpeg runs"""
+        return self.__two_pass
+
+    @property
+    def overlap(self) -> bool:
+        """Whether to start encoding while the input files are still being probed, when the conversion allows it"""
+        return self.__overlap
+
+    @property
+    def stream_copy(self) -> bool:
+        """Whether to join inputs that are all AAC without re-encoding them"""
+        return self.__stream_copy
+
+    @property
+    def copy_mp3(self) -> bool:
+        """Whether to put mp3 audio into the m4b as it is, instead of converting it to AAC"""
+        return self.__copy_mp3
+
+    @property
+    def resource_plan(self) -> ResourcePlan:
+        """Get the CPUs to use, and the ffmpeg thread and parallel job counts for them"""
+        return self.__resource_plan
+
+    @property
+    def encode_jobs(self) -> int:
+        """Get the number of input files to encode at once; 1 encodes everything with a single ffmpeg run"""
+        return self.__resource_plan.encode_jobs
+
+    @property
+    def segment_cache_directory(self) -> Optional[str]:
+        """Get the encoded segment cache location, or None if the cache is disabled"""
+        return self.__segment_cache_directory
+
+    @property
+    def segment_cache_size(self) -> int:
+        """Get the size, in bytes, the encoded segment cache is trimmed to"""
+        return self.__segment_cache_size
+
+    @property
+    def clear_segment_cache(self) -> bool:
+        return self.__clear_segment_cache
+
+    @property
+    def progress_format(self) -> str:
+        """Get how to report progress while converting: human, json or none"""
+        return self.__progress_format
+
+    @property
+    def probe_cache_file(self) -> Optional[str]:
+        """Get the probe cache location, or None if the cache is disabled"""
+        return self.__probe_cache_file
+
+    @property
+    def probe_cache_size(self) -> int:
+        """Get the size, in bytes, the probe cache is kept under"""
+        return self.__probe_cache_size
+
+    @property
+    def clear_probe_cache(self) -> bool:
+        return self.__clear_probe_cache
+
+    @property
+    def probe_workers(self) -> int:
+        """Get the number of input files to probe at once"""
+        return self.__resource_plan.probe_workers
+
+    @property
+    def probe_processes(self) -> bool:
+        """Whether to probe in worker processes rather than threads"""
+        return self.__probe_processes
+
+    @staticmethod
+    def __count_or_auto(value: str) -> Optional[int]:
+        """Parse a count that can be "auto", to be picked by the ResourcePlan"""
+        if value == "auto":
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError("invalid count (or auto): {0}".format(value))
+
     @staticmethod
     def __get_argument_parser() -> argparse.ArgumentParser:
         """Builds up an argparse.ArgumentParser"""
@@ -72,9 +193,56 @@ class RuntimeContext:
         group.add_argument("-v", "--verbose", help="increase verbosity", action="count", default=0)
         group.add_argument("-q", "--quiet", help="be very quiet", action="store_true")
         parser.add_argument("-c", "--cover", help="path to cover image", default=None, type=argparse.FileType())
-        parser.add_argument("-o", "--output", help="output filename", required=True,
-                            type=argparse.FileType("wb"))
+        parser.add_argument("--cover-mode", help="store the cover as an attached picture (default), or as a video "
+                                                 "stream for old players", choices=["attached", "video"],
+                            default="attached")
+        parser.add_argument("--cover-size", help="scale the cover image down to fit in this many pixels", type=int,
+                            default=None)
+        parser.add_argument("-o", "--output", help="output filename", required=True)
+        parser.add_argument("--append", help="add the input files to the end of the output file, a finished m4b, as "
+                                             "new chapters", action="store_true")
         parser.add_argument("-s", "--sort", help="sort using file metadata", action="store_true")
+        parser.add_argument("--work-dir", help="directory for temporary files, such as a scratch disk or tmpfs "
+                                               "(default: next to the output file, so it can be renamed into place)",
+                            default=None)
+        parser.add_argument("--no-space-check", help="start converting without checking there is enough free "
+                                                     "disk space", action="store_true")
+        parser.add_argument("--two-pass", help="encode, then add chapters and cover, with separate ffmpeg runs",
+                            action="store_true")
+        parser.add_argument("--no-overlap", help="probe every input file before starting to encode",
+                            action="store_true")
+        parser.add_argument("--no-stream-copy", help="re-encode the audio even when every input file is already AAC",
+                            action="store_true")
+        parser.add_argument("--copy-mp3", help="when every input file is mp3, put the mp3 audio into the m4b as it "
+                                               "is instead of converting it to AAC (not every player supports this)",
+                            action="store_true")
+        parser.add_argument("-j", "--encode-jobs", help="encode this many input files at once (or auto, for one "
+                                                        "per CPU), then join them without re-encoding",
+                            type=RuntimeContext.__count_or_auto, default=1)
+        parser.add_argument("--cpus", help="number of CPUs to use (default: detected, including affinity and "
+                                           "cgroup limits)", type=int, default=None)
+        parser.add_argument("--threads", help="number of ffmpeg threads (default: one per CPU, up to 4)", type=int,
+                            default=None)
+        parser.add_argument("--progress", help="how to report progress while converting: a line on stderr "
+                                               "(default, unless quiet), JSON lines on stdout, or not at all",
+                            choices=["human", "json", "none"], default=None)
+        parser.add_argument("--segment-cache", help="location of the encoded segment cache", default=None)
+        parser.add_argument("--no-segment-cache", help="don't read or write the encoded segment cache",
+                            action="store_true")
+        parser.add_argument("--clear-segment-cache", help="empty the encoded segment cache before starting",
+                            action="store_true")
+        parser.add_argument("--segment-cache-size", help="size, in megabytes, to keep the encoded segment cache "
+                                                         "under", type=int,
+                            default=SegmentCache.DEFAULT_MAX_SIZE // (1024 * 1024))
+        parser.add_argument("--probe-cache", help="location of the probe cache", default=None)
+        parser.add_argument("--no-probe-cache", help="don't read or write the probe cache", action="store_true")
+        parser.add_argument("--clear-probe-cache", help="empty the probe cache before starting", action="store_true")
+        parser.add_argument("--probe-cache-size", help="size, in megabytes, to keep the probe cache under", type=int,
+                            default=ProbeCache.DEFAULT_MAX_SIZE // (1024 * 1024))
+        parser.add_argument("--probe-workers", help="number of input files to probe at once (default: two per CPU, "
+                                                    "up to 8)", type=int, default=None)
+        parser.add_argument("--probe-processes", help="probe input files in processes instead of threads",
+                            action="store_true")
         parser.add_argument("input_files", metavar="file", help="input file(s)", nargs="+",
                             type=argparse.FileType("rb"))
 
@@ -87,23 +255,71 @@ class RuntimeContext:
         if parsed.cover is not None:
             self.__cover_image = path.realpath(parsed.cover.name)
             parsed.cover.close()
+        self.__cover_mode = parsed.cover_mode
+        self.__cover_size = parsed.cover_size
         self.__sort = parsed.sort
+        self.__scratch_directory = path.realpath(parsed.work_dir) if parsed.work_dir else None
+        self.__check_space = not parsed.no_space_check
+        self.__two_pass = parsed.two_pass
+        self.__overlap = not parsed.no_overlap
+        self.__stream_copy = not parsed.no_stream_copy
+        self.__copy_mp3 = parsed.copy_mp3
+        self.__resource_plan = ResourcePlan(parsed.cpus, parsed.threads, parsed.encode_jobs, parsed.probe_workers)
+        self.__progress_format = parsed.progress or ("none" if parsed.quiet else "human")
+        self.__segment_cache_directory = None if parsed.no_segment_cache else \
+            path.realpath(parsed.segment_cache) if parsed.segment_cache else SegmentCache.default_path()
+        self.__segment_cache_size = max(parsed.segment_cache_size, 0) * 1024 * 1024
+        self.__clear_segment_cache = parsed.clear_segment_cache
+        self.__probe_cache_file = None if parsed.no_probe_cache else \
+            path.realpath(parsed.probe_cache) if parsed.probe_cache else ProbeCache.default_path()
+        self.__probe_cache_size = max(parsed.probe_cache_size, 0) * 1024 * 1024
+        self.__clear_probe_cache = parsed.clear_probe_cache
+        self.__probe_processes = parsed.probe_processes
         self.__input_files = []
         for i in parsed.input_files:
             self.__input_files.append(path.realpath(i.name))
             i.close()
-        self.__output_file = path.realpath(parsed.output.name)
-        parsed.output.close()
+        self.__append = parsed.append
+        self.__output_file = path.realpath(parsed.output)
+        if self.__append:
+            if not path.isfile(self.__output_file):
+                parser.error("argument -o/--output: can't append to '{0}': no such file".format(parsed.output))
+        else:
+            # The m4b is renamed into place once it's finished, so an existing book is left alone until then
+            directory = path.dirname(self.__output_file)
+            if path.isdir(self.__output_file):
+                parser.error("argument -o/--output: can't write '{0}': it is a directory".format(parsed.output))
+            if not path.isdir(directory):
+                parser.error("argument -o/--output: can't write '{0}': no such directory".format(parsed.output))
+            if not os.access(directory, os.W_OK) or \
+                    (path.exists(self.__output_file) and not os.access(self.__output_file, os.W_OK)):
+                parser.error("argument -o/--output: can't write '{0}': permission denied".format(parsed.output))
 
         self.print_veryverbose("Command line arguments:")
         self.print_veryverbose("Verbosity: {0}".format("Very Verbose" if self.is_veryverbose else
                                                        "Verbose" if self.is_verbose else
                                                        "Quiet" if self.is_quiet else "Normal"))
         if self.cover_image is not None:
-            self.print_veryverbose("Cover Image: {0}".format(self.cover_image))
+            self.print_veryverbose("Cover Image: {0} ({1})".format(self.cover_image, self.cover_mode))
         self.print_veryverbose("Input files:")
         for file in self.input_files:
             self.print_veryverbose("\t{0}".format(file))
-        self.print_veryverbose("Output file: {0}".format(self.output_file))
+        self.print_veryverbose("Output file: {0}{1}".format(self.output_file, " (appending)" if self.append else ""))
+        self.print_veryverbose("Temporary files in: {0}".format(self.scratch_directory or "output directory"))
+        self.print_veryverbose("Stream copy AAC input: {0}".format("yes" if self.stream_copy else "no"))
+        self.print_veryverbose("Copy mp3 input: {0}".format("yes" if self.copy_mp3 else "no"))
+        self.print_veryverbose("Progress: {0}".format(self.progress_format))
+        if self.segment_cache_directory is not None:
+            self.print_veryverbose("Segment cache: {0} ({1} MB)".format(self.segment_cache_directory,
+                                                                        self.segment_cache_size // (1024 * 1024)))
+        else:
+            self.print_veryverbose("Segment cache: disabled")
+        if self.probe_cache_file is not None:
+            self.print_veryverbose("Probe cache: {0} ({1} MB)".format(self.probe_cache_file,
+                                                                      self.probe_cache_size // (1024 * 1024)))
+        else:
+            self.print_veryverbose("Probe cache: disabled")
+        self.print_veryverbose("Probe workers: {0} {1}".format(self.probe_workers,
+                                                               "processes" if self.probe_processes else "threads"))
         self.print_veryverbose("=============================================================")
         self.print_veryverbose("")
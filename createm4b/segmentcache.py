@@ -0,0 +1,119 @@
+"""Persistent cache of encoded chapter segments"""
+import hashlib
+import os
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+from . import util
+
+
+class SegmentCache:
+    """On-disk cache of encoded AAC segments, keyed by a hash of the input file's contents and the encoder settings
+
+    Each segment is a file in the cache directory named after its key.  Segments are moved into place once they are
+    completely encoded, so an interrupted conversion keeps everything it finished.  Using a segment updates its
+    modification time, and the least recently used segments are removed once the cache grows past max_size bytes.
+    """
+
+    DEFAULT_MAX_SIZE: int = 2 * 1024 * 1024 * 1024
+
+    # Partial segments older than this (in seconds) were left behind by a conversion that was killed
+    __stale_age: int = 24 * 60 * 60
+
+    __chunk_size: int = 1024 * 1024
+
+    @staticmethod
+    def default_path() -> str:
+        return os.path.join(util.cache_directory(), "segments")
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def max_size(self) -> int:
+        return self.__max_size
+
+    @staticmethod
+    def key(file_name: str, encoder_settings: List[str]) -> str:
+        """Cache key for encoding file_name with the given (ffmpeg) encoder settings"""
+        digest = hashlib.sha256()
+        digest.update("\0".join(encoder_settings).encode("utf8"))
+        digest.update(b"\0")
+        with open(file_name, "rb") as f:
+            for chunk in iter(lambda: f.read(SegmentCache.__chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a segment, returning its file name or None if it isn't cached"""
+        file_name = self.__file_name(key)
+        try:
+            os.utime(file_name)
+        except OSError:
+            return None
+        return file_name
+
+    def create_temporary(self) -> str:
+        """Create a file in the cache directory to encode a segment into before it is stored"""
+        (fd, temp_name) = tempfile.mkstemp(suffix=".partial", dir=self.__path)
+        os.close(fd)
+        return temp_name
+
+    def store(self, key: str, temp_name: str) -> str:
+        """Move a segment encoded into a file from create_temporary into the cache
+
+        :return: The segment's file name in the cache
+        """
+        file_name = self.__file_name(key)
+        os.replace(temp_name, file_name)
+        return file_name
+
+    def remove(self, file_name: str):
+        """Remove a segment returned by get or store, which turned out to be unusable"""
+        SegmentCache.__remove(file_name)
+
+    def trim(self):
+        """Remove the least recently used segments until the cache fits in max_size"""
+        segments: List[Tuple[float, int, str]] = []
+        now = time.time()
+        for entry in os.scandir(self.__path):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            if entry.name.endswith(".partial"):
+                if now - stat.st_mtime > SegmentCache.__stale_age:
+                    SegmentCache.__remove(entry.path)
+            elif entry.name.endswith(".m4a"):
+                segments.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for (_, size, _) in segments)
+        for (_, size, file_name) in sorted(segments):
+            if total_size <= self.__max_size:
+                break
+            SegmentCache.__remove(file_name)
+            total_size -= size
+
+    def clear(self):
+        for entry in os.scandir(self.__path):
+            if entry.name.endswith(".m4a"):
+                SegmentCache.__remove(entry.path)
+
+    def __file_name(self, key: str) -> str:
+        return os.path.join(self.__path, "{0}.m4a".format(key))
+
+    @staticmethod
+    def __remove(file_name: str):
+        try:
+            os.remove(file_name)
+        except OSError:
+            # Already removed by another createm4b process
+            pass
+
+    def __init__(self, path: Optional[str]=None, max_size: int=DEFAULT_MAX_SIZE):
+        self.__path = path or SegmentCache.default_path()
+        self.__max_size = max_size
+        os.makedirs(self.__path, exist_ok=True)
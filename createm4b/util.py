@@ -1,5 +1,37 @@
 """Static utility methods"""
+import os
+import tempfile
+from typing import Optional
 
 
 def parse_32bit_little_endian(data: bytes) -> int:
     return data[0] | data[1] << 8 | data[2] << 16 | data[3] << 24
+
+
+def parse_32bit_big_endian(data: bytes) -> int:
+    return data[0] << 24 | data[1] << 16 | data[2] << 8 | data[3]
+
+
+def parse_syncsafe_integer(data: bytes) -> int:
+    """Parse a 28 bit id3v2 "syncsafe" integer, stored as 4 bytes of 7 bits each"""
+    return (data[0] & 0x7f) << 21 | (data[1] & 0x7f) << 14 | (data[2] & 0x7f) << 7 | (data[3] & 0x7f)
+
+
+def cache_directory() -> str:
+    """Directory for createm4b's persistent caches (under $XDG_CACHE_HOME, or ~/.cache)"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "createm4b")
+
+
+def create_working_directory(output_file: str, parent: Optional[str]=None) -> str:
+    """Create a directory for temporary files, by default next to output_file
+
+    Temporary files on the output's filesystem can be renamed into place instead of copied.  If the output's directory
+    isn't writable, the system's temporary directory is used.
+    """
+    try:
+        return tempfile.mkdtemp(prefix=".createm4b-", dir=parent or os.path.dirname(output_file))
+    except OSError:
+        if parent is not None:
+            raise
+        return tempfile.mkdtemp(prefix="createm4b-")
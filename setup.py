@@ -7,11 +7,13 @@ from setuptools import setup
 
 setup(name='createm4b',
       version='0.1.0',
-      packages=['createm4b'],
+      packages=['createm4b', 'createm4b.mp3', 'createm4b.flac', 'createm4b.mp4'],
       install_requires=['ffmpeg-python'],
       entry_points={
           'console_scripts': [
-              'createm4b = createm4b.__main__:main'
+              'createm4b = createm4b.__main__:main',
+              'createm4b-batch = createm4b.batch:main',
+              'createm4b-retag = createm4b.retag:main'
           ]
       },
       )
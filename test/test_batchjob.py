@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.batcherror import BatchError
+from createm4b.batchjob import BatchJob
+
+
+class BatchJobTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __create_file(self, *path: str) -> str:
+        file_name = os.path.join(self.root, *path)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with open(file_name, "wb") as f:
+            f.write(b"\0")
+        return file_name
+
+    def test_every_directory_with_audio_files_is_a_book(self):
+        self.__create_file("books", "Author", "Book One", "1.mp3")
+        self.__create_file("books", "Author", "Book Two", "1.flac")
+        self.__create_file("books", "Author", "notes.txt")
+
+        jobs = BatchJob.find_books(os.path.join(self.root, "books"), "/out")
+
+        self.assertEqual([job.name for job in jobs], [os.path.join("Author", "Book One"),
+                                                      os.path.join("Author", "Book Two")])
+        self.assertEqual(jobs[0].output_file, os.path.join("/out", "Author", "Book One.m4b"))
+
+    def test_files_are_in_natural_order_and_cover_is_found(self):
+        for name in ("Chapter 10.mp3", "Chapter 9.mp3", "chapter 1.mp3", "Folder.JPG"):
+            self.__create_file("book", name)
+
+        (job,) = BatchJob.find_books(os.path.join(self.root, "book"), "/out")
+
+        self.assertEqual([os.path.basename(f) for f in job.input_files],
+                         ["chapter 1.mp3", "Chapter 9.mp3", "Chapter 10.mp3"])
+        self.assertEqual(job.cover_image, os.path.join(self.root, "book", "Folder.JPG"))
+        self.assertEqual(job.output_file, os.path.join("/out", "book.m4b"))
+
+    def test_missing_directory_raises(self):
+        with self.assertRaises(BatchError):
+            BatchJob.find_books(os.path.join(self.root, "missing"), "/out")
+
+    def test_manifest_paths_are_relative_to_manifest_and_output_directory(self):
+        manifest = os.path.join(self.root, "manifest.json")
+        with open(manifest, "w") as f:
+            json.dump({"books": [{"inputs": ["a/1.mp3", "a/2.mp3"], "cover": "a/cover.jpg", "args": ["-s"]},
+                                 {"name": "B", "inputs": ["/b/1.mp3"], "output": "b/b.m4b"}]}, f)
+
+        jobs = BatchJob.read_manifest(manifest, "/out")
+
+        self.assertEqual(jobs[0].name, "a")
+        self.assertEqual(jobs[0].input_files, [os.path.join(self.root, "a", "1.mp3"),
+                                               os.path.join(self.root, "a", "2.mp3")])
+        self.assertEqual(jobs[0].output_file, os.path.join("/out", "a.m4b"))
+        self.assertEqual(jobs[0].get_arguments(["-q"]), ["-q", "-s", "-o", os.path.join("/out", "a.m4b"),
+                                                         "-c", os.path.join(self.root, "a", "cover.jpg")]
+                         + jobs[0].input_files)
+        self.assertEqual(jobs[1].name, "B")
+        self.assertEqual(jobs[1].input_files, ["/b/1.mp3"])
+        self.assertEqual(jobs[1].output_file, os.path.join("/out", "b", "b.m4b"))
+
+    def test_invalid_manifest_raises(self):
+        manifest = os.path.join(self.root, "manifest.json")
+        for content in ("not json", "{}", "[{\"inputs\": []}]"):
+            with self.subTest(content=content):
+                with open(manifest, "w") as f:
+                    f.write(content)
+                with self.assertRaises(BatchError):
+                    BatchJob.read_manifest(manifest, "/out")
@@ -0,0 +1,79 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from benchmarks import fixtures
+from benchmarks.benchmark import Baseline, Benchmark, Result
+from createm4b.flac import Flac, FlacValidator
+from createm4b.mp3 import Mp3Validator
+from createm4b.mp3.id3 import ID3
+
+
+class FixtureTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name: str, data: bytes) -> str:
+        file_name = os.path.join(self.directory.name, name)
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return file_name
+
+    def test_mp3_with_xing_header_has_expected_duration(self):
+        file_name = self.write("a.mp3", fixtures.id3v2_tag(3, 1024) + fixtures.mp3_stream(100))
+
+        result = Mp3Validator().probe_file(file_name)
+
+        self.assertAlmostEqual(result.duration, fixtures.mp3_duration(100), places=3)
+        self.assertEqual(result.title, "Chapter 1")
+
+    def test_vbr_mp3_is_scanned_to_expected_duration(self):
+        file_name = self.write("a.mp3", fixtures.mp3_stream(100, vbr=True, xing=False))
+
+        result = Mp3Validator().probe_file(file_name)
+
+        self.assertAlmostEqual(result.duration, fixtures.mp3_duration(100, xing=False), places=3)
+
+    def test_id3_tags_of_each_version_can_be_read(self):
+        for version in (2, 3, 4):
+            with self.subTest(version=version):
+                file_name = self.write("a.mp3", fixtures.id3v2_tag(version, 1024, padding=16) + fixtures.mp3_stream(1))
+                with open(file_name, "rb") as f:
+                    tag = ID3.read_id3(f)
+
+                self.assertEqual(tag.title, "Chapter 1")
+                self.assertEqual(tag.artist, "Author")
+                self.assertEqual(tag.track, 1)
+
+    def test_flac_metadata_is_valid(self):
+        file_name = self.write("a.flac", fixtures.flac_file(picture_size=1024, comment_count=20))
+
+        blocks = list(Flac.get_metadata(file_name))
+        result = FlacValidator().probe_file(file_name)
+
+        self.assertEqual([b.block_type for b in blocks][:2], ["StreamInfo", "VorbisComment"])
+        self.assertEqual(len(blocks), 4)
+        self.assertEqual(result.duration, 60.0)
+        self.assertEqual(result.title, "Chapter 1")
+
+
+class BenchmarkTests(TestCase):
+    def test_every_case_runs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for case in Benchmark("small", directory).cases():
+                with self.subTest(case=case.name):
+                    case.run()
+
+    def test_baseline_round_trips(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            Baseline(path).save([Result("small: a", 0.5, None)])
+
+            baseline = Baseline(path)
+
+            self.assertEqual(baseline.get("small: a"), 0.5)
+            self.assertIsNone(baseline.get("small: b"))
+            self.assertEqual(Result("small: a", 0.75, baseline.get("small: a")).ratio, 1.5)
@@ -0,0 +1,155 @@
+import os
+import tempfile
+from typing import List, Optional
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+
+from createm4b.audiosourcefactory import AudioSourceFactory
+from createm4b.diskspaceerror import DiskSpaceError
+from createm4b.mp3 import Mp3
+from createm4b.mp4 import Mp4Error
+from createm4b.proberesult import ProbeResult
+from createm4b.runtime import RuntimeContext
+from createm4b.segmentcache import SegmentCache
+
+try:
+    import ffmpeg
+    from createm4b.book import Book
+except ImportError:  # pragma: no cover
+    # Book needs ffmpeg-python
+    Book = None
+
+PNG = b"\x89PNG\r\n\x1a\n\0\0"
+
+
+class FakeFfmpegProcess:
+    """Records the arguments of every ffmpeg run instead of running it"""
+
+    runs: List[List[str]] = []
+    succeeds: bool = True
+
+    def __init__(self, args: List[str], on_progress=None, capture_errors: bool=False, show_output: bool=False):
+        self.args = args
+        self.errors = ""
+
+    def run(self) -> bool:
+        FakeFfmpegProcess.runs.append(self.args)
+        return FakeFfmpegProcess.succeeds
+
+
+class FakeTrack:
+    media_duration = 1.5
+
+
+@skipIf(Book is None, "needs ffmpeg-python")
+class BookArgumentTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.inputs = [self.__create_file("{0}.mp3".format(i), bytes([i]) * 16) for i in range(2)]
+        self.cover = self.__create_file("cover.png", PNG)
+        self.output = os.path.join(self.directory.name, "book.m4b")
+        FakeFfmpegProcess.runs = []
+        FakeFfmpegProcess.succeeds = True
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __create_file(self, name: str, data: bytes) -> str:
+        file_name = os.path.join(self.directory.name, name)
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return file_name
+
+    def __convert(self, *options: str, segment_cache: Optional[SegmentCache]=None,
+                  tracks: Optional[list]=None) -> List[List[str]]:
+        context = RuntimeContext(["-q", "--progress", "none", "--no-probe-cache", "--no-segment-cache",
+                                  "--no-overlap"] + list(options) + ["-o", self.output] + self.inputs)
+        context.working_directory = self.directory.name
+        sources = [Mp3(None, file_name, ProbeResult(file_name, "mp3", "Chapter {0}".format(i), "Author", "Book",
+                                                    i, 44100, 2, 1.5, "Xing", "mp3"))
+                   for (i, file_name) in enumerate(self.inputs)]
+        with patch.object(AudioSourceFactory, "get_audio_sources", return_value=sources), \
+                patch("createm4b.book.FfmpegProcess", FakeFfmpegProcess), \
+                patch("createm4b.book.Mp4Track.read_sound_track", return_value=FakeTrack(), side_effect=tracks):
+            book = Book(context.input_files, context.cover_image, segment_cache=segment_cache)
+            book.convert(self.output, context)
+        return FakeFfmpegProcess.runs
+
+    def test_single_pass_without_cover(self):
+        [args] = self.__convert("--no-space-check")
+
+        self.assertEqual(args[1:7], ["-i", self.inputs[0], "-i", self.inputs[1], "-i", args[6]])
+        self.assertEqual(args[7:11], ["-filter_complex", "[0:a:0][1:a:0]concat=n=2:v=0:a=1[a]", "-map", "[a]"])
+        self.assertNotIn("-disposition:v:0", args)
+        self.assertEqual(args[-2], "-y")
+        self.assertEqual(os.path.dirname(args[-1]), self.directory.name)
+
+    def test_single_pass_cover_is_an_input_before_the_output_options(self):
+        [args] = self.__convert("--no-space-check", "-c", self.cover)
+
+        inputs = [args[i + 1] for (i, arg) in enumerate(args) if arg == "-i"]
+        self.assertEqual(inputs[:2], self.inputs)
+        self.assertEqual(inputs[3], self.cover)
+        self.assertLess(args.index(self.cover), args.index("-filter_complex"))
+        self.assertLess(args.index("-filter_complex"), args.index("-map_metadata"))
+        self.assertIn("3:0", args)
+        self.assertEqual(args[args.index("-disposition:v:0") + 1], "attached_pic")
+
+    def test_two_pass_encodes_then_remuxes_with_the_cover(self):
+        (encode, remux) = self.__convert("--no-space-check", "--two-pass", "--cover-mode", "video", "-c", self.cover)
+
+        self.assertNotIn(self.cover, encode)
+        self.assertEqual(remux[1:3], ["-i", encode[-2]])
+        self.assertEqual(remux[remux.index(self.cover) - 3:remux.index(self.cover)], ["-loop", "1", "-i"])
+        self.assertLess(remux.index(self.cover), remux.index("-map_metadata"))
+        self.assertEqual(remux[remux.index("-c:a") + 1], "copy")
+
+    def test_join_copies_the_segments_with_the_cover(self):
+        runs = self.__convert("--no-space-check", "-j", "2", "-c", self.cover)
+
+        self.assertEqual(len(runs), 3)
+        segments = [args[-1] for args in runs[:2]]
+        join = runs[2]
+        self.assertEqual(join[1:7], ["-f", "concat", "-safe", "0", "-i", join[6]])
+        with open(join[6]) as f:
+            self.assertEqual(f.read(), "".join("file '{0}'\nduration 1.5\n".format(s) for s in segments))
+        self.assertEqual(join[join.index(self.cover) + 1:join.index(self.cover) + 3], ["-map", "2:0"])
+        self.assertLess(join.index(self.cover), join.index("0:a"))
+        self.assertEqual(join[join.index("0:a") - 1], "-map")
+        self.assertEqual(join[join.index("-c:a") + 1], "copy")
+
+    def test_unreadable_segment_is_dropped_from_the_cache(self):
+        cache = SegmentCache(os.path.join(self.directory.name, "segments"))
+
+        runs = self.__convert("--no-space-check", "-j", "2", segment_cache=cache,
+                              tracks=[FakeTrack(), Mp4Error("no moov atom")])
+
+        self.assertEqual(len(runs), 3)
+        settings = ["-c:a", "aac", "-b:a", "64k", "-ar", "44100", "-ac", "2"]
+        self.assertIsNotNone(cache.get(SegmentCache.key(self.inputs[0], settings)))
+        self.assertIsNone(cache.get(SegmentCache.key(self.inputs[1], settings)))
+        self.assertEqual(runs[2][1:3], ["-i", self.inputs[0]])
+
+    def test_failed_conversion_leaves_the_existing_output_alone(self):
+        with open(self.output, "wb") as f:
+            f.write(b"old book")
+        FakeFfmpegProcess.succeeds = False
+
+        with self.assertRaises(ffmpeg.Error):
+            self.__convert("--no-space-check")
+
+        with open(self.output, "rb") as f:
+            self.assertEqual(f.read(), b"old book")
+        self.assertEqual([f for f in os.listdir(self.directory.name) if f.endswith(".partial")], [])
+
+    def test_space_check_leaves_the_existing_output_alone(self):
+        with open(self.output, "wb") as f:
+            f.write(b"old book")
+
+        with patch("createm4b.book.DiskSpaceCheck.check", side_effect=DiskSpaceError("Not enough disk space")):
+            with self.assertRaises(DiskSpaceError):
+                self.__convert()
+
+        self.assertEqual(FakeFfmpegProcess.runs, [])
+        with open(self.output, "rb") as f:
+            self.assertEqual(f.read(), b"old book")
@@ -0,0 +1,188 @@
+import os
+import tempfile
+import threading
+from typing import List
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+
+from createm4b.diskspaceerror import DiskSpaceError
+from createm4b.runtime import RuntimeContext
+
+try:
+    from createm4b.book import Book
+    from createm4b.conversionpipeline import ConversionPipeline
+except ImportError:  # pragma: no cover
+    # Book needs ffmpeg-python
+    Book = None
+
+
+class FakeEncoder:
+    """Stands in for the FfmpegProcess encoding the book, running whatever the test gives it"""
+
+    instances: List["FakeEncoder"] = []
+    behaviour = staticmethod(lambda encoder: True)
+
+    def __init__(self, args: List[str], on_progress=None, capture_errors: bool=False, show_output: bool=False):
+        self.args = args
+        self.on_progress = on_progress
+        self.terminated = threading.Event()
+        FakeEncoder.instances.append(self)
+
+    def run(self) -> bool:
+        return FakeEncoder.behaviour(self)
+
+    def terminate(self):
+        self.terminated.set()
+
+
+class FakeProgress:
+    def __init__(self):
+        self.updates = []
+
+    def update(self, job: int, start: float, position: float, finished: bool=False):
+        self.updates.append((job, start, position, finished))
+
+    def finish(self):
+        pass
+
+
+class FakeBook:
+    """Stands in for Book, keeping its static methods"""
+
+    needs_remux = staticmethod(Book.needs_remux) if Book is not None else None
+    create_output_temporary = staticmethod(Book.create_output_temporary) if Book is not None else None
+    get_encode_arguments = staticmethod(Book.get_encode_arguments) if Book is not None else None
+    BIT_RATE = Book.BIT_RATE if Book is not None else None
+
+    probe = staticmethod(lambda: None)
+    instances: List["FakeBook"] = []
+
+    def __init__(self, *args, **kwargs):
+        FakeBook.probe()
+        self.audio_list = []
+        self.conversions = []
+        self.progress = FakeProgress()
+        FakeBook.instances.append(self)
+
+    def check_space(self, output_file: str, context: RuntimeContext):
+        pass
+
+    def create_progress_reporter(self, context: RuntimeContext) -> FakeProgress:
+        return self.progress
+
+    def convert(self, output_file: str, context: RuntimeContext, encoded_audio: str=None):
+        self.conversions.append(encoded_audio)
+
+
+@skipIf(Book is None, "needs ffmpeg-python")
+class ConversionPipelineTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, "book.m4b")
+        self.mp3 = [self.__create_file("{0}.mp3".format(i), b"\xff\xfb" + b"\0" * 4998) for i in range(2)]
+        FakeEncoder.instances = []
+        FakeEncoder.behaviour = staticmethod(lambda encoder: True)
+        FakeBook.instances = []
+        FakeBook.probe = staticmethod(lambda: None)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __create_file(self, name: str, data: bytes) -> str:
+        file_name = os.path.join(self.directory.name, name)
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return file_name
+
+    def __context(self, *options: str, inputs: List[str]=None) -> RuntimeContext:
+        context = RuntimeContext(["-q", "--no-probe-cache", "--no-segment-cache"] + list(options) +
+                                 ["-o", self.output] + (inputs or self.mp3))
+        context.working_directory = self.directory.name
+        return context
+
+    def __run(self, *options: str) -> FakeBook:
+        with patch("createm4b.conversionpipeline.FfmpegProcess", FakeEncoder), \
+                patch("createm4b.conversionpipeline.Book", FakeBook):
+            ConversionPipeline(self.__context(*options)).run()
+        return FakeBook.instances[0]
+
+    def __partial_files(self) -> List[str]:
+        return [f for f in os.listdir(self.directory.name) if f.endswith(".partial")]
+
+    def test_can_overlap_a_plain_encode(self):
+        self.assertTrue(ConversionPipeline.can_overlap(self.__context()))
+
+    def test_cant_overlap_what_needs_probing_first(self):
+        flac = self.__create_file("3.flac", b"fLaC" + b"\0" * 8)
+        m4a = self.__create_file("4.m4a", b"\0\0\0\x20ftypM4A ")
+
+        self.assertFalse(ConversionPipeline.can_overlap(self.__context("--no-overlap")))
+        self.assertFalse(ConversionPipeline.can_overlap(self.__context("-s")))
+        self.assertFalse(ConversionPipeline.can_overlap(self.__context("-j", "2")))
+        self.assertFalse(ConversionPipeline.can_overlap(self.__context("--copy-mp3")))
+        self.assertFalse(ConversionPipeline.can_overlap(self.__context(inputs=self.mp3[:1])))
+        self.assertFalse(ConversionPipeline.can_overlap(self.__context(inputs=[flac, m4a])))
+        self.assertTrue(ConversionPipeline.can_overlap(self.__context("--no-stream-copy", inputs=[flac, m4a])))
+        self.assertTrue(ConversionPipeline.can_overlap(self.__context("--copy-mp3", inputs=[flac] + self.mp3)))
+
+    def test_cant_overlap_an_append(self):
+        with open(self.output, "wb") as f:
+            f.write(b"old book")
+
+        self.assertFalse(ConversionPipeline.can_overlap(self.__context("--append")))
+
+    def test_encoded_audio_becomes_the_book(self):
+        book = self.__run("--no-space-check")
+
+        [encoder] = FakeEncoder.instances
+        self.assertEqual(book.conversions, [encoder.args[-2]])
+
+    def test_failed_probe_stops_the_encoder(self):
+        def probe():
+            raise OSError("can't read 1.mp3")
+
+        def encode(encoder: FakeEncoder) -> bool:
+            encoder.terminated.wait(5)
+            return False
+
+        FakeBook.probe = staticmethod(probe)
+        FakeEncoder.behaviour = staticmethod(encode)
+        with self.assertRaises(OSError):
+            self.__run("--no-space-check")
+
+        self.assertTrue(FakeEncoder.instances[0].terminated.is_set())
+        self.assertEqual(self.__partial_files(), [])
+
+    def test_failed_encode_converts_again(self):
+        FakeEncoder.behaviour = staticmethod(lambda encoder: False)
+
+        book = self.__run("--no-space-check")
+
+        self.assertEqual(book.conversions, [None])
+        self.assertEqual(self.__partial_files(), [])
+
+    def test_progress_from_before_the_probe_finished_is_reported(self):
+        reported = threading.Event()
+
+        def encode(encoder: FakeEncoder) -> bool:
+            encoder.on_progress(12.5, False)
+            reported.set()
+            return True
+
+        FakeBook.probe = staticmethod(lambda: reported.wait(5))
+        FakeEncoder.behaviour = staticmethod(encode)
+        book = self.__run("--no-space-check", "--progress", "json")
+
+        self.assertEqual(book.progress.updates, [(0, 0.0, 12.5, False)])
+
+    def test_space_is_checked_before_encoding(self):
+        with patch("createm4b.conversionpipeline.DiskSpaceCheck.add") as add, \
+                patch("createm4b.conversionpipeline.DiskSpaceCheck.check",
+                      side_effect=DiskSpaceError("Not enough disk space")):
+            with self.assertRaises(DiskSpaceError):
+                self.__run()
+
+        self.assertEqual(FakeEncoder.instances, [])
+        # 10000 bytes of mp3 last at least a quarter of a second, 2000 bytes at 64 kbit/s
+        self.assertEqual(add.call_args[0][1], 2000)
+        self.assertEqual(self.__partial_files(), [])
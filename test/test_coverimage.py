@@ -0,0 +1,41 @@
+import hashlib
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.coverimage import CoverImage
+
+
+class CoverImageTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __create_file(self, name: str, data: bytes) -> str:
+        file_name = os.path.join(self.directory.name, name)
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return file_name
+
+    def test_detects_jpeg_and_png(self):
+        self.assertEqual(CoverImage(self.__create_file("a.jpg", b"\xff\xd8\xff\xe0\0\x10JFIF")).format, "jpeg")
+        self.assertEqual(CoverImage(self.__create_file("a.png", b"\x89PNG\r\n\x1a\n\0\0")).format, "png")
+        self.assertIsNone(CoverImage(self.__create_file("a.gif", b"GIF89a\0\0")).format)
+
+    def test_jpeg_is_attached_without_conversion(self):
+        file_name = self.__create_file("a.jpg", b"\xff\xd8\xff\xe0\0\x10JFIF")
+
+        result = CoverImage(file_name, self.directory.name).prepare("ffmpeg-that-does-not-exist")
+
+        self.assertEqual(result, file_name)
+
+    def test_converted_image_is_reused_from_cache(self):
+        file_name = self.__create_file("a.gif", b"GIF89a\0\0")
+        cached_name = self.__create_file("{0}-500.jpg".format(hashlib.sha256(b"GIF89a\0\0").hexdigest()),
+                                         b"\xff\xd8\xff")
+
+        result = CoverImage(file_name, self.directory.name).prepare("ffmpeg-that-does-not-exist", 500)
+
+        self.assertEqual(result, cached_name)
@@ -0,0 +1,49 @@
+import os
+import tempfile
+from collections import namedtuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from createm4b.diskspacecheck import DiskSpaceCheck
+from createm4b.diskspaceerror import DiskSpaceError
+
+Usage = namedtuple("Usage", ["total", "used", "free"])
+
+
+class DiskSpaceCheckTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output_file = os.path.join(self.directory.name, "book.m4b")
+        self.work = os.path.join(self.directory.name, "work")
+        os.mkdir(self.work)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_estimate_audio_size_from_duration_and_bit_rate(self):
+        self.assertEqual(DiskSpaceCheck.estimate_audio_size(3600, 64000), 28800000)
+
+    def test_paths_on_the_same_filesystem_share_its_space(self):
+        check = DiskSpaceCheck()
+        check.add(self.output_file, 1000)
+        check.add(self.work, 500)
+
+        self.assertEqual(check.requirements, [(self.directory.name, 1650)])
+
+    def test_enough_space_passes(self):
+        check = DiskSpaceCheck()
+        check.add(self.output_file, 1000)
+
+        with patch("shutil.disk_usage", return_value=Usage(10000, 0, 10000)):
+            check.check()
+
+    def test_too_little_space_raises(self):
+        check = DiskSpaceCheck()
+        check.add(self.output_file, 1000)
+        check.add(self.work, 1000)
+
+        with patch("shutil.disk_usage", return_value=Usage(10000, 8000, 2000)):
+            with self.assertRaises(DiskSpaceError) as raised:
+                check.check()
+
+        self.assertIn("needs 2.1 KB, but only 2.0 KB is free", str(raised.exception))
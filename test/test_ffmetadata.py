@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from createm4b.ffmetadata import FfMetadata
+
+
+class FfMetadataTests(TestCase):
+    def test_formats_album_and_chapters(self):
+        metadata = FfMetadata("Book", None)
+        metadata.add_chapter(0, 3000, "One = 1; #1")
+        metadata.add_chapter(3001, 7001, None)
+
+        self.assertEqual(metadata.format(), ";FFMETADATA1\nalbum=Book\nalbum_artist=\n\n"
+                                            "[CHAPTER]\nTIMEBASE=1/1000\nSTART=0\nEND=3000\ntitle=One \\= 1\\; \\#1\n\n"
+                                            "[CHAPTER]\nTIMEBASE=1/1000\nSTART=3001\nEND=7001\ntitle=\n")
+
+    def test_parses_what_it_formats(self):
+        metadata = FfMetadata("Bøok", "Author\\Name")
+        metadata.add_chapter(0, 3000, "Line one\nline two")
+        metadata.add_chapter(3000, 5500, "Two")
+
+        result = FfMetadata.parse(metadata.format())
+
+        self.assertEqual(result.album, "Bøok")
+        self.assertEqual(result.artist, "Author\\Name")
+        self.assertEqual([(c.start, c.title) for c in result.chapters], [(0.0, "Line one\nline two"), (3.0, "Two")])
+
+    def test_converts_time_base_and_skips_comments_and_other_sections(self):
+        result = FfMetadata.parse(";FFMETADATA1\ntitle=Ignored\n# comment\n[STREAM]\ntitle=Stream\n"
+                                  "[CHAPTER]\nTIMEBASE=1/44100\nSTART=88200\nEND=132300\ntitle=Chapter\n")
+
+        self.assertIsNone(result.album)
+        self.assertEqual([(c.start, c.title) for c in result.chapters], [(2.0, "Chapter")])
+
+    def test_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            FfMetadata.parse("album=Book\n")
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from createm4b.fileaccess import FileAccess
+
+
+class FileAccessTests(TestCase):
+    def setUp(self):
+        (fd, self.file_name) = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\x42" * 10000)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def test_counts_opens_and_bytes_read(self):
+        access = FileAccess()
+        with access.open(self.file_name) as f:
+            self.assertEqual(f.read(4), b"\x42" * 4)
+            self.assertEqual(f.peek(1)[:1], b"\x42")
+            f.seek(0)
+            self.assertEqual(len(f.read()), 10000)
+            self.assertEqual(access.open_files, 1)
+
+        self.assertTrue(f.closed)
+        self.assertEqual(access.open_files, 0)
+        self.assertEqual(access.opens, 1)
+        self.assertGreaterEqual(access.bytes_read, 10000)
+
+    def test_nested_open_shares_the_handle(self):
+        access = FileAccess()
+        with access.open(self.file_name) as outer:
+            with access.open(self.file_name) as inner:
+                self.assertIs(inner, outer)
+            self.assertFalse(outer.closed)
+
+        self.assertTrue(outer.closed)
+        self.assertEqual(access.opens, 1)
+
+    def test_closes_when_the_block_raises(self):
+        access = FileAccess(1)
+        with self.assertRaises(ValueError):
+            with access.open(self.file_name) as f:
+                raise ValueError()
+
+        self.assertTrue(f.closed)
+        with access.open(self.file_name):
+            self.assertEqual(access.open_files, 1)
+
+    def test_failed_open_frees_its_slot(self):
+        access = FileAccess(1)
+        with self.assertRaises(OSError):
+            with access.open(self.file_name + ".missing"):
+                pass
+
+        with access.open(self.file_name):
+            self.assertEqual(access.opens, 1)
+
+    def test_waits_for_a_free_slot(self):
+        access = FileAccess(1)
+        opened = threading.Event()
+
+        def open_file():
+            with access.open(self.file_name):
+                opened.set()
+
+        with access.open(self.file_name):
+            thread = threading.Thread(target=open_file)
+            thread.start()
+            self.assertFalse(opened.wait(0.1))
+        thread.join(5)
+
+        self.assertTrue(opened.is_set())
+        self.assertEqual(access.opens, 2)
+
+    def test_mapped_file_counts_as_read(self):
+        access = FileAccess()
+        with access.open(self.file_name) as f:
+            before = access.bytes_read
+            data = access.map_file(f)
+            try:
+                self.assertEqual(data[:2], b"\x42\x42")
+            finally:
+                data.close()
+
+        self.assertEqual(access.bytes_read - before, 10000)
@@ -0,0 +1,46 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from benchmarks import fixtures
+from createm4b.flac import Flac
+from createm4b.flac.flacmetadata import FlacMetadata
+
+
+class FlacMetadataTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.directory.name, "test.flac")
+        with open(self.file_name, "wb") as f:
+            f.write(fixtures.flac_file(picture_size=100000, comment_count=8, padding=50000))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_picture_and_padding_are_skipped_but_can_be_read(self):
+        with open(self.file_name, "rb") as f:
+            blocks = list(FlacMetadata.read_all(f))
+            audio_start = f.tell()
+
+        (picture, padding) = blocks[2:]
+        self.assertEqual(audio_start, padding.offset + padding.block_size)
+        self.assertEqual(len(picture.raw_data), picture.block_size)
+        self.assertEqual(picture.raw_data[:4], b"\x06" + (picture.block_size - 4).to_bytes(3, "big"))
+        self.assertEqual(padding.raw_data[4:], b"\0" * 50000)
+
+    def test_skipped_block_can_be_read_while_file_is_open(self):
+        with open(self.file_name, "rb") as f:
+            blocks = list(FlacMetadata.read_all(f))
+            position = f.tell()
+            data = blocks[2].raw_data
+
+            self.assertEqual(f.tell(), position)
+        self.assertEqual(data[-4:], b"\x42" * 4)
+
+    def test_tags_are_indexed_case_insensitively(self):
+        comments = next(b for b in Flac.get_metadata(self.file_name) if b.block_type == "VorbisComment")
+
+        self.assertEqual(comments.tag("title"), "Chapter 1")
+        self.assertEqual(comments.tag("TrackNumber"), "1")
+        self.assertIsNone(comments.tag("missing"))
+        self.assertEqual(len(comments.tags), 8)
@@ -0,0 +1,126 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.flac import FlacValidator
+from createm4b.flac.flacframe import FlacFrame
+
+
+def crc8(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc << 1 ^ 0x07 if crc & 0x80 else crc << 1) & 0xff
+    return crc
+
+
+def coded_number(number: int) -> bytes:
+    if number < 0x80:
+        return bytes([number])
+    length = 2
+    while number >= 1 << (5 * length + 1):
+        length += 1
+    data = []
+    for _ in range(length - 1):
+        data.insert(0, 0x80 | number & 0x3f)
+        number >>= 6
+    return bytes([(0xff00 >> length) & 0xff | number]) + bytes(data)
+
+
+def build_frame(number: int, block_size: int=4096, variable: bool=False, payload: int=1000) -> bytes:
+    """Frame header for 16 bit stereo at 44.1kHz, followed by payload bytes of (fake) audio"""
+    if block_size == 4096:
+        (code, extra) = (12, b"")
+    else:
+        (code, extra) = (7, (block_size - 1).to_bytes(2, "big"))
+    header = bytes([0xff, 0xf9 if variable else 0xf8, code << 4 | 9, 1 << 4 | 4 << 1]) + coded_number(number) + extra
+    return header + bytes([crc8(header)]) + bytes([0x55]) * payload
+
+
+def build_flac(frames: bytes, total_samples: int=0, variable: bool=False) -> bytes:
+    minimum_block_size = 16 if variable else 4096
+    stream_info = minimum_block_size.to_bytes(2, "big") + (4096).to_bytes(2, "big") + b"\0" * 6 + \
+        (44100 << 44 | 1 << 41 | 15 << 36 | total_samples).to_bytes(8, "big") + b"\0" * 16
+    return b"fLaC" + b"\x80" + len(stream_info).to_bytes(3, "big") + stream_info + frames
+
+
+class FlacFrameTests(TestCase):
+    def test_decodes_header(self):
+        frame = FlacFrame(build_frame(300, 1000, variable=False), 0)
+
+        self.assertEqual((frame.number, frame.block_size, frame.sample_rate, frame.channels, frame.sample_size),
+                         (300, 1000, 44100, 2, 16))
+        self.assertEqual(frame.next_number, 301)
+        self.assertEqual(frame.end_sample(4096), 300 * 4096 + 1000)
+
+    def test_variable_block_size_numbers_samples(self):
+        frame = FlacFrame(build_frame(1 << 33, 4096, variable=True), 0)
+
+        self.assertEqual(frame.number, 1 << 33)
+        self.assertEqual(frame.next_number, (1 << 33) + 4096)
+        self.assertEqual(frame.end_sample(0), (1 << 33) + 4096)
+
+    def test_finds_only_headers_with_valid_crc(self):
+        data = build_frame(0) + b"\xff\xf8\x19\x28\x01\x00" + build_frame(1)
+
+        self.assertEqual([(f.offset, f.number) for f in FlacFrame.find_all(data)], [(0, 0), (1012, 1)])
+
+
+class FlacScannerTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __probe(self, data: bytes):
+        file_name = os.path.join(self.directory.name, "test.flac")
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return FlacValidator().probe_file(file_name)
+
+    def test_total_samples_from_stream_info(self):
+        result = self.__probe(build_flac(build_frame(0), total_samples=44100))
+
+        self.assertEqual((result.duration, result.duration_source), (1.0, "StreamInfo"))
+
+    def test_unknown_total_found_from_last_frame(self):
+        frames = b"".join(build_frame(i) for i in range(200)) + build_frame(200, 1000)
+
+        result = self.__probe(build_flac(frames))
+
+        self.assertAlmostEqual(result.duration, (200 * 4096 + 1000) / 44100)
+        self.assertEqual(result.duration_source, "last frame")
+
+    def test_header_lookalike_in_last_frame_is_ignored(self):
+        lookalike = build_frame(500)[:7]
+        frames = b"".join(build_frame(i) for i in range(10)) + build_frame(10, 1000) + lookalike + b"\0" * 100
+
+        result = self.__probe(build_flac(frames))
+
+        self.assertAlmostEqual(result.duration, (10 * 4096 + 1000) / 44100)
+
+    def test_variable_block_size(self):
+        frames = b""
+        sample = 0
+        for block_size in (4096, 1000, 4096, 16):
+            frames += build_frame(sample, block_size, variable=True)
+            sample += block_size
+
+        result = self.__probe(build_flac(frames, variable=True))
+
+        self.assertAlmostEqual(result.duration, sample / 44100)
+
+    def test_single_frame(self):
+        result = self.__probe(build_flac(build_frame(0, 1000)))
+
+        self.assertAlmostEqual(result.duration, 1000 / 44100)
+
+    def test_walks_frames_when_end_of_file_is_not_audio(self):
+        frames = b"".join(build_frame(i) for i in range(5)) + b"\0" * (5 * 1024 * 1024)
+
+        result = self.__probe(build_flac(frames))
+
+        self.assertAlmostEqual(result.duration, 5 * 4096 / 44100)
+        self.assertEqual(result.duration_source, "frame scan")
@@ -0,0 +1,79 @@
+import io
+from unittest import TestCase
+
+from createm4b.mp3.id3 import ID3v2
+
+
+def frame(version: int, frame_id: str, body: bytes, flags: bytes=b"\0\0") -> bytes:
+    if version == 2:
+        return frame_id.encode("latin-1") + len(body).to_bytes(3, "big") + body
+    size = len(body)
+    if version == 4:
+        size = (size & 0x7f) | (size & 0x3f80) << 1 | (size & 0x1fc000) << 2 | (size & 0xfe00000) << 3
+    return frame_id.encode("latin-1") + size.to_bytes(4, "big") + flags + body
+
+
+def tag(version: int, frames: bytes, flags: int=0) -> bytes:
+    size = len(frames)
+    syncsafe = (size & 0x7f) | (size & 0x3f80) << 1 | (size & 0x1fc000) << 2 | (size & 0xfe00000) << 3
+    return b"ID3" + bytes([version, 0, flags]) + syncsafe.to_bytes(4, "big") + frames
+
+
+class CountingReader(io.BytesIO):
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class ID3v2Tests(TestCase):
+    def test_reads_id3v23_text_frames(self):
+        data = tag(3, frame(3, "TIT2", b"\0Chapter 1\0") + frame(3, "TRCK", b"\0003/10")
+                   + frame(3, "TPE1", b"\x01\xff\xfeA\0u\0t\0h\0o\0r\0") + frame(3, "COMM", b"\0engdesc\0text"))
+
+        result = ID3v2(io.BytesIO(data))
+
+        self.assertTrue(result.is_valid_id3)
+        self.assertEqual(result.size, len(data) - 10)
+        self.assertEqual(result.title, "Chapter 1")
+        self.assertEqual(result.track, 3)
+        self.assertEqual(result.artist, "Author")
+        self.assertEqual(result.comments, {"desc": "text"})
+
+    def test_reads_id3v22_text_frames(self):
+        result = ID3v2(io.BytesIO(tag(2, frame(2, "TT2", b"\0Chapter 2") + frame(2, "TAL", b"\0Book"))))
+
+        self.assertEqual(result.title, "Chapter 2")
+        self.assertEqual(result.album, "Book")
+
+    def test_skips_large_frames_without_reading_them(self):
+        picture = frame(4, "APIC", b"\0image/jpeg\0\x03\0" + b"\xff\xd8" * 2 * 1024 * 1024)
+        file_handle = CountingReader(tag(4, picture + frame(4, "TIT2", b"\3Chapter 3") + b"\0" * 1024))
+
+        result = ID3v2(file_handle)
+
+        self.assertEqual(result.title, "Chapter 3")
+        self.assertLess(file_handle.bytes_read, 1024)
+
+    def test_reads_id3v24_unsynchronised_frame(self):
+        data = tag(4, frame(4, "TIT2", b"\0\xff\x00\xe9", b"\0\x02"))
+
+        result = ID3v2(io.BytesIO(data))
+
+        self.assertEqual(result.title, "\xff\xe9")
+
+    def test_reads_id3v23_unsynchronised_tag(self):
+        picture = frame(3, "APIC", b"\0image/jpeg\0\x03\0" + b"\xff\xe0" * 100000)
+        unsynchronised = (picture + frame(3, "TIT2", b"\0Chapter\xff\xe0")).replace(b"\xff", b"\xff\x00")
+
+        result = ID3v2(io.BytesIO(tag(3, unsynchronised, 0x80)))
+
+        self.assertEqual(result.title, "Chapter\xff\xe0")
+
+    def test_not_a_tag(self):
+        result = ID3v2(io.BytesIO(b"\xff\xfb\x90\x40" + b"\0" * 100))
+
+        self.assertFalse(result.is_valid_id3)
+        self.assertIsNone(result.title)
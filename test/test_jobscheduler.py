@@ -0,0 +1,96 @@
+import threading
+import time
+from unittest import TestCase
+
+from createm4b.jobscheduler import JobScheduler
+
+
+class JobSchedulerTests(TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.events = []
+
+    def __record(self, event: str):
+        with self.lock:
+            self.events.append(event)
+
+    def __execute(self, job, prepared):
+        with self.lock:
+            self.running += job[1]
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= job[1]
+        self.__record("run {0}".format(job[0]))
+        if prepared == "fail":
+            raise RuntimeError("encoding failed")
+
+    def test_results_are_in_order_and_failures_dont_stop_the_batch(self):
+        def prepare(job):
+            if job[0] == "b":
+                raise ValueError("can't probe")
+            return "fail" if job[0] == "c" else "ok"
+
+        finished = []
+        results = JobScheduler(2, 2).run([("a", 1), ("b", 1), ("c", 1), ("d", 1)], prepare, self.__execute,
+                                         on_result=finished.append)
+
+        self.assertEqual([r.job[0] for r in results], ["a", "b", "c", "d"])
+        self.assertEqual([r.succeeded for r in results], [True, False, False, True])
+        self.assertEqual(results[1].error, "can't probe")
+        self.assertEqual(results[2].error, "encoding failed")
+        self.assertEqual(sorted(r.job[0] for r in finished), ["a", "b", "c", "d"])
+
+    def test_running_jobs_stay_within_cpu_slots(self):
+        jobs = [(str(i), weight) for (i, weight) in enumerate([2, 1, 3, 1, 2, 2])]
+
+        scheduler = JobScheduler(3, 2)
+        results = scheduler.run(jobs, lambda job: None, self.__execute, weight=lambda job: job[1])
+
+        self.assertTrue(all(r.succeeded for r in results))
+        self.assertLessEqual(self.peak, 3)
+        self.assertGreater(self.peak, 1)
+        self.assertEqual(scheduler.cpus_in_use, 0)
+
+    def test_weight_is_capped_at_cpu_slots(self):
+        results = JobScheduler(2).run([("a", 8)], lambda job: None, self.__execute, weight=lambda job: job[1])
+
+        self.assertTrue(results[0].succeeded)
+
+    def test_preparation_overlaps_running(self):
+        def prepare(job):
+            self.__record("prepare {0}".format(job[0]))
+            return None
+
+        JobScheduler(1, 1).run([("a", 1), ("b", 1)], prepare, self.__execute)
+
+        self.assertLess(self.events.index("prepare b"), self.events.index("run a"))
+
+    def test_jobs_start_in_order(self):
+        def prepare(job):
+            # Later jobs are ready first
+            time.sleep(0.01 * (4 - int(job[0])))
+            return None
+
+        def execute(job, prepared):
+            self.__record(job[0])
+            time.sleep(0.01)
+
+        JobScheduler(2, 4).run([("0", 2), ("1", 1), ("2", 1), ("3", 2)], prepare, execute, weight=lambda job: job[1])
+
+        self.assertEqual(self.events, ["0", "1", "2", "3"])
+
+    def test_preparation_runs_a_bounded_number_of_jobs_ahead(self):
+        prepared = []
+
+        def execute(job, _):
+            if job[0] == "0":
+                time.sleep(0.1)
+                self.__record(len(prepared))
+
+        JobScheduler(1, 1).run([(str(i), 1) for i in range(8)], prepared.append, execute)
+
+        # The running job, and disk_slots + cpu_slots after it
+        self.assertEqual(self.events, [3])
@@ -0,0 +1,42 @@
+import contextlib
+import io
+import os
+import tempfile
+from unittest import TestCase, skipIf
+
+try:
+    from createm4b.__main__ import main
+except ImportError:  # pragma: no cover
+    # The conversion needs ffmpeg-python
+    main = None
+
+
+@skipIf(main is None, "needs ffmpeg-python")
+class MainTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, "book.m4b")
+        self.cache = os.path.join(self.directory.name, "cache")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __create_file(self, name: str, data: bytes) -> str:
+        file_name = os.path.join(self.directory.name, name)
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return file_name
+
+    def test_files_that_cant_be_probed_are_reported(self):
+        files = [self.__create_file("1.mp3", b"not audio"), self.__create_file("2.mp3", b"not audio either")]
+        stderr = io.StringIO()
+
+        with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit) as context:
+            main(["-q", "--no-overlap", "--probe-cache", os.path.join(self.cache, "probe.sqlite"),
+                  "--segment-cache", os.path.join(self.cache, "segments"), "-o", self.output] + files)
+
+        self.assertEqual(context.exception.code, 1)
+        self.assertIn("Error loading 2 file(s)", stderr.getvalue())
+        self.assertIn("{0}: Unsupported format: not an mp3 (Invalid Frame Sync)".format(files[0]), stderr.getvalue())
+        self.assertNotIn("Traceback", stderr.getvalue())
+        self.assertFalse(os.path.exists(self.output))
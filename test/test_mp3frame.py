@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from createm4b.mp3.mp3error import Mp3Error
+from createm4b.mp3.mp3frame import Mp3Frame
+
+
+class Mp3FrameTests(TestCase):
+    def test_decodes_mpeg1_layer3_header(self):
+        result = Mp3Frame(b"\xff\xfb\x92\x40")
+
+        self.assertEqual(result.frame_length, 418)
+        self.assertEqual(result.bitrate, 128)
+        self.assertEqual(result.sample_rate, 44100)
+        self.assertEqual(result.samples, 1152)
+        self.assertFalse(result.is_mono)
+
+    def test_decodes_mpeg2_layer3_header(self):
+        result = Mp3Frame(b"\xff\xf3\x88\xc0")
+
+        self.assertEqual(result.frame_length, 288)
+        self.assertEqual(result.bitrate, 64)
+        self.assertEqual(result.sample_rate, 16000)
+        self.assertEqual(result.samples, 576)
+        self.assertTrue(result.is_mono)
+
+    def test_frames_with_the_same_header_share_decoded_info(self):
+        first = Mp3Frame(b"\xff\xfb\x90\x40")
+        second = Mp3Frame(b"\xff\xfb\x90\xc0")
+
+        self.assertIs(first.info, second.info)
+
+    def test_invalid_header_raises_every_time(self):
+        for _ in range(2):
+            with self.assertRaises(Mp3Error):
+                Mp3Frame(b"\xff\xfb\xf0\x40")
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.fileaccess import FileAccess
+from createm4b.mp3.mp3error import Mp3Error
+from createm4b.mp3.mp3scanner import Mp3Scanner
+
+# MPEG-1 Layer III, 44100Hz: 128kbps is 417 bytes per frame (418 with padding), 64kbps is 208
+FRAMES = [b"\xff\xfb\x90\x40" + b"\0" * 413,
+          b"\xff\xfb\x92\x40" + b"\xff" * 414,
+          b"\xff\xfb\x50\x40" + b"\0" * 204]
+
+
+class Mp3ScannerTests(TestCase):
+    def setUp(self):
+        (fd, self.file_name) = tempfile.mkstemp(suffix=".mp3")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def __scan(self, data: bytes, start: int=0) -> Mp3Scanner:
+        with open(self.file_name, "wb") as f:
+            f.write(data)
+        with open(self.file_name, "rb") as f:
+            return Mp3Scanner(f, start)
+
+    def test_counts_frames_of_mixed_lengths(self):
+        result = self.__scan(b"".join(FRAMES) * 50)
+
+        self.assertEqual(result.frame_count, 150)
+        self.assertAlmostEqual(result.duration, 150 * 1152 / 44100)
+
+    def test_starts_at_offset_and_stops_at_id3v1_tag(self):
+        result = self.__scan(b"ID3" + b"\0" * 7 + b"".join(FRAMES) * 3 + b"TAG" + b"\0" * 125, 10)
+
+        self.assertEqual(result.frame_count, 9)
+
+    def test_invalid_frame_raises(self):
+        with self.assertRaises(Mp3Error):
+            self.__scan(b"".join(FRAMES) + b"garbage!")
+
+    def test_scan_counts_the_mapped_bytes(self):
+        before = FileAccess.default().bytes_read
+
+        self.__scan(b"".join(FRAMES) * 10)
+
+        self.assertEqual(FileAccess.default().bytes_read - before, (417 + 418 + 208) * 10)
+
+    def test_empty_file_has_no_frames(self):
+        result = self.__scan(b"")
+
+        self.assertEqual(result.frame_count, 0)
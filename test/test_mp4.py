@@ -0,0 +1,141 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.audiosourcefactory import AudioSourceFactory
+from createm4b.flac import FlacValidator
+from createm4b.mp3 import Mp3Validator
+from createm4b.mp4 import Mp4, Mp4Error, Mp4Track, Mp4Validator
+from test.test_mp4atom import build_atom, build_mdhd
+
+
+def build_descriptor(tag: int, body: bytes) -> bytes:
+    return bytes([tag, 0x80, 0x80, 0x80, len(body)]) + body
+
+
+def build_esds(audio_object_type: int, object_type: int=0x40) -> bytes:
+    audio_specific_config = bytes([audio_object_type << 3 | 4 >> 1, (4 & 1) << 7 | 1 << 3])
+    decoder_config = build_descriptor(0x04, bytes([object_type, 0x15]) + b"\0" * 11 +
+                                      build_descriptor(0x05, audio_specific_config))
+    return build_atom(b"esds", b"\0\0\0\0" + build_descriptor(0x03, b"\0\x01\0" + decoder_config))
+
+
+def build_stsd(channels: int, sample_rate: int, audio_object_type: int=2, object_type: int=0x40) -> bytes:
+    entry = b"\0" * 6 + b"\0\x01" + b"\0" * 8 + channels.to_bytes(2, "big") + b"\0\x10" + b"\0" * 4 + \
+        (sample_rate << 16).to_bytes(4, "big") + build_esds(audio_object_type, object_type)
+    return build_atom(b"stsd", b"\0\0\0\0\0\0\0\x01" + build_atom(b"mp4a", entry))
+
+
+def build_track(handler: bytes, mdhd: bytes, stsd: bytes=b"", edit_duration: int=0) -> bytes:
+    body = build_atom(b"tkhd", b"\0" * 84)
+    if edit_duration:
+        body += build_atom(b"edts", build_atom(b"elst", b"\0\0\0\0\0\0\0\x01" + edit_duration.to_bytes(4, "big") +
+                                              (1024).to_bytes(4, "big") + b"\0\x01\0\0"))
+    hdlr = build_atom(b"hdlr", b"\0" * 8 + handler + b"\0" * 13)
+    return build_atom(b"trak", body + build_atom(b"mdia", mdhd + hdlr +
+                                                 build_atom(b"minf", build_atom(b"stbl", stsd))))
+
+
+def build_tag(atom_type: bytes, value: bytes, data_type: int=1) -> bytes:
+    return build_atom(atom_type, build_atom(b"data", data_type.to_bytes(4, "big") + b"\0\0\0\0" + value))
+
+
+def build_m4a(tracks: bytes, tags: bytes=b"") -> bytes:
+    mvhd = build_atom(b"mvhd", b"\0" * 12 + (1000).to_bytes(4, "big") + b"\0" * 84)
+    udta = build_atom(b"udta", build_atom(b"meta", b"\0\0\0\0" + build_atom(b"ilst", tags))) if tags else b""
+    return build_atom(b"ftyp", b"M4A \0\0\0\0") + build_atom(b"mdat", b"\0" * 100) + \
+        build_atom(b"moov", mvhd + tracks + udta)
+
+
+AUDIO_TRACK = build_track(b"soun", build_mdhd(44100, 133324), build_stsd(2, 44100), edit_duration=3000)
+
+
+class Mp4Tests(TestCase):
+    def setUp(self):
+        (fd, self.file_name) = tempfile.mkstemp(suffix=".m4a")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def __write(self, data: bytes):
+        with open(self.file_name, "wb") as f:
+            f.write(data)
+
+    def test_reads_tags_and_audio_track(self):
+        tags = build_tag("©nam".encode("latin-1"), "Chapter Ünø".encode("utf8")) + \
+            build_tag("©ART".encode("latin-1"), b"Author") + build_tag("©alb".encode("latin-1"), b"Book") + \
+            build_tag(b"trkn", b"\0\0\0\x03\0\x0a\0\0", 0)
+        self.__write(build_m4a(AUDIO_TRACK, tags))
+
+        result = Mp4Validator().probe_file(self.file_name)
+
+        self.assertEqual(result.format, "mp4")
+        self.assertEqual(result.title, "Chapter Ünø")
+        self.assertEqual(result.artist, "Author")
+        self.assertEqual(result.album, "Book")
+        self.assertEqual(result.track, 3)
+        self.assertEqual(result.sample_rate, 44100)
+        self.assertEqual(result.channels, 2)
+        self.assertEqual(result.codec, "aac")
+
+    def test_duration_comes_from_edit_list(self):
+        self.__write(build_m4a(AUDIO_TRACK))
+
+        result = Mp4Validator().probe_file(self.file_name)
+
+        self.assertAlmostEqual(result.duration, 3.0)
+        self.assertEqual(result.duration_source, "elst")
+
+    def test_media_duration_includes_priming(self):
+        self.__write(build_m4a(AUDIO_TRACK))
+
+        result = Mp4Track.read_sound_track(self.file_name)
+
+        self.assertAlmostEqual(result.media_duration, 133324 / 44100)
+
+    def test_duration_comes_from_media_header_without_edit_list(self):
+        self.__write(build_m4a(build_track(b"soun", build_mdhd(1000, 5 << 32, version=1), build_stsd(1, 22050))))
+
+        result = Mp4Validator().probe_file(self.file_name)
+
+        self.assertAlmostEqual(result.duration, (5 << 32) / 1000)
+        self.assertEqual(result.duration_source, "mdhd")
+        self.assertEqual(result.sample_rate, 22050)
+
+    def test_skips_tracks_that_are_not_audio(self):
+        chapters = build_track(b"text", build_mdhd(1000, 3000))
+        self.__write(build_m4a(chapters + build_track(b"soun", build_mdhd(44100, 44100), build_stsd(1, 44100, 5))))
+
+        result = Mp4Validator().probe_file(self.file_name)
+
+        self.assertEqual(result.channels, 1)
+        self.assertEqual(result.codec, "aac-he")
+
+    def test_reads_mp3_in_mp4(self):
+        self.__write(build_m4a(build_track(b"soun", build_mdhd(44100, 44100), build_stsd(1, 44100, object_type=0x6b))))
+
+        result = Mp4Validator().probe_file(self.file_name)
+
+        self.assertEqual(result.codec, "mp3")
+
+    def test_file_without_audio_track_is_not_valid(self):
+        self.__write(build_m4a(build_track(b"text", build_mdhd(1000, 3000))))
+
+        self.assertFalse(Mp4Validator().is_valid(self.file_name))
+        with self.assertRaises(Mp4Error):
+            Mp4Track.read_sound_track(self.file_name)
+
+    def test_other_files_are_not_valid(self):
+        self.__write(b"ID3\x03\0\0\0\0\0\0" + b"\0" * 100)
+
+        self.assertFalse(Mp4Validator().is_valid(self.file_name))
+
+    def test_factory_creates_mp4_instance(self):
+        self.__write(build_m4a(AUDIO_TRACK))
+        factory = AudioSourceFactory(Mp3Validator(), FlacValidator(), mp4_validator=Mp4Validator())
+
+        result = factory.get_audio_source(self.file_name)
+
+        self.assertIsInstance(result, Mp4)
+        self.assertEqual(result.codec, "aac")
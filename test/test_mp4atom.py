@@ -0,0 +1,52 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.mp4 import Mp4Atom
+
+
+def build_atom(atom_type: bytes, body: bytes) -> bytes:
+    return (len(body) + 8).to_bytes(4, "big") + atom_type + body
+
+
+def build_mdhd(timescale: int, duration: int, version: int=0) -> bytes:
+    if version == 1:
+        body = b"\x01\0\0\0" + b"\0" * 16 + timescale.to_bytes(4, "big") + duration.to_bytes(8, "big")
+    else:
+        body = b"\0\0\0\0" + b"\0" * 8 + timescale.to_bytes(4, "big") + duration.to_bytes(4, "big")
+    return build_atom(b"mdhd", body + b"\0" * 4)
+
+
+def build_mp4(mdhd: bytes) -> bytes:
+    moov = build_atom(b"moov", build_atom(b"mvhd", b"\0" * 100) +
+                      build_atom(b"trak", build_atom(b"tkhd", b"\0" * 84) + build_atom(b"mdia", mdhd)))
+    return build_atom(b"ftyp", b"M4A \0\0\0\0") + build_atom(b"mdat", b"\0" * 1000) + moov
+
+
+class Mp4AtomTests(TestCase):
+    def setUp(self):
+        (fd, self.file_name) = tempfile.mkstemp(suffix=".m4a")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def __write(self, data: bytes):
+        with open(self.file_name, "wb") as f:
+            f.write(data)
+
+    def test_walks_top_level_atoms(self):
+        self.__write(build_mp4(build_mdhd(44100, 44100)))
+
+        with open(self.file_name, "rb") as f:
+            result = [atom.atom_type for atom in Mp4Atom.read_atoms(f, 0, os.fstat(f.fileno()).st_size)]
+
+        self.assertEqual(result, ["ftyp", "mdat", "moov"])
+
+    def test_reads_atom_with_large_size(self):
+        self.__write((1).to_bytes(4, "big") + b"free" + (24).to_bytes(8, "big") + b"\0" * 8 + build_atom(b"moov", b""))
+
+        with open(self.file_name, "rb") as f:
+            result = Mp4Atom.find(f, "moov")
+
+        self.assertEqual(result.offset, 24)
@@ -0,0 +1,62 @@
+import struct
+from typing import List, Tuple
+from unittest import TestCase
+
+from createm4b.mp4 import Mp4Atom, Mp4Error, Mp4SampleTable
+from test.test_mp4 import build_stsd
+from test.test_mp4atom import build_atom
+
+
+def build_table(atom_type: bytes, entries: List[Tuple[int, ...]]) -> bytes:
+    return build_atom(atom_type, b"\0\0\0\0" + len(entries).to_bytes(4, "big") +
+                      b"".join(struct.pack(">{0}I".format(len(entry)), *entry) for entry in entries))
+
+
+def build_stbl(sizes: List[int], offsets: List[int], samples_per_chunk: int, delta: int=1024,
+               channels: int=1) -> bytes:
+    """Body of an audio track's stbl, with every sample lasting delta and every chunk holding samples_per_chunk"""
+    stsz = build_atom(b"stsz", b"\0" * 8 + struct.pack(">I{0}I".format(len(sizes)), len(sizes), *sizes))
+    return build_stsd(channels, 44100) + build_table(b"stts", [(len(sizes), delta)]) + \
+        build_table(b"stsc", [(1, samples_per_chunk, 1)]) + stsz + build_table(b"stco", [(o,) for o in offsets])
+
+
+class Mp4SampleTableTests(TestCase):
+    def test_reads_samples_and_chunks(self):
+        table = Mp4SampleTable(build_stbl([10, 20, 30, 40], [100, 200], 2))
+
+        self.assertEqual(table.sample_count, 4)
+        self.assertEqual(table.duration, 4096)
+        self.assertEqual(table.data_range, (100, 270))
+
+    def test_rebuilds_unchanged_table(self):
+        stbl = build_stbl([10, 20, 30, 40], [100, 200], 2)
+
+        self.assertEqual(Mp4SampleTable(stbl).build(), stbl)
+
+    def test_appends_samples_and_moves_their_chunks(self):
+        table = Mp4SampleTable(build_stbl([10, 20, 30, 40], [100, 200], 2))
+        table.append(Mp4SampleTable(build_stbl([5, 6, 7], [50], 3, delta=512)), 1000)
+
+        atoms = dict(Mp4Atom.split_atoms(table.build()))
+        self.assertEqual(atoms[b"stts"][4:], struct.pack(">IIIII", 2, 4, 1024, 3, 512))
+        self.assertEqual(atoms[b"stsc"][4:], struct.pack(">IIIIIII", 2, 1, 2, 1, 3, 3, 1))
+        self.assertEqual(atoms[b"stsz"][4:], struct.pack(">IIIIIIIII", 0, 7, 10, 20, 30, 40, 5, 6, 7))
+        self.assertEqual(atoms[b"stco"][4:], struct.pack(">IIII", 3, 100, 200, 1050))
+        self.assertEqual(table.duration, 4096 + 1536)
+
+    def test_switches_to_64_bit_chunk_offsets(self):
+        table = Mp4SampleTable(build_stbl([10, 10], [100], 2))
+        table.append(Mp4SampleTable(build_stbl([10], [100], 1)), 1 << 32)
+
+        atoms = dict(Mp4Atom.split_atoms(table.build()))
+        self.assertNotIn(b"stco", atoms)
+        self.assertEqual(atoms[b"co64"][4:], struct.pack(">IQQ", 2, 100, 100 + (1 << 32)))
+        self.assertEqual(atoms[b"stsz"][4:], struct.pack(">II", 10, 3))
+
+    def test_rejects_composition_offsets(self):
+        with self.assertRaises(Mp4Error):
+            Mp4SampleTable(build_stbl([10], [100], 1) + build_table(b"ctts", [(1, 0)]))
+
+    def test_rejects_chunks_not_matching_samples(self):
+        with self.assertRaises(Mp4Error):
+            Mp4SampleTable(build_stbl([10, 20, 30], [100, 200], 2))
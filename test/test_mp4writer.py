@@ -0,0 +1,221 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from createm4b.mp4 import Mp4Atom, Mp4Chapter, Mp4Error, Mp4Track, Mp4Validator, Mp4Writer
+from test.test_mp4 import AUDIO_TRACK, build_tag, build_track
+from test.test_mp4atom import build_atom, build_mdhd
+from test.test_mp4sampletable import build_stbl
+
+AUDIO = b"\x5a" * 1000
+MVHD = build_atom(b"mvhd", b"\0" * 12 + (1000).to_bytes(4, "big") + (3000).to_bytes(4, "big") + b"\0" * 80)
+
+
+def build_moov(tags: bytes=b"") -> bytes:
+    udta = build_atom(b"udta", build_atom(b"meta", b"\0\0\0\0" + build_atom(b"ilst", tags))) if tags else b""
+    return build_atom(b"moov", MVHD + AUDIO_TRACK + udta)
+
+
+FTYP = build_atom(b"ftyp", b"M4A \0\0\0\0")
+
+
+def build_m4a(audio: bytes, sample_count: int, channels: int=1) -> bytes:
+    """An m4a whose audio is sample_count equal samples in one chunk, with 1024 samples of encoder delay edited out"""
+    size = len(audio) // sample_count
+    stbl = build_stbl([size] * sample_count, [len(FTYP) + 8], sample_count, channels=channels)
+    track = build_track(b"soun", build_mdhd(44100, 1024 * sample_count), stbl,
+                        edit_duration=1024 * (sample_count - 1) * 1000 // 44100)
+    return FTYP + build_atom(b"mdat", audio) + build_atom(b"moov", MVHD + track)
+
+
+class Mp4WriterTests(TestCase):
+    def setUp(self):
+        (fd, self.file_name) = tempfile.mkstemp(suffix=".m4a")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def __write(self, data: bytes):
+        with open(self.file_name, "wb") as f:
+            f.write(data)
+
+    def __read(self) -> bytes:
+        with open(self.file_name, "rb") as f:
+            return f.read()
+
+    def __top_level(self):
+        with open(self.file_name, "rb") as f:
+            return [(atom.atom_type, atom.offset, atom.size) for atom in
+                    Mp4Atom.read_atoms(f, 0, os.path.getsize(self.file_name))]
+
+    def test_sets_tags_and_keeps_the_others(self):
+        self.__write(FTYP + build_atom(b"mdat", AUDIO) + build_moov(build_tag("©nam".encode("latin-1"), b"Title") +
+                                                                    build_tag("©alb".encode("latin-1"), b"Old")))
+        writer = Mp4Writer(self.file_name)
+        writer.set_tag("©alb", "Bøok")
+        writer.set_tag("aART", "Author")
+
+        writer.write()
+
+        result = Mp4Validator().probe_file(self.file_name)
+        self.assertEqual(result.title, "Title")
+        self.assertEqual(result.album, "Bøok")
+        self.assertEqual(result.artist, "Author")
+        self.assertAlmostEqual(result.duration, 3.0)
+
+    def test_writes_chapter_track_and_list(self):
+        self.__write(FTYP + build_atom(b"mdat", AUDIO) + build_moov())
+        writer = Mp4Writer(self.file_name)
+        writer.set_chapters([Mp4Chapter(0.0, "One"), Mp4Chapter(1.25, "Twø")])
+
+        writer.write()
+
+        with open(self.file_name, "rb") as f:
+            moov = Mp4Atom.find(f, "moov")
+            tracks = list(Mp4Track.read_tracks(f, moov))
+            self.assertEqual([t.handler_type for t in tracks], ["soun", "text"])
+            self.assertAlmostEqual(tracks[1].duration, 3.0)
+            self.assertEqual(Mp4Atom.find(f, "moov", "trak", "tref", "chap").read_body(f), b"\0\0\0\x01")
+
+            chpl = Mp4Atom.find(f, "moov", "udta", "chpl").read_body(f)
+            self.assertEqual(chpl[8], 2)
+            self.assertEqual(chpl[9:21], (0).to_bytes(8, "big") + b"\x03One")
+            self.assertEqual(int.from_bytes(chpl[21:29], "big"), 12500000)
+
+            chapter_track = [atom for atom in moov.children(f) if atom.atom_type == "trak"][1]
+            stco = Mp4Atom.find(f, "mdia", "minf", "stbl", "stco", start=chapter_track.body_offset,
+                                end=chapter_track.end)
+            offset = int.from_bytes(stco.read_body(f)[8:12], "big")
+
+        data = self.__read()
+        self.assertEqual(data[offset:offset + 17], b"\0\x03One\0\0\0\x0cencd\0\0\x01\0")
+        self.assertEqual(data[offset + 17:offset + 23], b"\0\x04" + "Twø".encode("utf8"))
+
+    def test_replaces_chapter_track(self):
+        self.__write(FTYP + build_atom(b"mdat", AUDIO) + build_moov())
+        for titles in (["One", "Two"], ["Three"]):
+            writer = Mp4Writer(self.file_name)
+            writer.set_chapters([Mp4Chapter(i, title) for (i, title) in enumerate(titles)])
+            writer.write()
+
+        with open(self.file_name, "rb") as f:
+            moov = Mp4Atom.find(f, "moov")
+            self.assertEqual([t.handler_type for t in Mp4Track.read_tracks(f, moov)], ["soun", "text"])
+            self.assertEqual(Mp4Atom.find(f, "moov", "udta", "chpl").read_body(f)[8], 1)
+
+    def test_moov_at_end_is_rewritten_without_touching_audio(self):
+        self.__write(FTYP + build_atom(b"mdat", AUDIO) + build_moov())
+        before = self.__read()
+        writer = Mp4Writer(self.file_name)
+        writer.set_tag("©alb", "Book")
+
+        writer.write()
+
+        after = self.__read()
+        self.assertEqual(after[:len(FTYP) + 1008], before[:len(FTYP) + 1008])
+        self.assertEqual([t for (t, _, _) in self.__top_level()], ["ftyp", "mdat", "free", "moov"])
+
+    def test_rewriting_the_moov_at_end_reuses_the_space_before_it(self):
+        self.__write(FTYP + build_atom(b"mdat", AUDIO) + build_moov())
+        sizes = []
+        for i in range(6):
+            writer = Mp4Writer(self.file_name)
+            writer.set_tag("©alb", "Book {0}".format(i))
+            writer.write()
+            sizes.append(os.path.getsize(self.file_name))
+
+        self.assertEqual(max(sizes), sizes[1])
+        self.assertLess(min(sizes), sizes[0])
+        self.assertEqual(Mp4Validator().probe_file(self.file_name).album, "Book 5")
+
+    def test_moov_grows_into_free_space(self):
+        self.__write(FTYP + build_moov() + build_atom(b"free", b"\0" * 1000) + build_atom(b"mdat", AUDIO))
+        size = os.path.getsize(self.file_name)
+        writer = Mp4Writer(self.file_name)
+        writer.set_tag("©alb", "Book")
+
+        writer.write()
+
+        atoms = self.__top_level()
+        self.assertEqual(os.path.getsize(self.file_name), size)
+        self.assertEqual([t for (t, _, _) in atoms], ["ftyp", "free", "moov", "free", "mdat"])
+        self.assertEqual(atoms[4][1], size - 1008)
+        self.assertEqual(Mp4Validator().probe_file(self.file_name).album, "Book")
+
+    def test_old_moov_survives_a_failed_write(self):
+        for free in (1000, 0):
+            with self.subTest(free=free):
+                self.__write(FTYP + build_moov(build_tag("©alb".encode("latin-1"), b"Old")) +
+                             (build_atom(b"free", b"\0" * free) if free else b"") + build_atom(b"mdat", AUDIO))
+                writer = Mp4Writer(self.file_name)
+                writer.set_tag("©alb", "New")
+
+                with patch("createm4b.mp4.mp4writer.os.fsync", side_effect=OSError("I/O error")):
+                    with self.assertRaises(OSError):
+                        writer.write()
+
+                self.assertEqual(Mp4Validator().probe_file(self.file_name).album, "Old")
+
+    def test_moov_moves_to_end_when_it_does_not_fit(self):
+        self.__write(FTYP + build_moov() + build_atom(b"mdat", AUDIO))
+        size = os.path.getsize(self.file_name)
+        writer = Mp4Writer(self.file_name)
+        writer.set_tag("©alb", "Book")
+
+        writer.write()
+
+        atoms = self.__top_level()
+        self.assertEqual([t for (t, _, _) in atoms], ["ftyp", "free", "mdat", "moov"])
+        self.assertEqual(atoms[2][1], size - 1008)
+        self.assertEqual(self.__read()[atoms[2][1] + 8:atoms[2][1] + 1008], AUDIO)
+        self.assertEqual(Mp4Validator().probe_file(self.file_name).album, "Book")
+
+    def test_appends_audio_after_the_moov(self):
+        self.__write(build_m4a(AUDIO, 4))
+        size = os.path.getsize(self.file_name)
+        (fd, appended) = tempfile.mkstemp(suffix=".m4a")
+        with os.fdopen(fd, "wb") as f:
+            f.write(build_m4a(b"\x33" * 200, 2))
+        try:
+            writer = Mp4Writer(self.file_name)
+            writer.append_audio(appended)
+            writer.set_chapters([Mp4Chapter(0.0, "One"), Mp4Chapter(0.069, "Two")])
+            writer.write()
+        finally:
+            os.remove(appended)
+
+        atoms = self.__top_level()
+        self.assertEqual([t for (t, _, _) in atoms], ["ftyp", "mdat", "free", "mdat", "mdat", "moov"])
+        self.assertEqual(atoms[3][1:], (size, 208))
+        self.assertEqual(self.__read()[:len(FTYP) + 1008], build_m4a(AUDIO, 4)[:len(FTYP) + 1008])
+        with open(self.file_name, "rb") as f:
+            moov = Mp4Atom.find(f, "moov")
+            track = Mp4Track.find_sound_track(f, moov)
+            self.assertAlmostEqual(track.media_duration, 6144 / 44100)
+            self.assertAlmostEqual(track.duration, 0.116)
+            stco = Mp4Atom.find(f, "moov", "trak", "mdia", "minf", "stbl", "stco").read_body(f)
+            self.assertEqual(stco[4:], b"\0\0\0\x02" + (len(FTYP) + 8).to_bytes(4, "big") +
+                             (size + 8).to_bytes(4, "big"))
+            self.assertEqual([c.title for c in Mp4Chapter.read_chapters(f, moov)], ["One", "Two"])
+
+    def test_appended_audio_must_match(self):
+        self.__write(build_m4a(AUDIO, 4))
+        (fd, appended) = tempfile.mkstemp(suffix=".m4a")
+        with os.fdopen(fd, "wb") as f:
+            f.write(build_m4a(b"\x33" * 200, 2, channels=2))
+        try:
+            writer = Mp4Writer(self.file_name)
+            writer.append_audio(appended)
+            with self.assertRaises(Mp4Error):
+                writer.write()
+        finally:
+            os.remove(appended)
+
+    def test_cover_must_be_jpeg_or_png(self):
+        writer = Mp4Writer(self.file_name)
+        writer.set_cover(b"\x89PNG\r\n\x1a\n")
+
+        with self.assertRaises(Mp4Error):
+            writer.set_cover(b"GIF89a")
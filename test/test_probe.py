@@ -0,0 +1,97 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.audiosourcefactory import AudioSourceFactory
+from createm4b.fileaccess import FileAccess
+from createm4b.flac import Flac, FlacValidator
+from createm4b.mp3 import Mp3, Mp3Validator
+from createm4b.probeerror import ProbeError
+from test.test_vbrheader import build_xing_frame, build_audio_frame, FRAME_LENGTH
+
+
+def build_flac(total_samples: int, comments: list) -> bytes:
+    stream_info = b"\x10\0\x10\0" + b"\0" * 6 + (44100 << 44 | 1 << 41 | 15 << 36 | total_samples).to_bytes(8, "big") \
+        + b"\0" * 16
+    vorbis = b"\0\0\0\0" + len(comments).to_bytes(4, "little")
+    for comment in comments:
+        vorbis += len(comment).to_bytes(4, "little") + comment.encode("utf8")
+    return b"fLaC" + b"\0" + len(stream_info).to_bytes(3, "big") + stream_info \
+        + b"\x84" + len(vorbis).to_bytes(3, "big") + vorbis
+
+
+class ProbeTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.factory = AudioSourceFactory(Mp3Validator(), FlacValidator())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __create_file(self, name: str, data: bytes) -> str:
+        file_name = os.path.join(self.directory.name, name)
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return file_name
+
+    def test_mp3_is_probed_with_a_single_open(self):
+        id3 = b"ID3\x03\0\0\0\0\0\x15" + b"TIT2\0\0\0\x0b\0\0\0Chapter 1\0"
+        file_name = self.__create_file("1.mp3", id3 + build_xing_frame(b"Xing", 10, 11 * FRAME_LENGTH)
+                                       + build_audio_frame() * 10)
+
+        opens = FileAccess.default().opens
+        result = self.factory.get_audio_source(file_name)
+        duration = result.duration
+
+        self.assertIsInstance(result, Mp3)
+        self.assertEqual(FileAccess.default().opens - opens, 1)
+        self.assertEqual(FileAccess.default().open_files, 0)
+        self.assertAlmostEqual(duration, 10 * 1152 / 44100)
+        self.assertEqual(result.title, "Chapter 1")
+        self.assertEqual(result.probe_result.sample_rate, 44100)
+
+    def test_flac_is_probed_with_a_single_open(self):
+        file_name = self.__create_file("1.flac", build_flac(441000, ["TITLE=Chapter 2", "TRACKNUMBER=2"]))
+
+        opens = FileAccess.default().opens
+        result = self.factory.get_audio_source(file_name)
+        title = result.title
+
+        self.assertIsInstance(result, Flac)
+        self.assertEqual(FileAccess.default().opens - opens, 1)
+        self.assertEqual(FileAccess.default().open_files, 0)
+        self.assertEqual(title, "Chapter 2")
+        self.assertEqual(result.track, 2)
+        self.assertAlmostEqual(result.duration, 10.0)
+        self.assertEqual(result.probe_result.channels, 2)
+
+    def test_parallel_probing_keeps_input_order(self):
+        files = [self.__create_file("{0}.flac".format(i), build_flac(44100 * (i + 1), ["TITLE={0}".format(i)]))
+                 for i in range(6)]
+
+        for use_processes in (False, True):
+            result = self.factory.get_audio_sources(files, 3, use_processes)
+
+            self.assertEqual([s.title for s in result], [str(i) for i in range(6)])
+            self.assertEqual([s.duration for s in result], [float(i + 1) for i in range(6)])
+
+    def test_parallel_probing_reports_every_failure(self):
+        files = [self.__create_file("good.flac", build_flac(44100, [])),
+                 self.__create_file("bad1.mp3", b"not audio"),
+                 self.__create_file("bad2.mp3", b"not audio either")]
+
+        with self.assertRaises(ProbeError) as context:
+            self.factory.get_audio_sources(files, 3)
+
+        self.assertEqual(sorted(context.exception.errors), sorted(files[1:]))
+
+    def test_failures_say_why_each_prober_rejected_the_file(self):
+        file_name = self.__create_file("bad.mp3", b"fLaC" + b"\0" * 4)
+
+        with self.assertRaises(ProbeError) as context:
+            self.factory.get_audio_sources([file_name])
+
+        message = str(context.exception.errors[file_name])
+        self.assertIn("not an mp3 (Invalid Frame Sync)", message)
+        self.assertIn("not a flac (file is too short)", message)
+        self.assertIn(file_name, str(context.exception))
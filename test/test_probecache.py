@@ -0,0 +1,85 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.audiosourcefactory import AudioSourceFactory
+from createm4b.probecache import ProbeCache
+from createm4b.proberesult import ProbeResult
+from test.test_audiosourcefactory import FalseValidator
+
+
+class ProbeCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ProbeCache(os.path.join(self.directory.name, "probe.sqlite"))
+        self.file_name = self.__create_file("1.mp3")
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def __create_file(self, name: str) -> str:
+        file_name = os.path.join(self.directory.name, name)
+        with open(file_name, "wb") as f:
+            f.write(b"\0" * 16)
+        return file_name
+
+    @staticmethod
+    def __probe_result(file_name: str) -> ProbeResult:
+        return ProbeResult(file_name, "mp3", "Chapter 1", "Author", "Book", 1, 44100, 2, 12.5, "Xing", "mp3")
+
+    def test_stored_result_is_returned_from_cache(self):
+        self.cache.store(self.__probe_result(self.file_name))
+
+        result = self.cache.get(self.file_name)
+
+        self.assertEqual(result.format, "mp3")
+        self.assertEqual(result.title, "Chapter 1")
+        self.assertEqual(result.track, 1)
+        self.assertEqual(result.duration, 12.5)
+        self.assertEqual(result.duration_source, "cache")
+        self.assertEqual(result.codec, "mp3")
+
+    def test_modified_file_is_not_returned(self):
+        self.cache.store(self.__probe_result(self.file_name))
+        with open(self.file_name, "ab") as f:
+            f.write(b"\0")
+
+        result = self.cache.get(self.file_name)
+
+        self.assertIsNone(result)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ProbeCache(os.path.join(self.directory.name, "small.sqlite"), max_size=64 * 1024)
+        files = [self.__create_file("{0}.mp3".format(i) + "x" * 200) for i in range(1000)]
+        try:
+            cache.store(self.__probe_result(files[0]))
+            for file_name in files[1:]:
+                cache.store(self.__probe_result(file_name))
+                # Keep the first file in use, so it's never the least recently used
+                self.assertIsNotNone(cache.get(files[0]))
+
+            self.assertLessEqual(cache.size, cache.max_size)
+            self.assertIsNone(cache.get(files[1]))
+            self.assertIsNotNone(cache.get(files[-1]))
+        finally:
+            cache.close()
+
+    def test_newest_entry_is_kept_even_if_it_does_not_fit(self):
+        cache = ProbeCache(os.path.join(self.directory.name, "tiny.sqlite"), max_size=0)
+        try:
+            cache.store(self.__probe_result(self.file_name))
+            cache.store(self.__probe_result(self.__create_file("2.mp3")))
+
+            self.assertIsNone(cache.get(self.file_name))
+            self.assertIsNotNone(cache.get(os.path.join(self.directory.name, "2.mp3")))
+        finally:
+            cache.close()
+
+    def test_factory_uses_cache_before_validating(self):
+        self.cache.store(self.__probe_result(self.file_name))
+        factory = AudioSourceFactory(FalseValidator(), FalseValidator(), self.cache)
+
+        result = factory.get_audio_source(self.file_name)
+
+        self.assertEqual(result.album, "Book")
@@ -0,0 +1,69 @@
+import io
+import json
+from unittest import TestCase
+
+from createm4b.ffmpegprocess import FfmpegProcess
+from createm4b.progressreporter import ProgressReporter
+
+
+class FfmpegProcessTests(TestCase):
+    def test_position_comes_from_out_time_us(self):
+        result = FfmpegProcess.parse_position({"out_time_us": "12500000", "out_time": "00:00:12.500000"})
+
+        self.assertEqual(result, 12.5)
+
+    def test_position_falls_back_to_out_time(self):
+        result = FfmpegProcess.parse_position({"out_time_us": "N/A", "out_time": "01:02:03.500000"})
+
+        self.assertEqual(result, 3723.5)
+
+    def test_position_is_none_without_a_time(self):
+        self.assertIsNone(FfmpegProcess.parse_position({"speed": "1.5x"}))
+
+    def test_progress_arguments_go_before_inputs(self):
+        process = FfmpegProcess(["ffmpeg", "-i", "in.mp3", "out.m4a"], lambda position, finished: None)
+
+        self.assertEqual(process.args[0], "ffmpeg")
+        self.assertLess(process.args.index("-progress"), process.args.index("-i"))
+
+
+class ProgressReporterTests(TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.reporter = ProgressReporter([10.0, 20.0, 30.0], ["One", "Two", "Three"], "json", self.stream)
+
+    def test_single_job_reports_chapter_at_position(self):
+        self.reporter.update(0, 0.0, 15.0)
+
+        result = self.reporter.snapshot()
+
+        self.assertEqual(result["percent"], 25.0)
+        self.assertEqual(result["chapter"], 2)
+        self.assertEqual(result["chapter_title"], "Two")
+        self.assertEqual(result["chapters"], 3)
+
+    def test_parallel_jobs_add_up_and_report_earliest_running_chapter(self):
+        self.reporter.update(0, 0.0, 10.0, True)
+        self.reporter.update(1, 10.0, 5.0)
+        self.reporter.update(2, 30.0, 15.0)
+
+        result = self.reporter.snapshot()
+
+        self.assertEqual(result["position"], 30.0)
+        self.assertEqual(result["chapter"], 2)
+
+    def test_reset_forgets_progress(self):
+        self.reporter.update(0, 0.0, 15.0)
+
+        self.reporter.reset()
+
+        self.assertEqual(self.reporter.snapshot()["position"], 0.0)
+
+    def test_writes_json_lines(self):
+        self.reporter.update(0, 0.0, 60.0, True)
+        self.reporter.finish()
+
+        lines = [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+        self.assertEqual(lines[-1]["percent"], 100.0)
+        self.assertEqual(lines[-1]["eta"], 0.0)
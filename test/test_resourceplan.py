@@ -0,0 +1,101 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from createm4b.resourceplan import ResourcePlan
+
+
+class ResourcePlanTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.directory.name, "cgroup")
+        self.process_cgroup = os.path.join(self.directory.name, "process-cgroup")
+        self.__set_process_cgroup("0::/\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __set_process_cgroup(self, content: str):
+        with open(self.process_cgroup, "w") as f:
+            f.write(content)
+
+    def __detect_cpus(self) -> int:
+        """CPUs detected on a machine with 16 of them"""
+        with patch("createm4b.resourceplan.os.cpu_count", return_value=16), \
+                patch("createm4b.resourceplan.os.sched_getaffinity", return_value=set(range(16)), create=True):
+            (cpus, source) = ResourcePlan.detect_cpus(self.root, self.process_cgroup)
+        self.assertEqual(source, "cgroup")
+        return cpus
+
+    def __write(self, content: str, *path: str):
+        file_name = os.path.join(self.root, *path)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with open(file_name, "w") as f:
+            f.write(content)
+
+    def test_cgroup_v2_quota_limits_cpus(self):
+        self.__write("150000 100000\n", "cpu.max")
+
+        (cpus, source) = ResourcePlan.detect_cpus(self.root, self.process_cgroup)
+
+        if (os.cpu_count() or 1) > 2:
+            self.assertEqual((cpus, source), (2, "cgroup"))
+        else:
+            self.assertLessEqual(cpus, 2)
+
+    def test_cgroup_v1_quota_limits_cpus(self):
+        self.__write("100000", "cpu", "cpu.cfs_quota_us")
+        self.__write("100000", "cpu", "cpu.cfs_period_us")
+
+        self.assertEqual(self.__detect_cpus(), 1)
+
+    def test_no_quota_leaves_cpu_count(self):
+        self.__write("max 100000\n", "cpu.max")
+        self.__write("-1", "cpu", "cpu.cfs_quota_us")
+
+        (cpus, source) = ResourcePlan.detect_cpus(self.root, self.process_cgroup)
+
+        self.assertNotEqual(source, "cgroup")
+        self.assertEqual(cpus, len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count())
+
+    def test_cgroup_v2_quota_of_the_process_cgroup(self):
+        self.__set_process_cgroup("0::/user.slice/book.scope\n")
+        self.__write("max 100000\n", "user.slice", "cpu.max")
+        self.__write("250000 100000\n", "user.slice", "book.scope", "cpu.max")
+
+        self.assertEqual(self.__detect_cpus(), 3)
+
+    def test_cgroup_v2_quota_of_a_parent_cgroup(self):
+        self.__set_process_cgroup("0::/user.slice/book.scope\n")
+        self.__write("200000 100000\n", "user.slice", "cpu.max")
+        self.__write("400000 100000\n", "user.slice", "book.scope", "cpu.max")
+
+        self.assertEqual(self.__detect_cpus(), 2)
+
+    def test_cgroup_v1_quota_of_the_process_cgroup(self):
+        self.__set_process_cgroup("5:memory:/docker/abc\n4:cpu,cpuacct:/docker/abc\n0::/\n")
+        self.__write("350000", "cpu", "docker", "abc", "cpu.cfs_quota_us")
+        self.__write("100000", "cpu", "docker", "abc", "cpu.cfs_period_us")
+
+        self.assertEqual(self.__detect_cpus(), 4)
+
+    def test_missing_process_cgroup_falls_back_to_the_root(self):
+        self.__set_process_cgroup("0::/elsewhere\n")
+        self.__write("500000 100000\n", "cpu.max")
+
+        self.assertEqual(self.__detect_cpus(), 5)
+
+    def test_counts_follow_cpus(self):
+        small = ResourcePlan(cpus=2, encode_jobs=1)
+        large = ResourcePlan(cpus=32)
+
+        self.assertEqual((small.cpu_source, small.threads, small.encode_jobs, small.probe_workers), ("option", 2, 1, 4))
+        self.assertEqual((large.threads, large.encode_jobs, large.segment_threads, large.cover_threads,
+                          large.probe_workers), (4, 32, 1, 32, 8))
+
+    def test_overrides_are_used(self):
+        plan = ResourcePlan(cpus=8, threads=2, encode_jobs=2, probe_workers=3)
+
+        self.assertEqual((plan.threads, plan.encode_jobs, plan.segment_threads, plan.probe_workers), (2, 2, 2, 3))
+        self.assertIn("8 CPU(s)", plan.describe())
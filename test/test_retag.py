@@ -0,0 +1,61 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.mp4 import Mp4Chapter, Mp4Validator, Mp4Writer
+from createm4b.retag import Retag
+from createm4b.retagcontext import RetagContext
+from createm4b.retagerror import RetagError
+from test.test_mp4writer import FTYP, build_moov
+from test.test_mp4atom import build_atom
+
+
+class RetagTests(TestCase):
+    def setUp(self):
+        (fd, self.file_name) = tempfile.mkstemp(suffix=".m4b")
+        with os.fdopen(fd, "wb") as f:
+            f.write(FTYP + build_atom(b"mdat", b"\0" * 1000) + build_moov())
+        writer = Mp4Writer(self.file_name)
+        writer.set_tag("©alb", "Book")
+        writer.set_tag("aART", "Author")
+        writer.set_chapters([Mp4Chapter(0.0, "One"), Mp4Chapter(1.0, "Two")])
+        writer.write()
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def __retag(self, *args: str):
+        Retag(RetagContext(["-q"] + list(args) + [self.file_name])).retag(self.file_name)
+
+    def test_reads_metadata_as_createm4b_writes_it(self):
+        metadata = Retag.read_metadata(self.file_name)
+
+        self.assertEqual(metadata.album, "Book")
+        self.assertEqual(metadata.artist, "Author")
+        self.assertIn("[CHAPTER]\nTIMEBASE=1/1000\nSTART=1000\nEND=3000\ntitle=Two\n", metadata.format())
+
+    def test_retitles_chapters_and_changes_album(self):
+        self.__retag("--album", "New", "-t", "2=Deux")
+
+        metadata = Retag.read_metadata(self.file_name)
+        self.assertEqual([(c.start, c.title) for c in metadata.chapters], [(0.0, "One"), (1.0, "Deux")])
+        self.assertEqual(Mp4Validator().probe_file(self.file_name).album, "New")
+
+    def test_replaces_chapters_from_metadata_file(self):
+        (fd, metadata_file) = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w") as f:
+            f.write(";FFMETADATA1\nalbum=Other\nalbum_artist=\n[CHAPTER]\nTIMEBASE=1/1000\nSTART=0\nEND=500\n"
+                    "title=A\n[CHAPTER]\nTIMEBASE=1/1000\nSTART=500\nEND=3000\ntitle=B\n")
+        try:
+            self.__retag("-m", metadata_file)
+        finally:
+            os.remove(metadata_file)
+
+        metadata = Retag.read_metadata(self.file_name)
+        self.assertEqual(metadata.album, "Other")
+        self.assertIsNone(metadata.artist)
+        self.assertEqual([(c.start, c.title) for c in metadata.chapters], [(0.0, "A"), (0.5, "B")])
+
+    def test_missing_chapter_is_an_error(self):
+        with self.assertRaises(RetagError):
+            self.__retag("-t", "3=Three")
@@ -0,0 +1,50 @@
+import contextlib
+import io
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.runtime import RuntimeContext
+
+
+class RuntimeContextTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, "1.mp3")
+        with open(self.input, "wb") as f:
+            f.write(b"\0" * 16)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __parse_error(self, args) -> str:
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+            RuntimeContext(args)
+        return stderr.getvalue()
+
+    def test_existing_output_is_left_alone(self):
+        output = os.path.join(self.directory.name, "book.m4b")
+        with open(output, "wb") as f:
+            f.write(b"old book")
+
+        context = RuntimeContext(["-o", output, self.input])
+
+        self.assertEqual(context.output_file, os.path.realpath(output))
+        with open(output, "rb") as f:
+            self.assertEqual(f.read(), b"old book")
+
+    def test_output_is_not_created(self):
+        output = os.path.join(self.directory.name, "book.m4b")
+
+        RuntimeContext(["-o", output, self.input])
+
+        self.assertFalse(os.path.exists(output))
+
+    def test_output_directory_must_exist(self):
+        output = os.path.join(self.directory.name, "missing", "book.m4b")
+
+        self.assertIn("no such directory", self.__parse_error(["-o", output, self.input]))
+
+    def test_output_cant_be_a_directory(self):
+        self.assertIn("it is a directory", self.__parse_error(["-o", self.directory.name, self.input]))
@@ -0,0 +1,84 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.segmentcache import SegmentCache
+
+SETTINGS = ["-c:a", "aac", "-b:a", "64k", "-ar", "44100"]
+
+
+class SegmentCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SegmentCache(os.path.join(self.directory.name, "segments"), max_size=250)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __create_file(self, name: str, data: bytes) -> str:
+        file_name = os.path.join(self.directory.name, name)
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return file_name
+
+    def __store(self, key: str, size: int, mtime: float) -> str:
+        temp_name = self.cache.create_temporary()
+        with open(temp_name, "wb") as f:
+            f.write(b"\0" * size)
+        file_name = self.cache.store(key, temp_name)
+        os.utime(file_name, (mtime, mtime))
+        return file_name
+
+    def test_key_depends_on_content_not_name(self):
+        first = self.__create_file("1.mp3", b"audio")
+        second = self.__create_file("2.mp3", b"audio")
+
+        self.assertEqual(SegmentCache.key(first, SETTINGS), SegmentCache.key(second, SETTINGS))
+
+    def test_key_changes_with_content_and_settings(self):
+        file_name = self.__create_file("1.mp3", b"audio")
+        key = SegmentCache.key(file_name, SETTINGS)
+        changed = self.__create_file("2.mp3", b"audi0")
+
+        self.assertNotEqual(key, SegmentCache.key(changed, SETTINGS))
+        self.assertNotEqual(key, SegmentCache.key(file_name, ["-c:a", "aac", "-b:a", "96k", "-ar", "44100"]))
+
+    def test_stored_segment_is_returned(self):
+        file_name = self.__store("abc", 10, 1000)
+
+        result = self.cache.get("abc")
+
+        self.assertEqual(result, file_name)
+        self.assertGreater(os.stat(result).st_mtime, 1000)
+
+    def test_missing_segment_is_not_returned(self):
+        self.assertIsNone(self.cache.get("abc"))
+
+    def test_removed_segment_is_not_returned(self):
+        file_name = self.__store("abc", 10, 1000)
+
+        self.cache.remove(file_name)
+
+        self.assertIsNone(self.cache.get("abc"))
+
+    def test_trim_evicts_least_recently_used(self):
+        self.__store("old", 100, 1000)
+        self.__store("used", 100, 2000)
+        self.__store("new", 100, 3000)
+        self.cache.get("old")
+
+        self.cache.trim()
+
+        self.assertIsNotNone(self.cache.get("old"))
+        self.assertIsNone(self.cache.get("used"))
+        self.assertIsNotNone(self.cache.get("new"))
+
+    def test_trim_removes_stale_partial_segments(self):
+        stale = self.cache.create_temporary()
+        os.utime(stale, (1000, 1000))
+        current = self.cache.create_temporary()
+
+        self.cache.trim()
+
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(current))
@@ -10,3 +10,19 @@ class UtilTests(TestCase):
         result = util.parse_32bit_little_endian(data)
 
         self.assertEqual(result, expected)
+
+    def test_parse_32bit_big_endian(self):
+        data = b"\x8b\xba\xb9\x58"
+        expected = 2344270168
+
+        result = util.parse_32bit_big_endian(data)
+
+        self.assertEqual(result, expected)
+
+    def test_parse_syncsafe_integer(self):
+        data = b"\x00\x00\x02\x01"
+        expected = 257
+
+        result = util.parse_syncsafe_integer(data)
+
+        self.assertEqual(result, expected)
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from createm4b.filevalidator import FileValidator
+from createm4b.mp3 import Mp3
+from createm4b.mp3.mp3frame import Mp3Frame
+from createm4b.mp3.vbrheader import VbrHeader
+
+# MPEG-1 Layer III, 128kbps, 44100Hz, joint stereo: 417 bytes per frame
+FRAME_HEADER = b"\xff\xfb\x90\x40"
+FRAME_LENGTH = 417
+
+
+def build_xing_frame(tag: bytes, frames: int, size: int, lame: bool=False) -> bytes:
+    data = FRAME_HEADER + b"\0" * 32 + tag + b"\0\0\0\x03" + frames.to_bytes(4, "big") + size.to_bytes(4, "big")
+    if lame:
+        # 576 samples of delay, 1000 samples of padding
+        data += b"LAME3.99r" + b"\0" * 12 + bytes([576 >> 4, (576 & 0xf) << 4 | 1000 >> 8, 1000 & 0xff])
+    return data + b"\0" * (FRAME_LENGTH - len(data))
+
+
+def build_audio_frame() -> bytes:
+    return FRAME_HEADER + b"\0" * (FRAME_LENGTH - 4)
+
+
+class TrueValidator(FileValidator):
+    def is_valid(self, file_name):
+        return True
+
+
+class VbrHeaderTests(TestCase):
+    def test_reads_frame_count_from_xing_header(self):
+        data = build_xing_frame(b"Xing", 1000, 1001 * FRAME_LENGTH)
+
+        result = VbrHeader.read_vbr_header(Mp3Frame(data), data)
+
+        self.assertEqual(result.header_type, "Xing")
+        self.assertEqual(result.frame_count, 1000)
+        self.assertEqual(result.byte_count, 1001 * FRAME_LENGTH)
+
+    def test_lame_extension_trims_encoder_delay_and_padding(self):
+        data = build_xing_frame(b"Info", 1000, 1001 * FRAME_LENGTH, lame=True)
+        frame = Mp3Frame(data)
+
+        result = VbrHeader.read_vbr_header(frame, data)
+
+        self.assertEqual(result.encoder, "LAME3.99r")
+        self.assertEqual(result.encoder_delay, 576)
+        self.assertEqual(result.encoder_padding, 1000)
+        self.assertEqual(result.sample_count(frame), 1000 * 1152 - 1576)
+
+    def test_plain_audio_frame_has_no_header(self):
+        data = build_audio_frame()
+
+        result = VbrHeader.read_vbr_header(Mp3Frame(data), data)
+
+        self.assertIsNone(result)
+
+    def test_header_that_does_not_match_file_size_is_not_plausible(self):
+        data = build_xing_frame(b"Xing", 1000, 1001 * FRAME_LENGTH)
+        frame = Mp3Frame(data)
+
+        result = VbrHeader.read_vbr_header(frame, data)
+
+        self.assertFalse(result.is_plausible(frame, 10 * FRAME_LENGTH))
+
+
+class Mp3DurationTests(TestCase):
+    def setUp(self):
+        (fd, self.file_name) = tempfile.mkstemp(suffix=".mp3")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def __write(self, data: bytes):
+        with open(self.file_name, "wb") as f:
+            f.write(b"ID3\x03\0\0\0\0\0\0" + data)
+
+    def test_duration_comes_from_xing_header(self):
+        self.__write(build_xing_frame(b"Xing", 100, 101 * FRAME_LENGTH) + build_audio_frame() * 100)
+        mp3 = Mp3(TrueValidator(), self.file_name)
+
+        result = mp3.duration
+
+        self.assertAlmostEqual(result, 100 * 1152 / 44100)
+        self.assertEqual(mp3.duration_source, "Xing")
+
+    def test_stream_duration_includes_encoder_delay_and_padding(self):
+        self.__write(build_xing_frame(b"Info", 100, 101 * FRAME_LENGTH, lame=True) + build_audio_frame() * 100)
+        mp3 = Mp3(TrueValidator(), self.file_name)
+
+        self.assertAlmostEqual(mp3.duration, (100 * 1152 - 1576) / 44100)
+        self.assertAlmostEqual(mp3.stream_duration, 100 * 1152 / 44100)
+
+    def test_falls_back_to_scan_when_header_is_wrong(self):
+        self.__write(build_xing_frame(b"Xing", 5000, 5001 * FRAME_LENGTH) + build_audio_frame() * 100)
+        mp3 = Mp3(TrueValidator(), self.file_name)
+
+        result = mp3.duration
+
+        self.assertAlmostEqual(result, 101 * 1152 / 44100)
+        self.assertEqual(mp3.duration_source, "scan")
+        self.assertAlmostEqual(mp3.stream_duration, 100 * 1152 / 44100)